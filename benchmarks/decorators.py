@@ -0,0 +1,132 @@
+# -*- coding: utf-8 -*-
+"""Per-request overhead of stacked handler decorators.
+
+Compares ``authorized`` + ``validate_response`` built on
+``tornado.gen.coroutine`` (as before native coroutine support) with the
+current decorators, for plain, ``tornado.gen.coroutine`` and native
+coroutine handler methods. The undecorated method is the baseline, the
+response schema is kept trivial so that validation costs the same in
+every case. With ``--no-result`` methods return None (as handlers
+writing their response themselves), which leaves validation out and
+measures the wrappers alone.
+
+Usage: python benchmarks/decorators.py [--calls N] [--repeat N] [--no-result]
+
+"""
+
+from argparse import ArgumentParser
+from functools import wraps
+from inspect import isawaitable
+import timeit
+
+from tornado.concurrent import is_future
+from tornado.gen import coroutine
+from tornado.ioloop import IOLoop
+
+from limonado.access import Principal
+from limonado.decorators import authorized
+from limonado.validation import validate_response
+
+_SCHEMA = {"type": "object"}
+
+_results = {"value": {"id": 1}}
+
+
+def legacy_validate_response(schema):
+    """``validate_response`` as implemented with ``gen.coroutine``."""
+    def _validate(rh_method):
+        @wraps(rh_method)
+        @coroutine
+        def _wrapper(self, *args, **kwargs):
+            result = rh_method(self, *args, **kwargs)
+            if is_future(result):
+                result = yield result
+
+            if result is not None:
+                import jsonschema
+
+                jsonschema.validate(result, schema)
+                self.write_json(result)
+                self.finish()
+
+        return _wrapper
+
+    return _validate
+
+
+class _Handler:
+    current_user = Principal("user", permissions=["read"])
+
+    def write_json(self, value):
+        pass
+
+    def finish(self):
+        pass
+
+
+def _plain(self):
+    return _results["value"]
+
+
+@coroutine
+def _tornado_coroutine(self):
+    return _results["value"]
+
+
+async def _native_coroutine(self):
+    return _results["value"]
+
+
+def build_cases():
+    cases = []
+    for kind, method in (("plain", _plain),
+                         ("gen.coroutine", _tornado_coroutine),
+                         ("async def", _native_coroutine)):
+        cases.append((kind, "undecorated", method))
+        if kind != "async def":
+            # Native coroutines were not supported, their result (a
+            # coroutine object) would have been validated.
+            cases.append((kind, "before", authorized("read")(
+                legacy_validate_response(_SCHEMA)(method))))
+
+        cases.append((kind, "after", authorized("read")(
+            validate_response(_SCHEMA)(method))))
+
+    return cases
+
+
+async def _drive(method, handler, calls):
+    for _ in range(calls):
+        result = method(handler)
+        if isawaitable(result):
+            await result
+
+
+def main():
+    parser = ArgumentParser()
+    parser.add_argument("--calls", type=int, default=10000)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--no-result", action="store_true")
+    args = parser.parse_args()
+
+    if args.no_result:
+        _results["value"] = None
+
+    io_loop = IOLoop.current()
+    handler = _Handler()
+    baseline = {}
+    for kind, variant, method in build_cases():
+        timer = timeit.Timer(lambda: io_loop.run_sync(
+            lambda: _drive(method, handler, args.calls)))
+        best = min(timer.repeat(repeat=args.repeat, number=1))
+        per_call = best / args.calls * 1e6
+        if variant == "undecorated":
+            baseline[kind] = per_call
+            print("{:<14} {:<12} {:8.2f} us".format(kind, variant, per_call))
+        else:
+            print("{:<14} {:<12} {:8.2f} us (+{:.2f} us)".format(
+                kind, variant, per_call, per_call - baseline[kind]))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,66 @@
+# -*- coding: utf-8 -*-
+"""Cost of extracting and validating a large list of IDs.
+
+Compares the generic parsing of ``?ids=1,2,3,...`` (a list of ints,
+validated item by item) with the bulk parsing of compact arrays, for
+``--items`` IDs.
+
+Usage: python benchmarks/params.py [--items N] [--repeat N]
+
+"""
+
+from argparse import ArgumentParser
+import timeit
+
+from limonado.utils._params import exclude_parsed
+from limonado.utils._params import extract_params
+from limonado.validation import validate_request_data
+
+
+def build_schema(compact):
+    ids = {
+        "type": "array",
+        "itemSeparator": ",",
+        "maxItems": 100000,
+        "items": {
+            "type": "integer",
+            "minimum": 1
+        }
+    }
+    if compact:
+        ids["compact"] = True
+
+    return {
+        "additionalProperties": False,
+        "type": "object",
+        "properties": {
+            "ids": ids
+        },
+        "required": ["ids"]
+    }
+
+
+def get_params(arguments, schema):
+    params = extract_params(arguments, schema)
+    validate_request_data(params, exclude_parsed(schema, params))
+    return params
+
+
+def main():
+    parser = ArgumentParser()
+    parser.add_argument("--items", type=int, default=10000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    arguments = {
+        "ids": [",".join(str(i) for i in range(1, args.items + 1)).encode()]
+    }
+    for name, compact in (("list", False), ("compact", True)):
+        schema = build_schema(compact)
+        best = min(timeit.repeat(lambda: get_params(arguments, schema),
+                                 repeat=args.repeat, number=10)) / 10
+        print("{:<8} {:10.1f} us".format(name, best * 1e6))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+# -*- coding: utf-8 -*-
+"""Compare Tornado's linear router with limonado's prefix router.
+
+The route table mimics an API with many endpoints, each exposing a few
+literal and dynamic paths, plus the routes generated for deprecated
+versions.
+
+Usage: python benchmarks/routing.py [--endpoints N] [--deprecated N]
+
+"""
+
+from argparse import ArgumentParser
+import random
+import timeit
+
+from tornado.httputil import HTTPServerRequest
+from tornado.web import RequestHandler
+from tornado.web import _ApplicationRouter
+
+from limonado.core import Application
+from limonado.core import PrefixRouter
+from limonado.settings import get_default_settings
+
+_ENDPOINT_PATHS = (
+    "/{name}",
+    "/{name}/items",
+    "/{name}/items/([^/]+)",
+    "/{name}/items/([^/]+)/tags",
+    "/{name}/health",
+)
+
+
+class _Handler(RequestHandler):
+    pass
+
+
+def build_rules(endpoints, deprecated):
+    rules = []
+    versions = [str(version) for version in range(deprecated + 1, 0, -1)]
+    for version in versions:
+        for index in range(endpoints):
+            name = "endpoint{}".format(index)
+            for path in _ENDPOINT_PATHS:
+                pattern = "/v{}".format(version) + path.format(name=name)
+                rules.append((pattern, _Handler))
+
+    return rules
+
+
+def build_paths(endpoints, deprecated, count=1000):
+    paths = []
+    for _ in range(count):
+        version = random.randint(1, deprecated + 1)
+        name = "endpoint{}".format(random.randrange(endpoints))
+        path = random.choice(_ENDPOINT_PATHS).format(name=name)
+        path = "/v{}".format(version) + path.replace("([^/]+)", "42")
+        paths.append(path)
+
+    return paths
+
+
+def main():
+    parser = ArgumentParser()
+    parser.add_argument("--endpoints", type=int, default=80)
+    parser.add_argument("--deprecated", type=int, default=3)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    random.seed(0)
+    rules = build_rules(args.endpoints, args.deprecated)
+    requests = [HTTPServerRequest(uri=path)
+                for path in build_paths(args.endpoints, args.deprecated)]
+    application = Application(get_default_settings())
+    routers = [
+        ("linear", _ApplicationRouter(application, rules)),
+        ("prefix", PrefixRouter(application, rules)),
+    ]
+    print("{} routes, {} requests".format(len(rules), len(requests)))
+    for name, router in routers:
+
+        def run():
+            for request in requests:
+                router.find_handler(request)
+
+        best = min(timeit.repeat(run, number=1, repeat=args.repeat))
+        print("{:>8}: {:8.2f} us/request".format(
+            name, best / len(requests) * 1e6))
+
+
+if __name__ == "__main__":
+    main()
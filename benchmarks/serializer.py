@@ -0,0 +1,102 @@
+# -*- coding: utf-8 -*-
+"""Cost of validating and encoding list responses.
+
+Compares validating a response with ``jsonschema`` and encoding it with
+``tornado.escape.json_encode`` (as ``validate_response`` did before)
+with the serializer compiled from the schema, for lists of ``--items``
+items. The encoding alone is given as a reference.
+
+Usage: python benchmarks/serializer.py [--items N] [--repeat N]
+
+"""
+
+from argparse import ArgumentParser
+import timeit
+
+from tornado.escape import json_encode
+
+from limonado.validation import SchemaRegistry
+
+_ITEM_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "id": {
+            "type": "integer"
+        },
+        "name": {
+            "type": "string"
+        },
+        "price": {
+            "type": "number"
+        },
+        "available": {
+            "type": "boolean"
+        },
+        "tags": {
+            "type": "array",
+            "items": {
+                "type": "string"
+            }
+        }
+    },
+    "required": ["id", "name"],
+    "additionalProperties": False
+}
+
+_LIST_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "items": {
+            "type": "array",
+            "items": {
+                "$ref": "item"
+            }
+        },
+        "total": {
+            "type": "integer"
+        }
+    },
+    "required": ["items"]
+}
+
+
+def build_response(items):
+    return {
+        "items": [{
+            "id": index,
+            "name": "item {}".format(index),
+            "price": index * 1.25,
+            "available": index % 2 == 0,
+            "tags": ["a", "b"]
+        } for index in range(items)],
+        "total": items
+    }
+
+
+def main():
+    parser = ArgumentParser()
+    parser.add_argument("--items", type=int, default=1000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    registry = SchemaRegistry()
+    registry.register("item", _ITEM_SCHEMA)
+    registry.register("list", _LIST_SCHEMA)
+    response = build_response(args.items)
+    validator = registry.get_validator("list")
+    assert registry.serialize(response, "list") == json_encode(response)
+
+    def _validate_and_encode():
+        validator.validate(response)
+        return json_encode(response)
+
+    for name, func in (("json_encode", lambda: json_encode(response)),
+                       ("validate + json_encode", _validate_and_encode),
+                       ("serialize", lambda: registry.serialize(response,
+                                                                "list"))):
+        best = min(timeit.repeat(func, repeat=args.repeat, number=10)) / 10
+        print("{:<24} {:10.1f} us".format(name, best * 1e6))
+
+
+if __name__ == "__main__":
+    main()
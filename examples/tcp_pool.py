@@ -0,0 +1,95 @@
+# -*- coding: utf-8 -*-
+"""Pooled TCP connections to an echo service.
+
+Starts a local TCP echo service on port 9000 next to the API, then try:
+
+    curl localhost:8000/v1/echo?message=hello
+    curl localhost:8000/v1/health
+
+"""
+
+from tornado.gen import coroutine
+from tornado.iostream import StreamClosedError
+from tornado.tcpclient import TCPClient
+from tornado.tcpserver import TCPServer
+
+from limonado import WebAPI
+from limonado.contrib.health import HealthEndpoint
+from limonado.contrib.pool import ResourcePool
+from limonado.core import Endpoint
+from limonado.core import EndpointHandler
+
+_PARAMS = {
+    "type": "object",
+    "properties": {
+        "message": {
+            "type": "string"
+        }
+    },
+    "required": ["message"]
+}
+
+
+class EchoServer(TCPServer):
+    @coroutine
+    def handle_stream(self, stream, address):
+        try:
+            while True:
+                line = yield stream.read_until(b"\n")
+                yield stream.write(line)
+        except StreamClosedError:
+            pass
+
+
+class EchoPool(ResourcePool):
+    def __init__(self, host, port, **kwargs):
+        super().__init__(name="echo", **kwargs)
+        self.host = host
+        self.port = port
+        self.client = TCPClient()
+
+    def create(self):
+        return self.client.connect(self.host, self.port)
+
+    def close(self, stream):
+        stream.close()
+
+    @coroutine
+    def ping(self, stream):
+        yield stream.write(b"ping\n")
+        yield stream.read_until(b"\n")
+
+
+class EchoHandler(EndpointHandler):
+    @coroutine
+    def get(self):
+        params = self.get_params(_PARAMS)
+        pool = self.endpoint.context.echo
+        stream = yield pool.acquire()
+        try:
+            yield stream.write(params["message"].encode("utf-8") + b"\n")
+            line = yield stream.read_until(b"\n")
+        except StreamClosedError:
+            pool.release(stream, broken=True)
+            raise
+        else:
+            pool.release(stream)
+
+        self.write_json({"echo": line.decode("utf-8").rstrip("\n")})
+
+
+class EchoEndpoint(Endpoint):
+    name = "echo"
+
+    @property
+    def handlers(self):
+        return [("/{name}", EchoHandler)]
+
+
+if __name__ == "__main__":
+    EchoServer().listen(9000)
+    api = WebAPI(objects={
+        "echo": EchoPool("127.0.0.1", 9000, min_size=2, max_size=8)
+    })
+    api.add_endpoints([EchoEndpoint, HealthEndpoint])
+    api.run()
@@ -1,11 +1,47 @@
 # -*- coding: utf-8 -*-
 
-from .api import WebAPI
-from .exceptions import APIError
-from .settings import get_default_settings
+import importlib
+import sys
+import types
 
 __all__ = [
     "APIError",
     "WebAPI",
     "get_default_settings"
 ]
+
+_EXPORTS = {
+    "APIError": ".exceptions",
+    "WebAPI": ".api",
+    "get_default_settings": ".settings"
+}
+
+
+class _LazyModule(types.ModuleType):
+    """Package module importing its exports on first access.
+
+    Defers importing Tornado's web stack until it is actually needed, so
+    that e.g. ``limonado.cli`` and ``limonado.utils`` stay cheap to
+    import. A module ``__getattr__`` (PEP 562) would only work on Python
+    3.7+, module classes can be changed since Python 3.5.
+
+    """
+
+    def __getattr__(self, name):
+        try:
+            module_name = _EXPORTS[name]
+        except KeyError:
+            raise AttributeError(
+                "module {!r} has no attribute {!r}".format(self.__name__,
+                                                           name))
+
+        value = getattr(importlib.import_module(module_name, self.__name__),
+                        name)
+        setattr(self, name, value)
+        return value
+
+    def __dir__(self):
+        return sorted(set(super().__dir__()) | set(_EXPORTS))
+
+
+sys.modules[__name__].__class__ = _LazyModule
@@ -1,15 +1,26 @@
 # -*- coding: utf-8 -*-
 
+import abc
 from functools import wraps
+import hashlib
+import time
+
+from tornado.gen import coroutine
+from tornado.ioloop import IOLoop
 
 from .exceptions import APIError
+from .utils.cache import TTLCache
 from .utils.decorators import container
 
 __all__ = [
+    "Principal",
+    "TokenAuthenticator",
     "authenticated",
     "authorized"
 ]
 
+_MISSING = object()
+
 
 def authenticated(rh_method):
     """Check if user is registered and can be authenticated."""
@@ -24,18 +35,19 @@ def authenticated(rh_method):
 
 
 def authorized(*scopes):
+    required_scopes = frozenset(scopes)
 
     @container
     def _check(rh_method):
 
         @wraps(rh_method)
         def _wrapper(self, *args, **kwargs):
-            if self.current_user is None:
+            user = self.current_user
+            if user is None:
                 raise APIError(401, "Not Authenticated")
 
-            if (not self.current_user.is_superuser and
-                    not any(scope in self.current_user.scopes
-                            for scope in scopes)):
+            if (not user.is_superuser and
+                    required_scopes.isdisjoint(user.scopes)):
                 raise APIError(403, "Access Denied")
 
             return rh_method(self, *args, **kwargs)
@@ -43,3 +55,124 @@ def authorized(*scopes):
         return _wrapper
 
     return _check
+
+
+class Principal:
+    """Verified user with precomputed scope and permission sets.
+
+    ``expiration_time`` (a UNIX timestamp) bounds how long the principal
+    may be cached, e.g. the expiration time of the token it was verified
+    from.
+
+    """
+
+    def __init__(self, id, scopes=(), permissions=(), is_superuser=False,
+                 expiration_time=None, attributes=None):
+        self.id = id
+        self.scopes = frozenset(scopes)
+        self.permissions = frozenset(permissions)
+        self.is_superuser = is_superuser
+        self.expiration_time = expiration_time
+        self.attributes = dict(attributes or {})
+
+    def has_permission(self, permission):
+        return permission in self.permissions
+
+    def has_any_permission(self, permissions):
+        return not self.permissions.isdisjoint(permissions)
+
+
+class TokenAuthenticator(abc.ABC):
+    """Resolve the current user of a handler from a bearer token.
+
+    Tokens are verified by ``verify`` (to be implemented by subclasses)
+    in the context executor, so it may block. Verified principals are
+    cached by token hash, invalid tokens (for which ``verify`` returns
+    None) are cached for ``negative_ttl``.
+    Concurrent requests with the same token share one verification.
+
+    Pass it as the ``authenticator`` object of a ``WebAPI`` (or set it as
+    ``authenticator`` of an ``EndpointHandler`` subclass) to resolve
+    ``current_user`` before the request is handled.
+
+    Principals are cached in process by default, ``cache`` may be another
+    ``CacheBackend`` (e.g. a ``SharedMemoryCache`` for all the workers of
+    a host), in which case ``ttl`` and ``max_size`` are the ones of the
+    cache.
+
+    """
+
+    scheme = "Bearer"
+
+    def __init__(self, ttl=300, negative_ttl=30, max_size=10000, cache=None):
+        self._cache = TTLCache(max_size, ttl) if cache is None else cache
+        self._negative_ttl = negative_ttl
+        self._pending = {}
+
+    @abc.abstractmethod
+    def verify(self, token):
+        """Return a ``Principal`` for a valid token, None otherwise."""
+
+    def get_token(self, handler):
+        header = handler.request.headers.get("Authorization")
+        if header is None:
+            return None
+
+        scheme, _, token = header.partition(" ")
+        if scheme.lower() != self.scheme.lower() or not token.strip():
+            return None
+
+        return token.strip()
+
+    def resolve_user(self, handler):
+        """Set ``current_user`` of the handler.
+
+        Returns None if the user was resolved synchronously (no token or
+        cached token), otherwise an awaitable done once it is set.
+
+        """
+        token = self.get_token(handler)
+        if token is None:
+            handler.current_user = None
+            return None
+
+        key = hashlib.sha256(token.encode("utf-8")).digest()
+        user = self._cache.get(key, _MISSING)
+        if user is not _MISSING:
+            handler.current_user = user
+            return None
+
+        return self._resolve_user(handler, key, token)
+
+    def invalidate(self, token):
+        self._cache.pop(hashlib.sha256(token.encode("utf-8")).digest())
+
+    async def _resolve_user(self, handler, key, token):
+        future = self._pending.get(key)
+        if future is None:
+            executor = handler.endpoint.context.executor
+            future = self._verify(key, token, executor)
+            self._pending[key] = future
+
+        handler.current_user = await future
+
+    @coroutine
+    def _verify(self, key, token, executor):
+        try:
+            user = yield IOLoop.current().run_in_executor(
+                executor, self.verify, token)
+        finally:
+            self._pending.pop(key, None)
+
+        ttl = self._cache.ttl
+        if user is not None and user.expiration_time is not None:
+            ttl = min(ttl, user.expiration_time - time.time())
+            if ttl <= 0:
+                user = None
+
+        if user is None:
+            self._cache.set(key, None, ttl=self._negative_ttl)
+        else:
+            self._cache.set(key, user, ttl=ttl)
+
+        return user
@@ -3,15 +3,16 @@
 from copy import deepcopy
 import os
 
-import jsonschema
-from tornado.concurrent import futures
 import tornado.ioloop
 
 from .core.application import Application
 from .core.context import Context
+from .core.endpoint import LazyEndpoint
 from .settings import get_default_settings
 from .utils import merge_defaults
+from .utils.executor import PriorityExecutor
 from .validation import schemas
+from .validation.registry import SchemaRegistry
 
 __all__ = ["WebAPI"]
 
@@ -26,12 +27,25 @@ class WebAPI:
         merge_defaults(get_default_settings(), self.settings)
         self.objects = objects if objects is not None else {}
         self.context_class = context_class
+        self.settings_source = None
+        self.schemas = SchemaRegistry()
         self._endpoints = {}
+        self._application = None
+        self._context = None
+        self._endpoint_instances = {}
+        self._enable = None
 
     @property
     def endpoint_names(self):
         return frozenset(self._endpoints)
 
+    @property
+    def enabled_endpoint_names(self):
+        if self._enable is None:
+            return self.endpoint_names
+
+        return self.endpoint_names & frozenset(self._enable)
+
     def add_endpoint(self, endpoint_class, endpoint_kwargs=None):
         name = endpoint_class.name
         if not name:
@@ -47,7 +61,7 @@ class WebAPI:
         for endpoint in endpoints:
             try:
                 endpoint_class, endpoint_kwargs = endpoint
-            except ValueError:
+            except (TypeError, ValueError):
                 endpoint_class = endpoint
                 endpoint_kwargs = {}
 
@@ -61,14 +75,65 @@ class WebAPI:
         tornado.ioloop.IOLoop.current().start()
 
     def get_application(self, enable=None):
-        self._validate_settings()
+        self._validate_settings(self.settings)
+        self._context = self._create_context()
+        self._endpoint_instances = {}
+        self._enable = enable
         endpoints = self._create_endpoints(enable)
         endpoint_handlers = self._get_endpoint_handlers(endpoints)
-        return Application(self.settings, handlers=endpoint_handlers)
+        self._application = Application(
+            self.settings, api=self, handlers=endpoint_handlers)
+        return self._application
+
+    def reload(self, settings=None, enable=None):
+        """Apply new settings and enabled endpoints to the application.
+
+        The settings snapshot of the context and the route table are
+        swapped in place, executors, context objects and endpoints which
+        were already created are kept. If ``settings`` is None, they are
+        taken from ``settings_source`` (if set) or kept. If ``enable`` is
+        None, the currently enabled endpoints are kept.
+
+        """
+        if self._application is None:
+            raise RuntimeError("no application to reload")
 
-    def _validate_settings(self):
+        if settings is None and self.settings_source is not None:
+            settings = self.settings_source()
+
+        if settings is None:
+            settings = self.settings
+        else:
+            settings = deepcopy(settings)
+            settings.setdefault("id", self.settings["id"])
+            merge_defaults(get_default_settings(), settings)
+
+        if enable is None:
+            enable = self._enable
+
+        self._validate_settings(settings)
+        previous_settings = self.settings
+        self._set_settings(settings)
         try:
-            jsonschema.validate(self.settings, schemas.SETTINGS)
+            endpoints = self._create_endpoints(enable)
+            endpoint_handlers = self._get_endpoint_handlers(endpoints)
+        except Exception:
+            self._set_settings(previous_settings)
+            self._create_endpoints(self._enable)
+            raise
+
+        self._enable = enable
+        self._application.reconfigure(settings, endpoint_handlers)
+
+    def _set_settings(self, settings):
+        self.settings = settings
+        self._context.update_settings(settings)
+
+    def _validate_settings(self, settings):
+        import jsonschema
+
+        try:
+            jsonschema.validate(settings, schemas.SETTINGS)
         except jsonschema.ValidationError as error:
             raise ValueError(error)
 
@@ -79,17 +144,46 @@ class WebAPI:
 
     def _create_endpoints(self, enable):
         endpoints = []
-        context = self._create_context()
+        lazy_endpoints = {}
         for name, (endpoint_class, endpoint_kwargs) in self._endpoints.items():
             if enable is None or name in enable:
-                endpoint = endpoint_class(context, **endpoint_kwargs)
+                endpoint = self._endpoint_instances.get(name)
+                if endpoint is None:
+                    endpoint = self._create_endpoint(endpoint_class,
+                                                     endpoint_kwargs)
+                    self._endpoint_instances[name] = endpoint
+
+                if isinstance(endpoint, LazyEndpoint):
+                    lazy_endpoints[name] = endpoint
+
                 endpoints.append(endpoint)
 
+        self._context.lazy_endpoints.clear()
+        self._context.lazy_endpoints.update(lazy_endpoints)
         return endpoints
 
+    def _create_endpoint(self, endpoint_class, endpoint_kwargs):
+        if endpoint_class.lazy:
+            return LazyEndpoint(
+                endpoint_class,
+                self._context,
+                endpoint_kwargs=endpoint_kwargs,
+                preload=self.settings["preload_endpoints"])
+
+        return endpoint_class(self._context, **endpoint_kwargs)
+
+    def create_executor(self):
+        """Return the context executor, scheduling calls by priority class.
+
+        Override to change the classes (see ``PriorityExecutor``) or use
+        another ``concurrent.futures`` executor.
+
+        """
+        return PriorityExecutor((os.cpu_count() or 1) * 5)
+
     def _create_context(self):
-        executor = futures.ThreadPoolExecutor((os.cpu_count() or 1) * 5)
-        return self.context_class(self.settings, executor, **self.objects)
+        return self.context_class(self.settings, self.create_executor(),
+                                  schemas=self.schemas, **self.objects)
 
     def _get_endpoint_handlers(self, endpoints):
         handlers = []
@@ -121,7 +215,7 @@ def _build_endpoint_handlers(endpoint, api_path):
             handler_path, handler_class = handler
             handler_kwargs = {}
 
-        handler_kwargs["endpoint"] = endpoint
+        handler_kwargs = dict(handler_kwargs, endpoint=endpoint)
         path = api_path + handler_path.lstrip("/").replace(
             "{name}", endpoint.name)
         yield path, handler_class, handler_kwargs
@@ -2,11 +2,10 @@
 
 from copy import deepcopy
 
-import jsonschema
 from tornado.concurrent import futures
-import tornado.web
 
 from .context import Context
+from .core.application import Application as BaseApplication
 from .endpoints import RootEndpoint
 from .handlers import DeprecatedHandler
 from .settings import get_default_settings
@@ -89,6 +88,8 @@ class WebAPI(object):
                     self.settings["deprecated_versions"]))
 
     def _validate_settings(self):
+        import jsonschema
+
         try:
             jsonschema.validate(self.settings, schemas.SETTINGS)
         except jsonschema.ValidationError as error:
@@ -134,12 +135,8 @@ def _build_versioned_handlers(endpoint, active_version, deprecated_versions):
     return handlers
 
 
-class Application(tornado.web.Application):
+class Application(BaseApplication):
 
     def __init__(self, settings, **tornado_settings):
-        super(Application, self).__init__(**tornado_settings)
-        self.name = settings["name"]
-        self.id = settings["id"]
-        self.version = settings["version"]
+        super(Application, self).__init__(settings, **tornado_settings)
         self.deprecated_versions = settings["deprecated_versions"]
-        self.server = settings["server"]
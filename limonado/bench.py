@@ -0,0 +1,461 @@
+# -*- coding: utf-8 -*-
+
+import base64
+from bisect import bisect_right
+import itertools
+import json
+import os
+import random
+import signal
+import time
+from urllib.parse import urlencode
+
+from tornado.gen import convert_yielded
+from tornado.gen import multi
+from tornado.gen import sleep
+from tornado.httpclient import HTTPError
+from tornado.httpclient import HTTPRequest
+from tornado.httpserver import HTTPServer
+from tornado.ioloop import IOLoop
+from tornado.netutil import bind_sockets
+
+__all__ = [
+    "BenchRequest",
+    "BenchResult",
+    "bench_api",
+    "compare_stats",
+    "parse_capture",
+    "parse_scenario",
+    "replay_api",
+    "run_benchmark",
+    "run_replay"
+]
+
+_PERCENTILES = (50, 90, 99)
+
+
+class BenchRequest:
+    """Request of a benchmark scenario, picked in proportion to ``weight``.
+
+    Results are reported by ``name``, by default the method and path.
+    Bodies which are not strings are sent as JSON.
+
+    """
+
+    def __init__(self, method, path, params=None, body=None, headers=None,
+                 weight=1, name=None):
+        if weight <= 0:
+            raise ValueError("weight must be positive")
+
+        self.method = method.upper()
+        self.path = path
+        self.params = dict(params or {})
+        self.headers = dict(headers or {})
+        if body is None or isinstance(body, (bytes, str)):
+            self.body = body
+        else:
+            self.body = json.dumps(body)
+            self.headers.setdefault("Content-Type", "application/json")
+
+        self.weight = weight
+        self.name = name or "{} {}".format(self.method, path)
+
+    def get_url(self, base_url):
+        url = base_url + self.path
+        if self.params:
+            url += "?" + urlencode(self.params, doseq=True)
+
+        return url
+
+
+def parse_scenario(scenario):
+    """Return the requests of a scenario.
+
+    A scenario is a list of requests, or a mapping with such a list as
+    ``requests``. Requests are mappings of ``BenchRequest`` arguments.
+
+    """
+    if isinstance(scenario, dict):
+        scenario = scenario.get("requests")
+
+    if not isinstance(scenario, list) or not scenario:
+        raise ValueError("scenario must contain requests")
+
+    requests = []
+    for index, item in enumerate(scenario):
+        try:
+            requests.append(BenchRequest(**item))
+        except (TypeError, ValueError) as error:
+            raise ValueError("invalid request {}: {}".format(index, error))
+
+    return requests
+
+
+class BenchResult:
+    """Latencies and statuses of benchmark requests, by request name."""
+
+    def __init__(self):
+        self.duration = 0
+        self._latencies = {}
+        self._statuses = {}
+
+    def record(self, name, latency, status):
+        self._latencies.setdefault(name, []).append(latency)
+        statuses = self._statuses.setdefault(name, {})
+        statuses[status] = statuses.get(status, 0) + 1
+
+    def get_stats(self):
+        """Return the stats of every request name and of all requests."""
+        stats = {
+            name: self._get_stats(latencies, self._statuses[name])
+            for name, latencies in self._latencies.items()
+        }
+        statuses = {}
+        for name_statuses in self._statuses.values():
+            for status, count in name_statuses.items():
+                statuses[status] = statuses.get(status, 0) + count
+
+        stats["total"] = self._get_stats(
+            list(itertools.chain.from_iterable(self._latencies.values())),
+            statuses)
+        return stats
+
+    def format(self):
+        lines = ["{:<32} {:>8} {:>7} {:>9} {:>9} {:>9} {:>9} {:>9}".format(
+            "request", "count", "errors", "req/s", "p50 ms", "p90 ms",
+            "p99 ms", "max ms")]
+        stats = self.get_stats()
+        names = sorted(name for name in stats if name != "total")
+        for name in names + ["total"]:
+            name_stats = stats[name]
+            lines.append(
+                "{:<32} {:>8} {:>7} {:>9.1f} {:>9.2f} {:>9.2f} {:>9.2f} "
+                "{:>9.2f}".format(
+                    name[:32], name_stats["count"], name_stats["errors"],
+                    name_stats["throughput"], name_stats["p50"],
+                    name_stats["p90"], name_stats["p99"], name_stats["max"]))
+
+        return "\n".join(lines)
+
+    def _get_stats(self, latencies, statuses):
+        latencies = sorted(latencies)
+        stats = {
+            "count": len(latencies),
+            # Connection errors and timeouts are reported with a 599.
+            "errors": sum(count for status, count in statuses.items()
+                          if status >= 400),
+            "statuses": statuses,
+            "throughput": len(latencies) / self.duration,
+            "max": latencies[-1] * 1000 if latencies else 0.0
+        }
+        for percentile in _PERCENTILES:
+            stats["p{}".format(percentile)] = (
+                _get_percentile(latencies, percentile) * 1000)
+
+        return stats
+
+
+async def run_benchmark(base_url, requests, concurrency=10, rate=None,
+                        duration=10, max_requests=None, warmup=0,
+                        seed=None, request_timeout=30):
+    """Send requests picked at random from ``requests`` to ``base_url``.
+
+    Without ``rate``, ``concurrency`` clients send requests one after the
+    other. With a ``rate`` (in requests per second), requests are sent
+    on schedule over at most ``concurrency`` connections and latencies
+    include the time spent waiting for a connection. Requests are sent
+    for ``duration`` seconds (or until ``max_requests`` were sent),
+    results of the first ``warmup`` seconds are left out.
+
+    """
+    sender = _Sender(base_url, concurrency, request_timeout)
+    result = BenchResult()
+    picker = _RequestPicker(requests, seed)
+    counter = itertools.count()
+    start_time = time.monotonic()
+    record_time = start_time + warmup
+    end_time = record_time + duration
+
+    async def _send(request, scheduled_time):
+        status = await sender.send(request)
+        if scheduled_time >= record_time:
+            result.record(request.name, time.monotonic() - scheduled_time,
+                          status)
+
+    def _next_request():
+        index = next(counter)
+        if max_requests is not None and index >= max_requests:
+            return None
+
+        return picker.pick()
+
+    async def _run_client():
+        while time.monotonic() < end_time:
+            request = _next_request()
+            if request is None:
+                break
+
+            await _send(request, time.monotonic())
+
+    async def _run_schedule():
+        pending = []
+        for index in itertools.count():
+            scheduled_time = start_time + index / rate
+            if scheduled_time >= end_time:
+                break
+
+            request = _next_request()
+            if request is None:
+                break
+
+            delay = scheduled_time - time.monotonic()
+            if delay > 0:
+                await sleep(delay)
+
+            # Sends the request without waiting for its response.
+            pending.append(convert_yielded(_send(request, scheduled_time)))
+
+        await multi(pending)
+
+    if rate is None:
+        await multi([_run_client() for _ in range(concurrency)])
+    else:
+        await _run_schedule()
+
+    result.duration = max(time.monotonic() - record_time, 1e-9)
+    return result
+
+
+def parse_capture(lines):
+    """Return the requests recorded by a ``TrafficCapture``.
+
+    Requests are returned with their time offset (in seconds) from the
+    first request, in order. They are named by method and route, so that
+    their latencies are reported by route. Requests with a body which
+    was not recorded can't be replayed, their count is returned too.
+
+    """
+    records = []
+    skipped = 0
+    for line in lines:
+        line = line.strip()
+        if not line:
+            continue
+
+        record = json.loads(line)
+        if record["body"] is None and record["body_size"]:
+            skipped += 1
+            continue
+
+        headers = {}
+        if record["content_type"] is not None:
+            headers["Content-Type"] = record["content_type"]
+
+        path = record["path"]
+        if record["query"]:
+            path += "?" + record["query"]
+
+        records.append((record["time"], BenchRequest(
+            record["method"],
+            path,
+            body=(None if record["body"] is None else
+                  base64.b64decode(record["body"])),
+            headers=headers,
+            name="{} {}".format(record["method"],
+                                record["route"] or record["path"]))))
+
+    records.sort(key=lambda item: item[0])
+    if not records:
+        return [], skipped
+
+    first_time = records[0][0]
+    return [(start_time - first_time, request)
+            for start_time, request in records], skipped
+
+
+async def run_replay(base_url, schedule, speed=1.0, concurrency=100,
+                     request_timeout=30):
+    """Send requests of a schedule (see ``parse_capture``) to ``base_url``.
+
+    Requests are sent at their original times divided by ``speed``, over
+    at most ``concurrency`` connections, latencies include the time spent
+    waiting for a connection. With a ``speed`` of 0, ``concurrency``
+    clients send them as fast as possible, in order.
+
+    """
+    sender = _Sender(base_url, concurrency, request_timeout)
+    result = BenchResult()
+    start_time = time.monotonic()
+
+    async def _send(request, scheduled_time):
+        status = await sender.send(request)
+        result.record(request.name, time.monotonic() - scheduled_time,
+                      status)
+
+    if speed:
+        pending = []
+        for offset, request in schedule:
+            scheduled_time = start_time + offset / speed
+            delay = scheduled_time - time.monotonic()
+            if delay > 0:
+                await sleep(delay)
+
+            pending.append(convert_yielded(_send(request, scheduled_time)))
+
+        await multi(pending)
+    else:
+        requests = iter([request for _, request in schedule])
+
+        async def _run_client():
+            for request in requests:
+                await _send(request, time.monotonic())
+
+        await multi([_run_client() for _ in range(concurrency)])
+
+    result.duration = max(time.monotonic() - start_time, 1e-9)
+    return result
+
+
+def compare_stats(baseline, stats):
+    """Format latency percentiles of ``stats`` against ``baseline``.
+
+    Both are stats as returned by ``BenchResult.get_stats`` (possibly
+    loaded from JSON), for instance of two builds replaying the same
+    capture.
+
+    """
+    lines = ["{:<32} {:>8} {:>19} {:>19} {:>19}".format(
+        "request", "count", "p50 ms", "p90 ms", "p99 ms")]
+    names = sorted(name for name in stats
+                   if name in baseline and name != "total")
+    for name in names + ["total"]:
+        columns = []
+        for percentile in _PERCENTILES:
+            key = "p{}".format(percentile)
+            before = baseline[name][key]
+            after = stats[name][key]
+            change = (after - before) / before * 100 if before else 0.0
+            columns.append("{:>8.2f} ({:+6.1f}%)".format(after, change))
+
+        lines.append("{:<32} {:>8} {}".format(
+            name[:32], stats[name]["count"], " ".join(columns)))
+
+    return "\n".join(lines)
+
+
+def bench_api(api, requests, enable=None, **kwargs):
+    """Serve ``api`` locally and benchmark it with ``run_benchmark``."""
+    return _serve_locally(
+        api, enable,
+        lambda base_url: run_benchmark(base_url, requests, **kwargs))
+
+
+def replay_api(api, schedule, enable=None, **kwargs):
+    """Serve ``api`` locally and replay a schedule with ``run_replay``."""
+    return _serve_locally(
+        api, enable,
+        lambda base_url: run_replay(base_url, schedule, **kwargs))
+
+
+def _serve_locally(api, enable, run):
+    """Run ``run(base_url)`` against ``api`` served on a local port.
+
+    The application is served by a forked child (by this process where
+    ``fork`` is not available), so that the load generation doesn't
+    compete with the server for the IOLoop. The child creates its own
+    IOLoop before creating the application: a loop which already exists
+    in this process shares its poller and callbacks with the child.
+
+    """
+    sockets = bind_sockets(0, "127.0.0.1")
+    base_url = "http://127.0.0.1:{}".format(sockets[0].getsockname()[1])
+    if not hasattr(os, "fork"):
+        HTTPServer(api.get_application(enable=enable)).add_sockets(sockets)
+        return IOLoop.current().run_sync(lambda: run(base_url))
+
+    read_fd, write_fd = os.pipe()
+    pid = os.fork()
+    if pid == 0:
+        os.close(read_fd)
+        _serve_child(api, enable, sockets, write_fd)
+
+    os.close(write_fd)
+    for sock in sockets:
+        sock.close()
+
+    try:
+        with os.fdopen(read_fd, "rb") as ready:
+            error = ready.read().decode("utf-8")
+
+        if error:
+            raise RuntimeError("can't serve the application: {}".format(
+                error))
+
+        return IOLoop.current().run_sync(lambda: run(base_url))
+    finally:
+        os.kill(pid, signal.SIGTERM)
+        os.waitpid(pid, 0)
+
+
+def _serve_child(api, enable, sockets, ready_fd):
+    """Serve ``api`` in a forked child, report errors on ``ready_fd``."""
+    try:
+        IOLoop().make_current()
+        try:
+            app = api.get_application(enable=enable)
+            HTTPServer(app).add_sockets(sockets)
+        except Exception as exc:
+            os.write(ready_fd, "{}: {}".format(
+                type(exc).__name__, exc).encode("utf-8"))
+            return
+
+        os.close(ready_fd)
+        IOLoop.current().start()
+    finally:
+        os._exit(0)
+
+
+class _Sender:
+    def __init__(self, base_url, concurrency, request_timeout):
+        from .contrib.upstream import UpstreamClient
+        from .metrics import MetricsRegistry
+
+        self._base_url = base_url
+        self._client = UpstreamClient(max_host_connections=concurrency,
+                                      request_timeout=request_timeout,
+                                      metrics=MetricsRegistry())
+
+    async def send(self, request):
+        """Send a request and return its status."""
+        try:
+            response = await self._client.fetch(
+                HTTPRequest(request.get_url(self._base_url),
+                            method=request.method,
+                            headers=request.headers,
+                            body=request.body,
+                            allow_nonstandard_methods=True),
+                raise_error=False)
+        except HTTPError as error:
+            return error.code
+
+        return response.code
+
+
+class _RequestPicker:
+    def __init__(self, requests, seed=None):
+        self._requests = list(requests)
+        self._weights = list(itertools.accumulate(
+            request.weight for request in self._requests))
+        self._random = random.Random(seed)
+
+    def pick(self):
+        position = self._random.random() * self._weights[-1]
+        return self._requests[bisect_right(self._weights, position)]
+
+
+def _get_percentile(values, percentile):
+    if not values:
+        return 0.0
+
+    rank = max(int(round(percentile / 100 * len(values))) - 1, 0)
+    return values[min(rank, len(values) - 1)]
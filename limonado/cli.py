@@ -6,9 +6,13 @@ from argparse import ArgumentError
 from argparse import ArgumentParser
 from argparse import ArgumentTypeError
 import collections
+from copy import deepcopy
 import errno
+from functools import partial
 import json
 import logging
+import os
+import signal
 import sys
 
 __all__ = ["BaseCli", "run"]
@@ -26,18 +30,21 @@ class BaseCli:
     def create_api(self, args):
         raise NotImplementedError
 
-    def run(self):
-        parser = self.create_parser()
-        args = parser.parse_args()
-        api = self.create_api(args)
-        settings = args.settings
-        _add_inline_settings(args.inline_settings, settings)
-        api.settings.update(settings)
-        if args.disable:
-            enable = api.endpoint_names - set(args.disable)
-        else:
-            enable = args.enable or None
+    def run(self, argv=None):
+        """Serve the API, or run the ``bench`` or ``replay`` subcommand."""
+        if argv is None:
+            argv = sys.argv[1:]
+
+        if argv[:1] == ["bench"]:
+            return self.bench(argv[1:])
+        elif argv[:1] == ["replay"]:
+            return self.replay(argv[1:])
 
+        parser = self.create_parser()
+        args = parser.parse_args(argv)
+        api, defaults, enable = self._configure_api(args)
+        api.settings_source = partial(self._reload_settings, defaults, args)
+        _handle_reload_signal(api)
         log.info("Starting server '%s' on %s:%i", api.settings["id"],
                  args.address, args.port)
         try:
@@ -47,21 +54,153 @@ class BaseCli:
                           api.settings["id"], args.address, args.port)
             sys.exit(errno.EINTR)
 
+    def bench(self, argv=None):
+        """Serve the API locally and replay a scenario against it.
+
+        The scenario file (read with ``loader``) lists requests, see
+        ``limonado.bench.parse_scenario``. Throughput and latency
+        percentiles are printed by request.
+
+        """
+        from .bench import bench_api
+        from .bench import parse_scenario
+
+        parser = self.create_bench_parser()
+        args = parser.parse_args(argv)
+        try:
+            with open(args.scenario) as handle:
+                requests = parse_scenario(self.loader(handle))
+        except Exception as exc:
+            parser.error("can't load scenario: {}".format(exc))
+
+        api, _, enable = self._configure_api(args)
+        result = bench_api(
+            api,
+            requests,
+            enable=enable,
+            concurrency=args.concurrency,
+            rate=args.rate,
+            duration=args.duration,
+            max_requests=args.requests,
+            warmup=args.warmup,
+            seed=args.seed)
+        print(result.format())
+
+    def replay(self, argv=None):
+        """Serve the API locally and replay a traffic capture against it.
+
+        Captures are recorded by ``limonado.contrib.capture``. Latency
+        percentiles are printed by route, and compared to the ones of a
+        previous replay (e.g. of another build) saved with ``--output``
+        if given as ``--baseline``.
+
+        """
+        from .bench import compare_stats
+        from .bench import parse_capture
+        from .bench import replay_api
+
+        parser = self.create_replay_parser()
+        args = parser.parse_args(argv)
+        try:
+            with open(args.capture) as handle:
+                schedule, skipped = parse_capture(handle)
+
+            baseline = None
+            if args.baseline is not None:
+                with open(args.baseline) as handle:
+                    baseline = json.load(handle)
+        except (OSError, ValueError, KeyError) as exc:
+            parser.error("can't load capture: {}".format(exc))
+
+        if skipped:
+            log.warning("Skipping %i requests without recorded body",
+                        skipped)
+
+        api, _, enable = self._configure_api(args)
+        result = replay_api(
+            api,
+            schedule,
+            enable=enable,
+            speed=args.speed,
+            concurrency=args.concurrency)
+        stats = result.get_stats()
+        if args.output is not None:
+            with open(args.output, "w") as handle:
+                json.dump(stats, handle)
+
+        if baseline is None:
+            print(result.format())
+        else:
+            print(compare_stats(baseline, stats))
+
     def create_parser(self):
         parser = ArgumentParser()
         parser.add_argument("--port", type=int, default=8000)
         parser.add_argument("--address", default="")
+        self._add_api_arguments(parser)
+        return parser
+
+    def create_bench_parser(self):
+        parser = ArgumentParser(
+            prog="{} bench".format(os.path.basename(sys.argv[0])))
+        parser.add_argument("scenario")
+        parser.add_argument("--concurrency", type=int, default=10)
+        parser.add_argument("--rate", type=float)
+        parser.add_argument("--duration", type=float, default=10)
+        parser.add_argument("--requests", type=int)
+        parser.add_argument("--warmup", type=float, default=0)
+        parser.add_argument("--seed", type=int)
+        self._add_api_arguments(parser)
+        return parser
+
+    def create_replay_parser(self):
+        parser = ArgumentParser(
+            prog="{} replay".format(os.path.basename(sys.argv[0])))
+        parser.add_argument("capture")
+        parser.add_argument("--speed", type=float, default=1.0)
+        parser.add_argument("--concurrency", type=int, default=100)
+        parser.add_argument("--output")
+        parser.add_argument("--baseline")
+        self._add_api_arguments(parser)
+        return parser
+
+    def _add_api_arguments(self, parser):
+        self._settings_type = _SettingsType(self.loader)
         parser.add_argument("--enable", action="append")
         parser.add_argument("--disable", action="append")
-        parser.add_argument(
-            "--settings", type=_SettingsType(self.loader), default={})
+        parser.add_argument("--settings", type=self._settings_type, default={})
         parser.add_argument(
             "--set",
             dest="inline_settings",
             action=_AppendSettingAction,
             default=[])
         self.add_arguments(parser)
-        return parser
+
+    def _configure_api(self, args):
+        api = self.create_api(args)
+        defaults = deepcopy(api.settings)
+        settings = args.settings
+        _add_inline_settings(args.inline_settings, settings)
+        api.settings.update(settings)
+        if args.disable:
+            enable = api.endpoint_names - set(args.disable)
+        else:
+            enable = args.enable or None
+
+        return api, defaults, enable
+
+    def _reload_settings(self, defaults, args):
+        """Re-read the settings file and re-apply inline settings."""
+        path = self._settings_type.path
+        try:
+            settings = self._settings_type(path) if path else {}
+        except ArgumentTypeError as error:
+            raise ValueError(error)
+
+        _add_inline_settings(args.inline_settings, settings)
+        reloaded = deepcopy(defaults)
+        reloaded.update(settings)
+        return reloaded
 
 
 def run(api, **kwargs):
@@ -72,6 +211,28 @@ def run(api, **kwargs):
     Cli(**kwargs).run()
 
 
+def _handle_reload_signal(api):
+    if not hasattr(signal, "SIGHUP"):
+        return
+
+    from tornado.ioloop import IOLoop
+
+    ioloop = IOLoop.current()
+
+    def _handler(signum, frame):
+        ioloop.add_callback_from_signal(_reload, api)
+
+    signal.signal(signal.SIGHUP, _handler)
+
+
+def _reload(api):
+    log.info("Reloading server '%s'", api.settings["id"])
+    try:
+        api.reload()
+    except Exception:
+        log.exception("Failed to reload server '%s'", api.settings["id"])
+
+
 def _add_inline_settings(inline_settings, settings):
     for path, value in inline_settings:
         keys = path.split(".")
@@ -141,6 +302,7 @@ class _AppendSettingAction(Action):
 class _SettingsType:
     def __init__(self, loader):
         self.loader = loader
+        self.path = None
 
     def __call__(self, path):
         try:
@@ -148,6 +310,7 @@ class _SettingsType:
         except OSError:
             raise ArgumentTypeError("can't open '{}'".format(path))
         else:
+            self.path = path
             settings = self._load(handle)
             handle.close()
             return settings
@@ -0,0 +1,179 @@
+# -*- coding: utf-8 -*-
+
+from collections import deque
+import json
+import logging
+import random
+import threading
+import time
+
+from ..metrics import default_registry
+
+__all__ = ["AccessLog"]
+
+log = logging.getLogger(__name__)
+
+_FIELDS = ("time", "endpoint", "route", "method", "status", "latency_ms",
+           "bytes_sent", "bytes_received", "user")
+
+
+class AccessLog:
+    """Structured access log, buffered and written by a background thread.
+
+    Pass it as the ``access_log`` object of a ``WebAPI`` (or set it as
+    ``access_log`` of an ``EndpointHandler`` subclass) to replace
+    Tornado's access log for its requests::
+
+        api = WebAPI(objects=dict(
+            access_log=AccessLog(sample_rates={"2xx": 0.01})))
+
+    Finished requests are pushed as compact records into a ring buffer
+    of ``buffer_size`` records, the oldest records are dropped (and
+    counted) when it overflows. The writer thread wakes up every
+    ``flush_interval`` seconds, or once ``batch_size`` records are
+    buffered, and writes them as JSON lines: in one write per batch to
+    ``stream`` if given, else one message per record to the
+    ``limonado.access`` logger.
+
+    ``sample_rates`` maps status codes (e.g. ``404``) or classes (e.g.
+    ``"2xx"``) to the fraction of requests logged, other requests are
+    logged with ``default_sample_rate``.
+
+    """
+
+    metrics_prefix = "access_log"
+
+    def __init__(self,
+                 stream=None,
+                 buffer_size=10000,
+                 batch_size=500,
+                 flush_interval=1,
+                 sample_rates=None,
+                 default_sample_rate=1.0,
+                 metrics=None):
+        if metrics is None:
+            metrics = default_registry
+
+        self._stream = stream
+        self._logger = logging.getLogger("limonado.access")
+        self._buffer_size = buffer_size
+        self._batch_size = batch_size
+        self._flush_interval = flush_interval
+        self._class_rates = [default_sample_rate] * 6
+        self._status_rates = {}
+        for status, rate in (sample_rates or {}).items():
+            if isinstance(status, str) and status.endswith("xx"):
+                self._class_rates[int(status[0])] = rate
+            else:
+                self._status_rates[int(status)] = rate
+
+        self._buffer = deque(maxlen=buffer_size)
+        self._wakeup = threading.Event()
+        self._lock = threading.Lock()
+        self._thread = None
+        self._stopping = False
+        self._written = metrics.counter(self.metrics_prefix + "_written")
+        self._dropped = metrics.counter(self.metrics_prefix + "_dropped")
+        self._sampled_out = metrics.counter(
+            self.metrics_prefix + "_sampled_out")
+
+    @property
+    def stats(self):
+        return {
+            "buffered": len(self._buffer),
+            "written": self._written.value,
+            "dropped": self._dropped.value,
+            "sampled_out": self._sampled_out.value
+        }
+
+    def log_request(self, handler):
+        if self.is_sampled(handler.get_status()):
+            self.push(self.get_record(handler))
+
+    def is_sampled(self, status):
+        rate = self._status_rates.get(status)
+        if rate is None:
+            rate = self._class_rates[min(status // 100, 5)]
+
+        if rate < 1 and random.random() >= rate:
+            self._sampled_out.inc()
+            return False
+
+        return True
+
+    def get_record(self, handler):
+        request = handler.request
+        endpoint = getattr(handler, "endpoint", None)
+        user = getattr(handler, "_current_user", None)
+        return (
+            time.time(),
+            getattr(endpoint, "name", None),
+            getattr(request, "route", None),
+            request.method,
+            handler.get_status(),
+            round(request.request_time() * 1000, 3),
+            int(handler._headers.get("Content-Length", 0)),
+            len(request.body or b""),
+            getattr(user, "id", None)
+        )
+
+    def push(self, record):
+        if len(self._buffer) >= self._buffer_size:
+            self._dropped.inc()
+
+        self._buffer.append(record)
+        if self._thread is None:
+            self.start()
+        elif len(self._buffer) >= self._batch_size:
+            self._wakeup.set()
+
+    def format(self, record):
+        return json.dumps(dict(zip(_FIELDS, record)), separators=(",", ":"))
+
+    def write(self, lines):
+        if self._stream is None:
+            for line in lines:
+                self._logger.info(line)
+        else:
+            self._stream.write("".join(line + "\n" for line in lines))
+            self._stream.flush()
+
+    def start(self):
+        with self._lock:
+            if self._thread is None:
+                self._stopping = False
+                self._thread = threading.Thread(
+                    target=self._run, name="limonado-access-log", daemon=True)
+                self._thread.start()
+
+    def stop(self, timeout=None):
+        """Stop the writer thread once buffered records are written."""
+        with self._lock:
+            thread = self._thread
+            self._thread = None
+
+        if thread is not None:
+            self._stopping = True
+            self._wakeup.set()
+            thread.join(timeout)
+
+    def _run(self):
+        while not self._stopping:
+            self._wakeup.wait(self._flush_interval)
+            self._wakeup.clear()
+            self._drain()
+
+        self._drain()
+
+    def _drain(self):
+        while self._buffer:
+            batch = []
+            while self._buffer and len(batch) < self._batch_size:
+                batch.append(self._buffer.popleft())
+
+            try:
+                self.write([self.format(record) for record in batch])
+            except Exception:
+                log.exception("Failed to write access log records")
+            else:
+                self._written.inc(len(batch))
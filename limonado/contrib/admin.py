@@ -0,0 +1,192 @@
+# -*- coding: utf-8 -*-
+
+from ..core.endpoint import Endpoint
+from ..core.endpoint import EndpointAddon
+from ..core.endpoint import EndpointHandler
+from ..exceptions import APIError
+from .capture import CaptureAddon
+from .memory import MemoryAddon
+
+_RELOAD_SCHEMA = {
+    "additionalProperties": False,
+    "type": "object",
+    "properties": {
+        "enable": {
+            "type": "array",
+            "items": {
+                "type": "string"
+            }
+        },
+        "disable": {
+            "type": "array",
+            "items": {
+                "type": "string"
+            }
+        }
+    }
+}
+
+
+class ReloadHandler(EndpointHandler):
+    def initialize(self, endpoint, addon):
+        super().initialize(endpoint)
+        self.addon = addon
+
+    def post(self):
+        data = self.get_json(_RELOAD_SCHEMA) or {}
+        api = self.application.api
+        if api is None:
+            raise APIError(501, "Reload not supported")
+
+        enable = None
+        if "enable" in data or "disable" in data:
+            enable = set(data.get("enable", api.enabled_endpoint_names))
+            enable.difference_update(data.get("disable", []))
+            enable.add(self.endpoint.name)
+
+        try:
+            api.reload(enable=enable)
+        except ValueError as error:
+            raise APIError(
+                400, "Reload failed", details={"reason": str(error)})
+
+        self.write_json({"endpoints": sorted(api.enabled_endpoint_names)})
+        self.finish()
+
+
+class ReloadAddon(EndpointAddon):
+    """Reload settings and enable or disable endpoints on POST.
+
+    Settings are re-read through ``WebAPI.settings_source`` (set by the
+    CLI), enabled endpoints are given by the optional ``enable`` and
+    ``disable`` lists of the request body. The endpoint serving the
+    reload is always kept enabled.
+
+    """
+
+    def __init__(self, endpoint, path="{name}/reload",
+                 handler_class=ReloadHandler):
+        super().__init__(endpoint)
+        self._path = path
+        self._handler_class = handler_class
+
+    @property
+    def handlers(self):
+        return [(self._path, self._handler_class, dict(addon=self))]
+
+
+class RequestsHandler(EndpointHandler):
+    def initialize(self, endpoint, addon):
+        super().initialize(endpoint)
+        self.addon = addon
+
+    def get(self):
+        watchdog = self.addon.watchdog
+        if watchdog is None:
+            raise APIError(501, "Request watchdog not enabled")
+
+        self.write_json({"requests": watchdog.get_active_requests()})
+        self.finish()
+
+
+class RequestsAddon(EndpointAddon):
+    """List active requests tracked by a request watchdog, oldest first.
+
+    The watchdog defaults to the one of the context (see
+    ``limonado.contrib.watchdog``).
+
+    """
+
+    def __init__(self, endpoint, path="{name}/requests",
+                 handler_class=RequestsHandler, watchdog=None):
+        super().__init__(endpoint)
+        self._path = path
+        self._handler_class = handler_class
+        self._watchdog = watchdog
+
+    @property
+    def watchdog(self):
+        if self._watchdog is None:
+            return self.context.watchdog
+
+        return self._watchdog
+
+    @property
+    def handlers(self):
+        return [(self._path, self._handler_class, dict(addon=self))]
+
+
+class AdminAccessAddon(EndpointAddon):
+    """Restrict all the handlers of an endpoint to users with ``scopes``.
+
+    Users are resolved by ``authenticator``, by default the one of the
+    context. Requests without a user get a 401, users which
+    are neither superusers nor have one of the scopes a 403.
+
+    """
+
+    def __init__(self, endpoint, scopes=("admin",), authenticator=None):
+        super().__init__(endpoint)
+        if not scopes:
+            raise ValueError("scopes must not be empty")
+
+        self._scopes = frozenset(scopes)
+        self._authenticator = authenticator
+
+    @property
+    def handlers(self):
+        return []
+
+    @property
+    def authenticator(self):
+        if self._authenticator is None:
+            return self.context.authenticator
+
+        return self._authenticator
+
+    def prepare_request(self, handler):
+        authenticator = self.authenticator
+        if authenticator is None:
+            raise APIError(501, "Authentication not configured")
+
+        if authenticator is not handler.authenticator:
+            future = authenticator.resolve_user(handler)
+            if future is not None:
+                return self._check_after(future, handler)
+
+        self._check(handler)
+
+    def finish_request(self, handler):
+        pass
+
+    async def _check_after(self, future, handler):
+        await future
+        self._check(handler)
+
+    def _check(self, handler):
+        user = handler.current_user
+        if user is None:
+            raise APIError(401, "Not Authenticated")
+
+        if not user.is_superuser and self._scopes.isdisjoint(user.scopes):
+            raise APIError(403, "Access Denied")
+
+
+class AdminEndpoint(Endpoint):
+    """Administrative endpoint, restricted to users with ``scopes``.
+
+    Users are resolved by ``authenticator``, by default the one of the
+    context: the endpoint can't be enabled without one.
+
+    """
+
+    name = "admin"
+    addons = [ReloadAddon, RequestsAddon, MemoryAddon, CaptureAddon]
+
+    def __init__(self, context, scopes=("admin",), authenticator=None):
+        if authenticator is None and context.authenticator is None:
+            raise ValueError("admin endpoint requires an authenticator")
+
+        super().__init__(context)
+        self.add_addon(AdminAccessAddon, addon_kwargs=dict(
+            scopes=scopes, authenticator=authenticator))
@@ -0,0 +1,251 @@
+# -*- coding: utf-8 -*-
+
+from collections import deque
+import inspect
+import logging
+import time
+
+from tornado.gen import coroutine
+
+from ..exceptions import APIError
+from ..metrics import default_registry
+from .health import HealthIssue
+
+__all__ = ["CircuitBreaker"]
+
+log = logging.getLogger(__name__)
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+class CircuitBreaker:
+    """Fail fast on calls to a dependency which keeps failing or slowing.
+
+    Outcomes of the last ``window_size`` calls are recorded. Once at least
+    ``minimum_calls`` were made and the rate of failed calls reaches
+    ``failure_rate_threshold``, or the rate of calls slower than
+    ``slow_call_duration`` seconds reaches ``slow_call_rate_threshold``,
+    the circuit opens: calls are rejected with a 503 without reaching the
+    dependency. After ``open_duration`` seconds the circuit is half-open
+    and lets ``half_open_calls`` probing calls through, their outcomes
+    decide whether it closes or opens again. Probes which are not
+    recorded within ``half_open_timeout`` seconds (by default
+    ``open_duration``) are given up, new probes are then let through.
+
+    Calls go through ``call``, or are recorded explicitly with the
+    generation returned by ``before_call``::
+
+        generation = breaker.before_call()
+        start_time = breaker.timer()
+        try:
+            ...
+        except ConnectionError:
+            breaker.record(breaker.timer() - start_time, failed=True,
+                           generation=generation)
+            raise
+        else:
+            breaker.record(breaker.timer() - start_time,
+                           generation=generation)
+
+    The generation changes with every state change (and half-open
+    round), outcomes of calls which started in another generation are
+    ignored: e.g. calls made while closed which end after the circuit
+    opened don't count as probes.
+
+    Exceptions which are instances of ``failure_exceptions`` count as
+    failures, others are re-raised without being recorded as such.
+
+    Breakers registered as context objects are checked by ``HealthAddon``:
+    an open or half-open circuit is reported.
+
+    """
+
+    def __init__(self,
+                 name="breaker",
+                 failure_rate_threshold=0.5,
+                 slow_call_rate_threshold=1.0,
+                 slow_call_duration=5,
+                 window_size=50,
+                 minimum_calls=10,
+                 open_duration=30,
+                 half_open_calls=3,
+                 half_open_timeout=None,
+                 failure_exceptions=(Exception, ),
+                 timer=time.monotonic,
+                 metrics=None):
+        if not 0 < minimum_calls <= window_size or half_open_calls < 1:
+            raise ValueError("invalid circuit breaker window")
+
+        if metrics is None:
+            metrics = default_registry
+
+        self._name = name
+        self._failure_rate_threshold = failure_rate_threshold
+        self._slow_call_rate_threshold = slow_call_rate_threshold
+        self._slow_call_duration = slow_call_duration
+        self._minimum_calls = minimum_calls
+        self._open_duration = open_duration
+        self._half_open_calls = half_open_calls
+        if half_open_timeout is None:
+            half_open_timeout = open_duration
+
+        self._half_open_timeout = half_open_timeout
+        self._failure_exceptions = failure_exceptions
+        self._timer = timer
+        self._window = deque(maxlen=window_size)
+        self._failures = 0
+        self._slow_calls = 0
+        self._state = CLOSED
+        self._generation = 0
+        self._changed_at = None
+        self._permits = 0
+        self._rejected = metrics.counter("circuit_breaker_rejected",
+                                         breaker=name)
+        self._opened = metrics.counter("circuit_breaker_opened",
+                                       breaker=name)
+
+    @property
+    def name(self):
+        return self._name
+
+    @property
+    def timer(self):
+        return self._timer
+
+    @property
+    def state(self):
+        if self._state == OPEN:
+            if self._timer() - self._changed_at >= self._open_duration:
+                self._transition(HALF_OPEN)
+        elif self._state == HALF_OPEN:
+            if self._timer() - self._changed_at >= self._half_open_timeout:
+                # Probes were not all recorded, let new ones through.
+                self._transition(HALF_OPEN, force=True)
+
+        return self._state
+
+    @property
+    def generation(self):
+        return self._generation
+
+    @property
+    def stats(self):
+        calls = len(self._window)
+        return {
+            "state": self.state,
+            "calls": calls,
+            "failure_rate": self._failures / calls if calls else 0.0,
+            "slow_call_rate": self._slow_calls / calls if calls else 0.0,
+            "rejected": self._rejected.value
+        }
+
+    def before_call(self):
+        """Return the current generation if the call is permitted.
+
+        Raise a 503 ``APIError`` otherwise.
+
+        """
+        state = self.state
+        if state == CLOSED:
+            return self._generation
+
+        if state == HALF_OPEN and self._permits > 0:
+            self._permits -= 1
+            return self._generation
+
+        self._rejected.inc()
+        raise APIError(503, "Circuit '{}' is open".format(self._name))
+
+    def record(self, duration, failed=False, generation=None):
+        """Record the outcome of a call started in ``generation``.
+
+        Without ``generation``, outcomes count in the current one unless
+        the circuit is open.
+
+        """
+        if generation is None:
+            if self._state == OPEN:
+                return
+        elif generation != self._generation:
+            # Late outcome of a call made in a previous state.
+            return
+
+        slow = duration >= self._slow_call_duration
+        if len(self._window) == self._window.maxlen:
+            old_failed, old_slow = self._window[0]
+            self._failures -= old_failed
+            self._slow_calls -= old_slow
+
+        self._window.append((failed, slow))
+        self._failures += failed
+        self._slow_calls += slow
+        if self._state == HALF_OPEN:
+            if len(self._window) >= self._half_open_calls:
+                if self._is_tripped():
+                    self._transition(OPEN)
+                else:
+                    self._transition(CLOSED)
+        elif (len(self._window) >= self._minimum_calls
+              and self._is_tripped()):
+            self._transition(OPEN)
+
+    @coroutine
+    def call(self, func, *args, **kwargs):
+        """Call ``func``, which may return a Future or be a coroutine."""
+        generation = self.before_call()
+        start_time = self._timer()
+        try:
+            result = func(*args, **kwargs)
+            if inspect.isawaitable(result):
+                result = yield result
+        except self._failure_exceptions:
+            self.record(self._timer() - start_time, failed=True,
+                        generation=generation)
+            raise
+        except Exception:
+            self.record(self._timer() - start_time, generation=generation)
+            raise
+
+        self.record(self._timer() - start_time, generation=generation)
+        return result
+
+    def reset(self):
+        self._transition(CLOSED)
+        self._clear()
+
+    def check_health(self):
+        state = self.state
+        if state != CLOSED:
+            raise HealthIssue(
+                "Circuit '{}' is {}".format(self._name,
+                                            state.replace("_", "-")),
+                self.stats)
+
+    def _is_tripped(self):
+        calls = len(self._window)
+        return (self._failures >= self._failure_rate_threshold * calls or
+                self._slow_calls >= self._slow_call_rate_threshold * calls)
+
+    def _clear(self):
+        self._window.clear()
+        self._failures = 0
+        self._slow_calls = 0
+
+    def _transition(self, state, force=False):
+        if state == self._state and not force:
+            return
+
+        self._state = state
+        self._generation += 1
+        self._changed_at = self._timer()
+        self._clear()
+        if state == OPEN:
+            self._opened.inc()
+            log.warning("Circuit '%s' opened", self._name)
+        elif state == HALF_OPEN:
+            self._permits = self._half_open_calls
+            log.info("Circuit '%s' is half-open", self._name)
+        else:
+            log.info("Circuit '%s' closed", self._name)
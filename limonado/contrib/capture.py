@@ -0,0 +1,165 @@
+# -*- coding: utf-8 -*-
+
+import base64
+import hashlib
+import json
+
+from ..core.endpoint import EndpointAddon
+from ..core.endpoint import EndpointHandler
+from ..exceptions import APIError
+from .access_log import AccessLog
+
+__all__ = ["CaptureAddon", "TrafficCapture"]
+
+_FIELDS = ("time", "endpoint", "route", "method", "path", "query", "status",
+           "latency_ms", "content_type", "body", "body_size", "body_hash")
+
+_SAMPLE_RATE_SCHEMA = {
+    "additionalProperties": False,
+    "type": "object",
+    "properties": {
+        "sample_rate": {
+            "type": "number",
+            "minimum": 0,
+            "maximum": 1
+        }
+    },
+    "required": ["sample_rate"]
+}
+
+
+class TrafficCapture(AccessLog):
+    """Sampled capture of requests, to be replayed (see ``limonado.bench``).
+
+    Pass it as the ``capture`` object of a ``WebAPI`` to record a fraction
+    (``sample_rate``) of the requests as JSON lines appended to the file
+    at ``path``: start time, route, method, path, query string, status,
+    latency and a hash of the body. Bodies themselves (base64 encoded)
+    are only recorded with ``bodies``, up to ``max_body_size`` bytes.
+
+    Requests which are not sampled cost a random number, records are
+    buffered and written by a background thread like the ones of
+    ``AccessLog`` (see it for the other arguments).
+
+    """
+
+    metrics_prefix = "capture"
+
+    def __init__(self,
+                 path,
+                 sample_rate=0.01,
+                 bodies=False,
+                 max_body_size=64 * 1024,
+                 buffer_size=10000,
+                 batch_size=500,
+                 flush_interval=1,
+                 metrics=None):
+        super().__init__(
+            stream=open(path, "a", encoding="utf-8"),
+            buffer_size=buffer_size,
+            batch_size=batch_size,
+            flush_interval=flush_interval,
+            default_sample_rate=sample_rate,
+            metrics=metrics)
+        self._path = path
+        self._bodies = bodies
+        self._max_body_size = max_body_size
+
+    @property
+    def path(self):
+        return self._path
+
+    @property
+    def sample_rate(self):
+        return self._class_rates[0]
+
+    @sample_rate.setter
+    def sample_rate(self, rate):
+        self._class_rates = [rate] * len(self._class_rates)
+
+    def get_record(self, handler):
+        request = handler.request
+        body = request.body or b""
+        recorded_body = None
+        if self._bodies and len(body) <= self._max_body_size:
+            recorded_body = base64.b64encode(body).decode("ascii")
+
+        return (
+            request._start_time,
+            getattr(getattr(handler, "endpoint", None), "name", None),
+            getattr(request, "route", None),
+            request.method,
+            request.path,
+            request.query,
+            handler.get_status(),
+            round(request.request_time() * 1000, 3),
+            request.headers.get("Content-Type"),
+            recorded_body,
+            len(body),
+            hashlib.sha1(body).hexdigest() if body else None
+        )
+
+    def format(self, record):
+        return json.dumps(dict(zip(_FIELDS, record)), separators=(",", ":"))
+
+    def stop(self, timeout=None):
+        super().stop(timeout)
+        self._stream.close()
+
+
+class CaptureHandler(EndpointHandler):
+    def initialize(self, endpoint, addon):
+        super().initialize(endpoint)
+        self.addon = addon
+
+    def get(self):
+        self.write_json(self._get_state())
+        self.finish()
+
+    def put(self):
+        data = self.get_json(_SAMPLE_RATE_SCHEMA)
+        if data is None:
+            raise APIError(400, "Missing body")
+
+        self._get_capture().sample_rate = data["sample_rate"]
+        self.write_json(self._get_state())
+        self.finish()
+
+    def _get_capture(self):
+        capture = self.addon.capture
+        if capture is None:
+            raise APIError(501, "Traffic capture not enabled")
+
+        return capture
+
+    def _get_state(self):
+        capture = self._get_capture()
+        state = {"path": capture.path, "sample_rate": capture.sample_rate}
+        state.update(capture.stats)
+        return state
+
+
+class CaptureAddon(EndpointAddon):
+    """Show the state of a traffic capture and change its sample rate.
+
+    The capture defaults to the one of the context.
+
+    """
+
+    def __init__(self, endpoint, path="{name}/capture",
+                 handler_class=CaptureHandler, capture=None):
+        super().__init__(endpoint)
+        self._path = path
+        self._handler_class = handler_class
+        self._capture = capture
+
+    @property
+    def capture(self):
+        if self._capture is None:
+            return self.context.capture
+
+        return self._capture
+
+    @property
+    def handlers(self):
+        return [(self._path, self._handler_class, dict(addon=self))]
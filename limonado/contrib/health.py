@@ -1,13 +1,22 @@
 # -*- coding: utf-8 -*-
 
 import functools
+import logging
 import time
 
-from tornado.gen import coroutine
+from tornado.escape import json_encode
+from tornado.gen import convert_yielded
+from tornado.gen import sleep
+from tornado.ioloop import IOLoop
+from tornado.locks import Event
 
 from ..core.endpoint import Endpoint
 from ..core.endpoint import EndpointAddon
 from ..core.endpoint import EndpointHandler
+from ..exceptions import APIError
+from ..utils.executor import get_class_executor
+
+log = logging.getLogger(__name__)
 
 _HEALTH_PARAMS = {
     "additionalProperties": False,
@@ -25,6 +34,12 @@ _HEALTH_PARAMS = {
 
 
 def cache_health(ttl):
+    """Cache the outcome of a health check for ``ttl`` seconds.
+
+    The decorated check returns a Future, like the ``gen.coroutine`` it
+    used to be.
+
+    """
     if hasattr(ttl, "total_seconds"):
         ttl_seconds = ttl.total_seconds()
     else:
@@ -34,16 +49,16 @@ def cache_health(ttl):
         issue = None
         expiration_time = None
 
-        @coroutine
-        @functools.wraps(check)
-        def wrap(*args, **kwargs):
+        async def run(*args, **kwargs):
             nonlocal issue, expiration_time
             if expiration_time is not None and time.time() <= expiration_time:
                 if issue is not None:
                     raise issue
             else:
                 try:
-                    yield check(*args, **kwargs)
+                    result = check(*args, **kwargs)
+                    if result is not None:
+                        await convert_yielded(result)
                 except HealthIssue as exc:
                     issue = exc
                     raise
@@ -52,53 +67,238 @@ def cache_health(ttl):
                 finally:
                     expiration_time = time.time() + ttl_seconds
 
+        @functools.wraps(check)
+        def wrap(*args, **kwargs):
+            return convert_yielded(run(*args, **kwargs))
+
         return wrap
 
     return decorate
 
 
+def check_endpoints(endpoint):
+    """Report lazy endpoints which failed to load or are still preloading.
+
+    Endpoints loaded on first request are not reported while pending, as
+    they would otherwise never become ready.
+
+    """
+    states = {}
+    for name, lazy_endpoint in endpoint.context.lazy_endpoints.items():
+        state = lazy_endpoint.state
+        if state == "failed" or (lazy_endpoint.preload and state != "ready"):
+            states[name] = state
+
+    if states:
+        raise HealthIssue("Endpoints not ready", states)
+
+
 class HealthHandler(EndpointHandler):
     def initialize(self, endpoint, addon):
         super().initialize(endpoint)
         self.addon = addon
+        self.priority_class = addon.priority_class
 
-    @coroutine
-    def head(self):
-        health = yield self.check_health()
+    async def head(self):
+        health = await self.check_health()
         if health["status"] == "unhealthy":
             self.set_status(self.addon.unhealthy_status)
 
         self.finish()
 
-    @coroutine
-    def get(self):
-        health = yield self.check_health()
+    async def get(self):
+        health = await self.check_health()
         if health["status"] == "unhealthy":
             self.set_status(self.addon.unhealthy_status)
 
         self.write_json(health)
         self.finish()
 
-    @coroutine
     def check_health(self):
+        """Return a Future of the health of the endpoint."""
+        return convert_yielded(self._check_health())
+
+    async def _check_health(self):
         params = self.get_params(_HEALTH_PARAMS)
-        issues = yield self.addon.check_health(include=params.get("check"))
+        issues = await self.addon.check_health(include=params.get("check"))
         status = "unhealthy" if issues else "healthy"
         return {"status": status, "issues": issues}
 
 
+class HealthStreamHandler(EndpointHandler):
+    """Stream health changes as Server-Sent Events.
+
+    An event with the health (as returned by ``HealthHandler``) is sent
+    on connection, then whenever it changes. Comments are sent as
+    heartbeats in between.
+
+    """
+
+    def initialize(self, endpoint, addon):
+        super().initialize(endpoint)
+        self.addon = addon
+        self.priority_class = addon.priority_class
+        self._closed = Event()
+
+    async def get(self):
+        params = self.get_params(_HEALTH_PARAMS)
+        stream = self.addon.stream
+        if stream.is_full:
+            raise APIError(503, "Too many health subscribers")
+
+        # Streams last as long as clients stay connected.
+        if self.watchdog is not None:
+            self.watchdog.untrack(self)
+
+        # Headers are sent before any event.
+        self.set_header("Content-Type", "text/event-stream")
+        self.set_header("Cache-Control", "no-cache")
+        self.flush()
+        stream.subscribe(self, include=params.get("check"))
+        await self._closed.wait()
+
+    def send(self, chunk):
+        if not self._closed.is_set():
+            self.write(chunk)
+            self.flush().add_done_callback(_ignore_error)
+
+    def on_connection_close(self):
+        self.addon.stream.unsubscribe(self)
+        self._closed.set()
+        super().on_connection_close()
+
+
+class HealthStream:
+    """Health checks shared by the subscribers of health streams.
+
+    Checks run every ``interval`` seconds in a single loop while there
+    are subscribers, whatever their number. Subscribers are sent the
+    health they subscribed to when it changes, and a heartbeat when
+    nothing was sent to them for ``heartbeat_interval`` seconds. At most
+    ``max_subscribers`` are accepted, others get a 503.
+
+    """
+
+    def __init__(self, addon, interval=5, heartbeat_interval=15,
+                 max_subscribers=1000):
+        self._addon = addon
+        self._interval = interval
+        self._heartbeat_interval = heartbeat_interval
+        self._max_subscribers = max_subscribers
+        self._subscribers = {}
+        self._issues = None
+        self._running = False
+
+    @property
+    def subscriber_count(self):
+        return len(self._subscribers)
+
+    @property
+    def is_full(self):
+        return len(self._subscribers) >= self._max_subscribers
+
+    def subscribe(self, handler, include=None):
+        if self.is_full:
+            raise APIError(503, "Too many health subscribers")
+
+        subscriber = _Subscriber(handler, include)
+        self._subscribers[handler] = subscriber
+        if not self._running:
+            self._running = True
+            IOLoop.current().spawn_callback(self._run)
+        elif self._issues is not None:
+            self._notify(subscriber, time.monotonic())
+
+    def unsubscribe(self, handler):
+        self._subscribers.pop(handler, None)
+
+    async def _run(self):
+        while self._subscribers:
+            try:
+                self._issues = await self._addon.check_health()
+            except Exception:
+                log.exception("Health check failed")
+            else:
+                now = time.monotonic()
+                for subscriber in list(self._subscribers.values()):
+                    self._notify(subscriber, now)
+
+            await sleep(self._interval)
+
+        self._running = False
+        self._issues = None
+
+    def _notify(self, subscriber, now):
+        include = subscriber.include
+        if include is None:
+            issues = self._issues
+        else:
+            issues = {name: issue for name, issue in self._issues.items()
+                      if name in include}
+
+        health = json_encode({
+            "status": "unhealthy" if issues else "healthy",
+            "issues": issues
+        })
+        if health != subscriber.health:
+            subscriber.handler.send(
+                "event: health\ndata: {}\n\n".format(health))
+            subscriber.health = health
+        elif now - subscriber.sent_time >= self._heartbeat_interval:
+            subscriber.handler.send(": heartbeat\n\n")
+        else:
+            return
+
+        subscriber.sent_time = now
+
+
+class _Subscriber:
+    __slots__ = ("handler", "include", "health", "sent_time")
+
+    def __init__(self, handler, include):
+        self.handler = handler
+        self.include = include
+        self.health = None
+        self.sent_time = time.monotonic()
+
+
+def _ignore_error(future):
+    # Closed connections are unsubscribed by their handler.
+    future.exception()
+
+
 class HealthAddon(EndpointAddon):
+    """Health checks of an endpoint, served on ``path``.
+
+    With a ``stream_path``, health changes are also streamed as
+    Server-Sent Events (see ``HealthStream`` for ``stream_kwargs``).
+
+    Health handlers run calls in the executor class ``priority_class``,
+    reserved to health checks by ``PriorityExecutor``, so that they are
+    not queued behind other requests. Checks doing blocking calls should
+    run them with ``run_in_executor``.
+
+    """
+
     def __init__(self,
                  endpoint,
                  path="{name}/health",
                  handler_class=HealthHandler,
                  unhealthy_status=503,
-                 checks=None):
+                 checks=None,
+                 context_checks=True,
+                 stream_path=None,
+                 stream_kwargs=None,
+                 priority_class="health"):
         super().__init__(endpoint)
         self._path = path
         self._handler_class = handler_class
         self._unhealthy_status = unhealthy_status
         self._checks = dict(checks) if checks is not None else {}
+        self._context_checks = context_checks
+        self._stream_path = stream_path
+        self._stream = HealthStream(self, **(stream_kwargs or {}))
+        self._priority_class = priority_class
 
     @property
     def path(self):
@@ -116,17 +316,62 @@ class HealthAddon(EndpointAddon):
     def checks(self):
         return self._checks
 
+    @property
+    def stream(self):
+        return self._stream
+
+    @property
+    def priority_class(self):
+        return self._priority_class
+
     @property
     def handlers(self):
-        return [(self._path, self._handler_class, dict(addon=self))]
+        handlers = [(self._path, self._handler_class, dict(addon=self))]
+        if self._stream_path is not None:
+            handlers.append(
+                (self._stream_path, HealthStreamHandler, dict(addon=self)))
+
+        return handlers
+
+    def iter_checks(self):
+        """Iterate over checks, including the ones of context objects.
+
+        Context objects with a ``check_health`` method (e.g. resource
+        pools) are checked under their name in the context, unless
+        ``context_checks`` is False.
+
+        """
+        yield from self._checks.items()
+        if self._context_checks:
+            for name, value in sorted(vars(self.context).items()):
+                if (not name.startswith("_") and name not in self._checks
+                        and callable(getattr(value, "check_health", None))):
+                    yield name, _ContextCheck(value)
+
+    def run_in_executor(self, func, *args):
+        """Run ``func`` in the context executor, in ``priority_class``."""
+        return IOLoop.current().run_in_executor(
+            get_class_executor(self.context.executor, self._priority_class),
+            func, *args)
 
-    @coroutine
     def check_health(self, include=None):
+        """Run checks and return a Future of their issues by check name.
+
+        Checks may be plain functions, native coroutines or return
+        anything ``gen.coroutine`` can yield, synchronous checks are not
+        awaited.
+
+        """
+        return convert_yielded(self._check_health(include))
+
+    async def _check_health(self, include):
         issues = {}
-        for name, check in self.checks.items():
+        for name, check in self.iter_checks():
             if include is None or name in include:
                 try:
-                    yield check(self.endpoint)
+                    result = check(self.endpoint)
+                    if result is not None:
+                        await convert_yielded(result)
                 except HealthIssue as issue:
                     issues[name] = {
                         "message": issue.message,
@@ -142,7 +387,8 @@ class HealthEndpoint(Endpoint):
     def __init__(self, context, **kwargs):
         super().__init__(context)
         kwargs.setdefault("path", "/{name}")
-        kwargs["checks"] = self.checks
+        kwargs["checks"] = {"endpoints": check_endpoints}
+        kwargs["checks"].update(self.checks)
         self.add_addon(HealthAddon, addon_kwargs=kwargs)
 
     @property
@@ -150,6 +396,14 @@ class HealthEndpoint(Endpoint):
         return {}
 
 
+class _ContextCheck:
+    def __init__(self, value):
+        self._value = value
+
+    def __call__(self, endpoint):
+        return self._value.check_health()
+
+
 class HealthIssue(Exception):
     def __init__(self, message, details=None):
         self._message = message
@@ -0,0 +1,215 @@
+# -*- coding: utf-8 -*-
+
+import hashlib
+import json
+import logging
+import weakref
+
+from tornado.gen import sleep
+from tornado.ioloop import IOLoop
+from tornado.ioloop import PeriodicCallback
+from tornado.locks import Event
+from tornado.util import TimeoutError
+
+from ..core.endpoint import EndpointAddon
+from ..exceptions import APIError
+from ..metrics import default_registry
+from ..utils.cache import TTLCache
+
+__all__ = ["IdempotencyAddon"]
+
+log = logging.getLogger(__name__)
+
+# Set again when the response is flushed, or computed from its body.
+_EXCLUDED_HEADERS = frozenset(["Content-Length", "Date"])
+
+
+class IdempotencyAddon(EndpointAddon):
+    """Handle retried writes once, by ``Idempotency-Key`` header.
+
+    Requests of ``methods`` to the endpoint with an idempotency key
+    (scoped by user, method and path) are handled once: the response of
+    the first one (status, headers and body) is stored in ``store`` and
+    replayed, with an ``Idempotent-Replayed`` header, to the requests
+    with the same key. Duplicates received while the first request is in
+    flight wait for it, for at most ``lock_timeout`` seconds (then get a
+    409). A key reused with another body gets a 422. The pending entry
+    of a request in flight expires after ``lock_timeout`` seconds (for a
+    worker dying while handling it not to block its duplicates) and is
+    refreshed while the request runs.
+
+    ``store`` is a ``CacheBackend``, by default a ``TTLCache`` of
+    ``max_size`` responses kept ``ttl`` seconds. With a store shared by
+    worker processes, duplicates in flight in another process are polled
+    every ``poll_interval`` seconds.
+
+    Responses with a 429 or a 5xx status and streamed responses (flushed
+    before the end) are not stored: the next duplicate is handled. So are
+    responses the store refuses (e.g. larger than the slots of a
+    ``SharedMemoryCache``), which are logged and counted by the
+    ``idempotency_not_stored`` metric.
+
+    """
+
+    def __init__(self, endpoint, store=None, ttl=24 * 3600, max_size=10000,
+                 methods=("POST", "PUT", "PATCH", "DELETE"),
+                 header="Idempotency-Key", max_key_length=255,
+                 lock_timeout=60, poll_interval=0.1, metrics=None):
+        super().__init__(endpoint)
+        if store is None:
+            store = TTLCache(max_size, ttl)
+
+        if metrics is None:
+            metrics = default_registry
+
+        self._store = store
+        self._methods = frozenset(method.upper() for method in methods)
+        self._header = header
+        self._max_key_length = max_key_length
+        self._lock_timeout = lock_timeout
+        self._poll_interval = poll_interval
+        self._events = {}
+        self._requests = weakref.WeakKeyDictionary()
+        self._replayed = metrics.counter("idempotency_replayed",
+                                         endpoint=endpoint.name)
+        self._waited = metrics.counter("idempotency_waited",
+                                       endpoint=endpoint.name)
+        self._not_stored = metrics.counter("idempotency_not_stored",
+                                           endpoint=endpoint.name)
+
+    @property
+    def store(self):
+        return self._store
+
+    @property
+    def handlers(self):
+        return []
+
+    def prepare_request(self, handler):
+        request = handler.request
+        if request.method not in self._methods:
+            return None
+
+        idempotency_key = request.headers.get(self._header)
+        if idempotency_key is None:
+            return None
+
+        if not 0 < len(idempotency_key) <= self._max_key_length:
+            raise APIError(400, "Invalid idempotency key")
+
+        user = handler.current_user
+        key = json.dumps([
+            None if user is None else str(getattr(user, "id", user)),
+            request.method, request.path, idempotency_key
+        ])
+        fingerprint = hashlib.sha1(request.body or b"").hexdigest()
+        return self._handle(handler, key, fingerprint)
+
+    def finish_request(self, handler):
+        try:
+            key, fingerprint, event, refresher = self._requests.pop(handler)
+        except KeyError:
+            return
+
+        refresher.stop()
+        try:
+            status = handler.get_status()
+            if (status < 500 and status != 429 and
+                    not handler._headers_written):
+                headers = [(name, value)
+                           for name, value in handler._headers.get_all()
+                           if name not in _EXCLUDED_HEADERS]
+                body = b"".join(handler._write_buffer)
+                if not self._store.set(key, (status, fingerprint,
+                                             handler._reason, headers,
+                                             body)):
+                    log.warning("Response of %s %s (%d bytes) not stored "
+                                "for idempotency", handler.request.method,
+                                handler.request.path, len(body))
+                    self._not_stored.inc()
+                    self._store.pop(key)
+            else:
+                self._store.pop(key)
+        finally:
+            event.set()
+            if self._events.get(key) is event:
+                del self._events[key]
+
+    async def _handle(self, handler, key, fingerprint):
+        deadline = IOLoop.current().time() + self._lock_timeout
+        waited = False
+        while True:
+            if self._acquire(handler, key, fingerprint):
+                return
+
+            entry = self._store.get(key)
+            if entry is None:
+                # Expired or removed since.
+                continue
+
+            if entry[1] != fingerprint:
+                raise APIError(422, "Idempotency key reused with another "
+                               "request")
+
+            if entry[0] is not None:
+                self._replay(handler, entry)
+                return
+
+            if IOLoop.current().time() >= deadline:
+                raise APIError(409, "Request with the same idempotency key "
+                               "in progress")
+
+            if not waited:
+                waited = True
+                self._waited.inc()
+
+            event = self._events.get(key)
+            if event is None:
+                await sleep(self._poll_interval)
+                continue
+
+            try:
+                await event.wait(deadline)
+            except TimeoutError:
+                pass
+
+    def _acquire(self, handler, key, fingerprint):
+        # Pending entries expire, so that a worker which died handling a
+        # request doesn't block its duplicates for longer.
+        if not self._store.add(key, (None, fingerprint),
+                               ttl=self._lock_timeout):
+            return False
+
+        event = Event()
+        self._events[key] = event
+        refresher = self._refresh_pending(handler, key, fingerprint)
+        self._requests[handler] = (key, fingerprint, event, refresher)
+        return True
+
+    def _refresh_pending(self, handler, key, fingerprint):
+        handler_ref = weakref.ref(handler)
+
+        def refresh():
+            if handler_ref() is None:
+                refresher.stop()
+            else:
+                self._store.set(key, (None, fingerprint),
+                                ttl=self._lock_timeout)
+
+        refresher = PeriodicCallback(refresh, self._lock_timeout * 500)
+        refresher.start()
+        return refresher
+
+    def _replay(self, handler, entry):
+        status, _, reason, headers, body = entry
+        handler.clear()
+        handler.set_status(status, reason)
+        for name in set(name for name, _ in headers):
+            handler.clear_header(name)
+
+        for name, value in headers:
+            handler.add_header(name, value)
+
+        handler.set_header("Idempotent-Replayed", "true")
+        self._replayed.inc()
+        handler.finish(body or None)
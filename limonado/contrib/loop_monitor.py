@@ -0,0 +1,163 @@
+# -*- coding: utf-8 -*-
+
+from collections import deque
+import logging
+import sys
+import threading
+import time
+import traceback
+
+from tornado.ioloop import IOLoop
+from tornado.web import RequestHandler
+
+from ..metrics import default_registry
+from .health import HealthIssue
+
+__all__ = ["LoopMonitor"]
+
+log = logging.getLogger(__name__)
+
+
+class LoopMonitor:
+    """Measure IOLoop scheduling lag and detect blocking calls.
+
+    A callback scheduled every ``interval`` seconds measures how late it
+    runs, lags are recorded in the metrics registry. A watcher thread
+    notices when the IOLoop has been blocked for more than ``threshold``
+    seconds and captures the stack of the IOLoop thread, attributed to
+    the request handler (and its endpoint) found on the stack. The last
+    ``max_reports`` reports are kept, each blocking call is logged once.
+
+    Monitors registered as context objects are checked by ``HealthAddon``:
+    lags above the threshold in the last ``health_window`` seconds are
+    reported. The monitor is started on the current IOLoop unless
+    ``autostart`` is False.
+
+    """
+
+    def __init__(self, interval=0.1, threshold=0.25, health_window=60,
+                 max_reports=20, autostart=True, metrics=None):
+        if metrics is None:
+            metrics = default_registry
+
+        self._interval = interval
+        self._threshold = threshold
+        self._health_window = health_window
+        self._reports = deque(maxlen=max_reports)
+        self._metrics = metrics
+        self._lag = metrics.histogram("ioloop_lag_seconds")
+        self._last_lag = metrics.gauge("ioloop_last_lag_seconds")
+        self._io_loop = None
+        self._thread_id = None
+        self._timeout = None
+        self._expected_time = None
+        self._last_tick = None
+        self._lagging_time = None
+        self._max_lag = 0
+        self._reported = False
+        self._stop_event = threading.Event()
+        if autostart:
+            IOLoop.current().add_callback(self.start)
+
+    @property
+    def reports(self):
+        return list(self._reports)
+
+    @property
+    def stats(self):
+        return {
+            "last_lag": self._last_lag.value,
+            "max_lag": self._max_lag,
+            "threshold": self._threshold,
+            "blocked": len(self._reports)
+        }
+
+    def start(self):
+        if self._io_loop is not None:
+            return
+
+        self._io_loop = IOLoop.current()
+        self._thread_id = threading.get_ident()
+        self._stop_event.clear()
+        self._last_tick = time.monotonic()
+        self._schedule(self._last_tick)
+        threading.Thread(target=self._watch, name="limonado-loop-monitor",
+                         daemon=True).start()
+
+    def stop(self):
+        if self._io_loop is None:
+            return
+
+        self._stop_event.set()
+        self._io_loop.remove_timeout(self._timeout)
+        self._io_loop = None
+
+    def check_health(self):
+        if (self._lagging_time is not None and
+                time.monotonic() - self._lagging_time < self._health_window):
+            raise HealthIssue("IOLoop is lagging", self.stats)
+
+    def _schedule(self, now):
+        self._expected_time = now + self._interval
+        self._timeout = self._io_loop.call_later(self._interval, self._tick)
+
+    def _tick(self):
+        now = time.monotonic()
+        lag = max(now - self._expected_time, 0)
+        self._last_tick = now
+        self._reported = False
+        self._lag.observe(lag)
+        self._last_lag.set(lag)
+        if lag > self._threshold:
+            self._lagging_time = now
+            self._max_lag = max(self._max_lag, lag)
+
+        self._schedule(now)
+
+    def _watch(self):
+        while not self._stop_event.wait(self._interval):
+            blocked = time.monotonic() - self._last_tick - self._interval
+            if blocked > self._threshold and not self._reported:
+                self._reported = True
+                try:
+                    self._report(blocked)
+                except Exception:
+                    log.exception("Failed to report blocked IOLoop")
+
+    def _report(self, blocked):
+        frame = sys._current_frames().get(self._thread_id)
+        if frame is None:
+            return
+
+        handler = _find_handler(frame)
+        endpoint = getattr(handler, "endpoint", None)
+        report = {
+            "time": time.time(),
+            "blocked": round(blocked, 3),
+            "handler": None,
+            "endpoint": getattr(endpoint, "name", None),
+            "route": None,
+            "stack": traceback.format_stack(frame)
+        }
+        if handler is not None:
+            report["handler"] = handler.__class__.__name__
+            report["route"] = getattr(handler.request, "route", None)
+
+        self._reports.append(report)
+        self._metrics.counter("ioloop_blocked",
+                              endpoint=report["endpoint"] or "").inc()
+        log.warning("IOLoop blocked for more than %.3fs by %s "
+                    "(endpoint: %s, route: %s)\n%s", blocked,
+                    report["handler"], report["endpoint"], report["route"],
+                    "".join(report["stack"]).rstrip())
+
+
+def _find_handler(frame):
+    while frame is not None:
+        handler = frame.f_locals.get("self")
+        if isinstance(handler, RequestHandler):
+            return handler
+
+        frame = frame.f_back
+
+    return None
@@ -0,0 +1,316 @@
+# -*- coding: utf-8 -*-
+
+from collections import OrderedDict
+import gc
+import os
+import sys
+import threading
+import tracemalloc
+
+from ..core.endpoint import EndpointAddon
+from ..core.endpoint import EndpointHandler
+from ..exceptions import APIError
+
+try:
+    import resource
+except ImportError:  # pragma: no cover
+    resource = None
+
+__all__ = ["MemoryAddon"]
+
+# Every traced allocation keeps its traceback, deep tracebacks multiply
+# the tracing overhead.
+_MAX_FRAMES = 100
+
+_TRACING_SCHEMA = {
+    "additionalProperties": False,
+    "type": "object",
+    "properties": {
+        "enabled": {
+            "type": "boolean"
+        },
+        "frames": {
+            "type": "integer",
+            "minimum": 1,
+            "maximum": _MAX_FRAMES
+        }
+    },
+    "required": ["enabled"]
+}
+
+_SNAPSHOT_SCHEMA = {
+    "additionalProperties": False,
+    "type": "object",
+    "properties": {
+        "name": {
+            "type": "string",
+            "pattern": "^[A-Za-z0-9_.-]+$"
+        }
+    },
+    "required": ["name"]
+}
+
+_DIFF_PARAMS = {
+    "additionalProperties": False,
+    "type": "object",
+    "properties": {
+        "base": {
+            "type": "string"
+        },
+        "target": {
+            "type": "string"
+        },
+        "group_by": {
+            "type": "string",
+            "enum": ["filename", "lineno"]
+        },
+        "limit": {
+            "type": "integer",
+            "minimum": 1
+        }
+    },
+    "required": ["base"]
+}
+
+_SNAPSHOT_FILTERS = (
+    tracemalloc.Filter(False, tracemalloc.__file__),
+    tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+    tracemalloc.Filter(False, "<frozen importlib._bootstrap_external>"),
+    tracemalloc.Filter(False, "<unknown>")
+)
+
+
+class MemoryHandler(EndpointHandler):
+    def initialize(self, endpoint, addon):
+        super().initialize(endpoint)
+        self.addon = addon
+
+    def get(self):
+        self.write_json(self.addon.get_stats())
+        self.finish()
+
+
+class TracingHandler(EndpointHandler):
+    def initialize(self, endpoint, addon):
+        super().initialize(endpoint)
+        self.addon = addon
+
+    def post(self):
+        data = self.get_json(_TRACING_SCHEMA)
+        if data is None:
+            raise APIError(400, "Missing body")
+
+        if data["enabled"]:
+            self.addon.start_tracing(data.get("frames", 1))
+        else:
+            self.addon.stop_tracing()
+
+        self.write_json(self.addon.get_stats())
+        self.finish()
+
+
+class SnapshotsHandler(EndpointHandler):
+    def initialize(self, endpoint, addon):
+        super().initialize(endpoint)
+        self.addon = addon
+
+    def get(self):
+        self.write_json({"snapshots": self.addon.snapshot_names})
+        self.finish()
+
+    async def post(self):
+        data = self.get_json(_SNAPSHOT_SCHEMA)
+        if data is None:
+            raise APIError(400, "Missing body")
+
+        await self.run_in_executor(self.addon.take_snapshot, data["name"])
+        self.set_status(201)
+        self.write_json({"snapshots": self.addon.snapshot_names})
+        self.finish()
+
+
+class SnapshotHandler(EndpointHandler):
+    def initialize(self, endpoint, addon):
+        super().initialize(endpoint)
+        self.addon = addon
+
+    def delete(self, name):
+        self.addon.delete_snapshot(name)
+        self.set_status(204)
+        self.finish()
+
+
+class DiffHandler(EndpointHandler):
+    def initialize(self, endpoint, addon):
+        super().initialize(endpoint)
+        self.addon = addon
+
+    async def get(self):
+        params = self.get_params(_DIFF_PARAMS)
+        diff = await self.run_in_executor(
+            self.addon.compare_snapshots,
+            params["base"],
+            params.get("target"),
+            params.get("group_by", "lineno"),
+            params.get("limit", 20))
+        self.write_json(diff)
+        self.finish()
+
+
+class MemoryAddon(EndpointAddon):
+    """Diagnose memory growth of the serving process without a restart.
+
+    Exposes the process RSS, garbage collector and ``tracemalloc`` stats,
+    allows starting and stopping ``tracemalloc``, taking named snapshots
+    (at most ``max_snapshots``, the oldest are dropped) and listing the
+    top allocation differences between two snapshots, by file or line.
+    Tracebacks are limited to 100 frames.
+
+    Snapshots are taken in the executor, the snapshot table is guarded
+    by a lock.
+
+    Every worker process has its own snapshots, requests are served by
+    the worker which received them.
+
+    """
+
+    def __init__(self, endpoint, path="{name}/memory", max_snapshots=10):
+        super().__init__(endpoint)
+        self._path = path
+        self._max_snapshots = max_snapshots
+        self._snapshots = OrderedDict()
+        self._lock = threading.Lock()
+
+    @property
+    def snapshot_names(self):
+        with self._lock:
+            return list(self._snapshots)
+
+    @property
+    def handlers(self):
+        kwargs = dict(addon=self)
+        return [
+            (self._path, MemoryHandler, kwargs),
+            (self._path + "/tracing", TracingHandler, kwargs),
+            (self._path + "/snapshots", SnapshotsHandler, kwargs),
+            (self._path + "/snapshots/([A-Za-z0-9_.-]+)", SnapshotHandler,
+             kwargs),
+            (self._path + "/diff", DiffHandler, kwargs)
+        ]
+
+    def get_stats(self):
+        stats = {
+            "pid": os.getpid(),
+            "rss": _get_rss(),
+            "max_rss": _get_max_rss(),
+            "gc": {
+                "counts": gc.get_count(),
+                "thresholds": gc.get_threshold(),
+                "generations": gc.get_stats(),
+                "garbage": len(gc.garbage)
+            },
+            "tracing": tracemalloc.is_tracing(),
+            "snapshots": self.snapshot_names
+        }
+        if stats["tracing"]:
+            current, peak = tracemalloc.get_traced_memory()
+            stats["traced"] = {
+                "current": current,
+                "peak": peak,
+                "frames": tracemalloc.get_traceback_limit(),
+                "overhead": tracemalloc.get_tracemalloc_memory()
+            }
+
+        return stats
+
+    def start_tracing(self, frames=1):
+        if not 1 <= frames <= _MAX_FRAMES:
+            raise ValueError("frames must be between 1 and {}".format(
+                _MAX_FRAMES))
+
+        if tracemalloc.is_tracing():
+            tracemalloc.stop()
+
+        tracemalloc.start(frames)
+
+    def stop_tracing(self):
+        tracemalloc.stop()
+
+    def take_snapshot(self, name):
+        if not tracemalloc.is_tracing():
+            raise APIError(409, "Memory tracing not started")
+
+        snapshot = tracemalloc.take_snapshot().filter_traces(
+            _SNAPSHOT_FILTERS)
+        with self._lock:
+            self._snapshots.pop(name, None)
+            self._snapshots[name] = snapshot
+            while len(self._snapshots) > self._max_snapshots:
+                self._snapshots.popitem(last=False)
+
+    def delete_snapshot(self, name):
+        with self._lock:
+            snapshot = self._snapshots.pop(name, None)
+
+        if snapshot is None:
+            raise APIError(404, "Unknown snapshot: {}".format(name))
+
+    def compare_snapshots(self, base, target=None, group_by="lineno",
+                          limit=20):
+        """Compare ``target`` (default: a new snapshot) to ``base``."""
+        base_snapshot = self._get_snapshot(base)
+        if target is None:
+            if not tracemalloc.is_tracing():
+                raise APIError(409, "Memory tracing not started")
+
+            target_snapshot = tracemalloc.take_snapshot().filter_traces(
+                _SNAPSHOT_FILTERS)
+        else:
+            target_snapshot = self._get_snapshot(target)
+
+        stats = target_snapshot.compare_to(base_snapshot, group_by)
+        return {
+            "base": base,
+            "target": target,
+            "group_by": group_by,
+            "size_diff": sum(stat.size_diff for stat in stats),
+            "top": [_format_stat(stat, group_by) for stat in stats[:limit]]
+        }
+
+    def _get_snapshot(self, name):
+        try:
+            with self._lock:
+                return self._snapshots[name]
+        except KeyError:
+            raise APIError(404, "Unknown snapshot: {}".format(name))
+
+
+def _format_stat(stat, group_by):
+    frame = stat.traceback[0]
+    return {
+        "file": frame.filename,
+        "line": frame.lineno if group_by == "lineno" else None,
+        "size": stat.size,
+        "size_diff": stat.size_diff,
+        "count": stat.count,
+        "count_diff": stat.count_diff
+    }
+
+
+def _get_rss():
+    try:
+        with open("/proc/self/statm") as statm:
+            pages = int(statm.read().split()[1])
+    except (OSError, IndexError, ValueError):
+        return None
+
+    return pages * os.sysconf("SC_PAGE_SIZE")
+
+
+def _get_max_rss():
+    if resource is None:
+        return None
+
+    max_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Reported in bytes on macOS, in kilobytes elsewhere.
+    return max_rss if sys.platform == "darwin" else max_rss * 1024
@@ -0,0 +1,48 @@
+# -*- coding: utf-8 -*-
+
+from ..core.endpoint import Endpoint
+from ..core.endpoint import EndpointAddon
+from ..core.endpoint import EndpointHandler
+from ..metrics import default_registry
+
+
+class MetricsHandler(EndpointHandler):
+    def initialize(self, endpoint, addon):
+        super().initialize(endpoint)
+        self.addon = addon
+
+    def get(self):
+        self.write_json(self.addon.registry.snapshot())
+        self.finish()
+
+
+class MetricsAddon(EndpointAddon):
+    def __init__(self,
+                 endpoint,
+                 path="{name}/metrics",
+                 handler_class=MetricsHandler,
+                 registry=None):
+        super().__init__(endpoint)
+        if registry is None:
+            registry = default_registry
+
+        self._path = path
+        self._handler_class = handler_class
+        self._registry = registry
+
+    @property
+    def registry(self):
+        return self._registry
+
+    @property
+    def handlers(self):
+        return [(self._path, self._handler_class, dict(addon=self))]
+
+
+class MetricsEndpoint(Endpoint):
+    name = "metrics"
+
+    def __init__(self, context, **kwargs):
+        super().__init__(context)
+        kwargs.setdefault("path", "/{name}")
+        self.add_addon(MetricsAddon, addon_kwargs=kwargs)
@@ -0,0 +1,285 @@
+# -*- coding: utf-8 -*-
+
+import abc
+from collections import deque
+from datetime import timedelta
+import inspect
+import logging
+import time
+
+from tornado.concurrent import Future
+from tornado.gen import TimeoutError
+from tornado.gen import convert_yielded
+from tornado.gen import coroutine
+from tornado.gen import maybe_future
+from tornado.gen import with_timeout
+from tornado.ioloop import IOLoop
+from tornado.ioloop import PeriodicCallback
+
+from ..exceptions import APIError
+from .health import HealthIssue
+
+__all__ = ["ResourcePool"]
+
+log = logging.getLogger(__name__)
+
+_MISSING = object()
+
+
+class ResourcePool(abc.ABC):
+    """Pool of reusable resources (e.g. connections) for context objects.
+
+    Subclasses implement ``create`` and usually ``close``, both may return
+    a Future or be native coroutines. Resources are acquired and released
+    explicitly::
+
+        conn = yield self.context.db.acquire()
+        try:
+            ...
+        except ConnectionError:
+            self.context.db.release(conn, broken=True)
+            raise
+        else:
+            self.context.db.release(conn)
+
+    At most ``max_size`` resources exist at a time, ``acquire`` waits up
+    to ``acquire_timeout`` seconds for one before failing with a 503.
+    Resources idle for more than ``idle_timeout`` seconds are closed, as
+    long as at least ``min_size`` remain. ``start`` creates ``min_size``
+    resources, it is scheduled on the current IOLoop unless ``prewarm``
+    is False.
+
+    Pools registered as context objects are checked by ``HealthAddon``:
+    exhaustion and failures to create or ping resources are reported.
+
+    """
+
+    def __init__(self, name="pool", min_size=0, max_size=10,
+                 acquire_timeout=5, idle_timeout=300, prewarm=True):
+        if not 0 <= min_size <= max_size or max_size < 1:
+            raise ValueError("invalid pool size")
+
+        self._name = name
+        self._min_size = min_size
+        self._max_size = max_size
+        self._acquire_timeout = acquire_timeout
+        self._idle_timeout = idle_timeout
+        self._idle = deque()
+        self._waiters = deque()
+        self._size = 0
+        self._in_use = 0
+        self._last_error = None
+        self._exhausted_count = 0
+        self._broken_count = 0
+        self._eviction = None
+        if prewarm:
+            IOLoop.current().add_callback(self._prewarm)
+
+    @property
+    def name(self):
+        return self._name
+
+    @property
+    def stats(self):
+        return {
+            "size": self._size,
+            "idle": len(self._idle),
+            "in_use": self._in_use,
+            "waiting": len(self._waiters),
+            "max_size": self._max_size,
+            "exhausted": self._exhausted_count,
+            "broken": self._broken_count
+        }
+
+    @abc.abstractmethod
+    def create(self):
+        """Create a new resource."""
+
+    def close(self, resource):
+        """Close a resource evicted from the pool."""
+
+    def is_usable(self, resource):
+        """Tell whether an idle resource can be handed out (e.g. is open).
+
+        Unusable resources are discarded on acquire.
+
+        """
+        return True
+
+    def ping(self, resource):
+        """Check a resource is usable, raise an exception if not.
+
+        Called by health checks on an idle resource.
+
+        """
+
+    @coroutine
+    def start(self):
+        if self._eviction is None and self._idle_timeout:
+            interval = max(self._idle_timeout / 2, 1) * 1000
+            self._eviction = PeriodicCallback(self._evict_idle, interval)
+            self._eviction.start()
+
+        while self._size < self._min_size:
+            resource = yield self._create()
+            self._put_idle(resource)
+
+    @coroutine
+    def stop(self):
+        if self._eviction is not None:
+            self._eviction.stop()
+            self._eviction = None
+
+        while self._idle:
+            resource, _ = self._idle.popleft()
+            yield self._discard(resource)
+
+    @coroutine
+    def acquire(self, timeout=None):
+        resource = self._pop_idle()
+        if resource is _MISSING:
+            if self._size < self._max_size:
+                resource = yield self._create()
+            else:
+                resource = yield self._wait(timeout)
+
+        self._in_use += 1
+        return resource
+
+    def release(self, resource, broken=False):
+        self._in_use -= 1
+        if broken:
+            self._broken_count += 1
+            self._replace(resource)
+        else:
+            self._hand_over(resource)
+
+    @coroutine
+    def check_health(self):
+        stats = self.stats
+        if self._waiters and self._in_use >= self._max_size:
+            raise HealthIssue("Pool '{}' is exhausted".format(self._name),
+                              stats)
+
+        if self._last_error is not None:
+            raise HealthIssue(
+                "Pool '{}' can't create resources".format(self._name),
+                dict(stats, error=str(self._last_error)))
+
+        resource = self._pop_idle()
+        if resource is not _MISSING:
+            self._in_use += 1
+            try:
+                yield _resolve(self.ping(resource))
+            except Exception as exc:
+                self.release(resource, broken=True)
+                raise HealthIssue(
+                    "Pool '{}' has broken resources".format(self._name),
+                    dict(stats, error=str(exc)))
+            else:
+                self.release(resource)
+
+    @coroutine
+    def _prewarm(self):
+        # Failures are reported by health checks until a resource can be
+        # created again.
+        try:
+            yield self.start()
+        except Exception:
+            log.warning("Failed to prewarm pool '%s'", self._name)
+
+    @coroutine
+    def _create(self):
+        self._size += 1
+        try:
+            resource = yield _resolve(self.create())
+        except Exception as exc:
+            self._size -= 1
+            self._last_error = exc
+            log.exception("Failed to create resource in pool '%s'",
+                          self._name)
+            raise
+
+        self._last_error = None
+        return resource
+
+    @coroutine
+    def _discard(self, resource):
+        self._size -= 1
+        try:
+            yield _resolve(self.close(resource))
+        except Exception:
+            log.exception("Failed to close resource in pool '%s'",
+                          self._name)
+
+    @coroutine
+    def _replace(self, resource):
+        yield self._discard(resource)
+        if ((self._waiters or self._size < self._min_size)
+                and self._size < self._max_size):
+            try:
+                resource = yield self._create()
+            except Exception:
+                return
+
+            self._hand_over(resource)
+
+    def _hand_over(self, resource):
+        while self._waiters:
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                waiter.set_result(resource)
+                return
+
+        self._put_idle(resource)
+
+    @coroutine
+    def _wait(self, timeout):
+        if timeout is None:
+            timeout = self._acquire_timeout
+
+        waiter = Future()
+        self._waiters.append(waiter)
+        try:
+            if timeout is None:
+                resource = yield waiter
+            else:
+                resource = yield with_timeout(timedelta(seconds=timeout),
+                                              waiter)
+        except TimeoutError:
+            if waiter.done():
+                return waiter.result()
+
+            self._waiters.remove(waiter)
+            self._exhausted_count += 1
+            raise APIError(503, "Pool '{}' is exhausted".format(self._name))
+
+        return resource
+
+    def _pop_idle(self):
+        while self._idle:
+            resource, _ = self._idle.pop()
+            if self.is_usable(resource):
+                return resource
+
+            self._discard(resource)
+
+        return _MISSING
+
+    def _put_idle(self, resource):
+        self._idle.append((resource, time.monotonic()))
+
+    def _evict_idle(self):
+        deadline = time.monotonic() - self._idle_timeout
+        while (self._idle and self._size > self._min_size
+               and self._idle[0][1] < deadline):
+            resource, _ = self._idle.popleft()
+            self._discard(resource)
+
+
+def _resolve(value):
+    """Return a Future of ``value``, which may be a Future or awaitable."""
+    if inspect.isawaitable(value):
+        return convert_yielded(value)
+
+    return maybe_future(value)
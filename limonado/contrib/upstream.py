@@ -0,0 +1,453 @@
+# -*- coding: utf-8 -*-
+
+import base64
+import copy
+from datetime import timedelta
+from io import BytesIO
+import ssl
+import time
+from urllib.parse import urljoin
+from urllib.parse import urlsplit
+
+from tornado.gen import TimeoutError
+from tornado.gen import coroutine
+from tornado.escape import utf8
+from tornado.gen import with_timeout
+from tornado.http1connection import HTTP1Connection
+from tornado.http1connection import HTTP1ConnectionParameters
+from tornado.httpclient import HTTPError
+from tornado.httpclient import HTTPRequest
+from tornado.httpclient import HTTPResponse
+from tornado import httputil
+from tornado.iostream import StreamClosedError
+from tornado.tcpclient import TCPClient
+
+from ..__about__ import __version__
+from ..metrics import default_registry
+from .breaker import CircuitBreaker
+from .health import HealthIssue
+from .pool import ResourcePool
+
+__all__ = ["UpstreamClient"]
+
+_IDEMPOTENT_METHODS = frozenset(["DELETE", "GET", "HEAD", "OPTIONS", "PUT"])
+
+_BODY_METHODS = frozenset(["PATCH", "POST", "PUT"])
+
+_REDIRECT_CODES = frozenset([301, 302, 303, 307, 308])
+
+# Options of HTTPRequest which are not implemented, they must not be set.
+_UNSUPPORTED_OPTIONS = ("body_producer", "streaming_callback",
+                        "header_callback", "prepare_curl_callback",
+                        "proxy_host", "network_interface", "ssl_options",
+                        "ca_certs", "client_key", "client_cert")
+
+
+class UpstreamClient:
+    """HTTP client shared by endpoints to call upstream services.
+
+    Meant to be registered as a context object. Connections are kept
+    alive and pooled per upstream (scheme, host and port), with at most
+    ``max_host_connections`` connections per upstream. Requests use
+    Tornado's ``HTTPRequest`` and ``HTTPResponse``, errors are raised as
+    Tornado's ``HTTPError`` (code 599 for timeouts, connection errors and
+    responses larger than ``max_response_size``).
+
+    If ``deadline`` is set and the incoming request's ``handler`` is given
+    to ``fetch``, upstream requests are cut short so that they end at most
+    ``deadline`` seconds after the incoming request started.
+
+    If ``breaker_kwargs`` is given, each upstream gets a ``CircuitBreaker``
+    created with them. Connection errors, timeouts and 5xx responses count
+    as failures, requests to an upstream with an open circuit fail fast
+    with a 503 ``APIError``, and open circuits are reported by health
+    checks.
+
+    Request counts, errors and latencies are recorded per upstream in the
+    metrics registry.
+
+    Redirects are followed (unless ``follow_redirects`` is False) and
+    ``auth_username``/``auth_password`` are sent with basic
+    authentication like with Tornado's clients. Other options of
+    ``HTTPRequest`` are not supported and raise a ``ValueError`` when
+    set: request bodies can't be streamed (``body_producer``), nor
+    responses, and SSL options are those of the client
+    (``ssl_options``), not of requests.
+
+    """
+
+    def __init__(self,
+                 max_host_connections=10,
+                 connect_timeout=5,
+                 request_timeout=30,
+                 max_response_size=10 * 1024 * 1024,
+                 idle_timeout=60,
+                 deadline=None,
+                 ssl_options=None,
+                 breaker_kwargs=None,
+                 metrics=None):
+        self._max_host_connections = max_host_connections
+        self._connect_timeout = connect_timeout
+        self._request_timeout = request_timeout
+        self._max_response_size = max_response_size
+        self._idle_timeout = idle_timeout
+        self._deadline = deadline
+        self._ssl_options = ssl_options
+        self._breaker_kwargs = breaker_kwargs
+        self._metrics = metrics if metrics is not None else default_registry
+        self._tcp_client = TCPClient()
+        self._upstreams = {}
+
+    @property
+    def stats(self):
+        return {name: upstream.pool.stats
+                for name, upstream in self._upstreams.items()}
+
+    @coroutine
+    def fetch(self, request, handler=None, raise_error=True, **kwargs):
+        if not isinstance(request, HTTPRequest):
+            request = HTTPRequest(request, **kwargs)
+
+        _check_options(request)
+        upstream = self._get_upstream(request.url)
+        timeout = request.request_timeout or self._request_timeout
+        if handler is not None and self._deadline is not None:
+            remaining = self._deadline - handler.request.request_time()
+            if remaining <= 0:
+                upstream.record_error("deadline")
+                raise HTTPError(599, "Deadline exceeded")
+
+            timeout = min(timeout, remaining)
+
+        generation = None
+        if upstream.breaker is not None:
+            generation = upstream.breaker.before_call()
+
+        exchange = _Exchange()
+        start_time = time.time()
+        try:
+            delegate = yield with_timeout(
+                timedelta(seconds=timeout),
+                self._fetch(upstream, request, exchange),
+                quiet_exceptions=(HTTPError, StreamClosedError))
+        except TimeoutError:
+            exchange.abort()
+            upstream.record_error("timeout", time.time() - start_time,
+                                  generation)
+            raise HTTPError(599, "Timeout")
+        except HTTPError:
+            upstream.record_error("response_size", time.time() - start_time,
+                                  generation)
+            raise
+        except (OSError, StreamClosedError) as exc:
+            upstream.record_error("connection", time.time() - start_time,
+                                  generation)
+            raise HTTPError(599, str(exc) or exc.__class__.__name__)
+        except Exception:
+            upstream.record_error("other", time.time() - start_time,
+                                  generation)
+            raise
+
+        request_time = time.time() - start_time
+        response = HTTPResponse(
+            request,
+            delegate.start_line.code,
+            reason=delegate.start_line.reason,
+            headers=delegate.headers,
+            buffer=BytesIO(b"".join(delegate.chunks)),
+            request_time=request_time,
+            start_time=start_time)
+        upstream.record_response(response.code, request_time, generation)
+        redirect = _get_redirect(request, response)
+        if redirect is not None:
+            response = yield self.fetch(redirect, handler=handler,
+                                        raise_error=False)
+
+        if raise_error:
+            response.rethrow()
+
+        return response
+
+    def check_health(self):
+        circuits = {}
+        for name, upstream in self._upstreams.items():
+            if upstream.breaker is not None:
+                state = upstream.breaker.state
+                if state != "closed":
+                    circuits[name] = state
+
+        if circuits:
+            raise HealthIssue("Upstream circuits are open", circuits)
+
+    @coroutine
+    def close(self):
+        upstreams = list(self._upstreams.values())
+        self._upstreams.clear()
+        for upstream in upstreams:
+            yield upstream.pool.stop()
+
+    @coroutine
+    def _fetch(self, upstream, request, exchange):
+        attempts = 2 if request.method in _IDEMPOTENT_METHODS else 1
+        for attempt in range(attempts):
+            connection = yield upstream.pool.acquire()
+            if exchange.aborted:
+                upstream.pool.release(connection)
+                return
+
+            exchange.connection = connection
+            reused = connection.requests > 0
+            delegate = _ResponseDelegate(self._max_response_size)
+            try:
+                yield self._send(connection, request, delegate)
+            except StreamClosedError:
+                upstream.pool.release(connection, broken=True)
+                if delegate.too_large:
+                    raise HTTPError(599, "Response too large")
+
+                # A reused connection may have been closed by the upstream
+                # while idle, retry idempotent requests on a new one.
+                if (reused and not delegate.started and not exchange.aborted
+                        and attempt + 1 < attempts):
+                    continue
+
+                raise
+            else:
+                connection.requests += 1
+                upstream.pool.release(connection)
+                return delegate
+
+    @coroutine
+    def _send(self, connection, request, delegate):
+        parts = urlsplit(request.url)
+        decompress = request.decompress_response is not False
+        http_connection = HTTP1Connection(
+            connection.stream, True,
+            HTTP1ConnectionParameters(decompress=decompress))
+        delegate.connection = http_connection
+        headers = httputil.HTTPHeaders(request.headers)
+        headers.setdefault("Host", parts.netloc)
+        headers.setdefault("User-Agent", request.user_agent or
+                           "Limonado/{}".format(__version__))
+        if request.auth_username is not None:
+            credentials = base64.b64encode(
+                utf8(request.auth_username) + b":" +
+                utf8(request.auth_password or ""))
+            headers["Authorization"] = "Basic " + credentials.decode("ascii")
+
+        if decompress:
+            headers.setdefault("Accept-Encoding", "gzip")
+
+        body = request.body
+        if body is not None or request.method in _BODY_METHODS:
+            headers["Content-Length"] = str(len(body or b""))
+
+        path = parts.path or "/"
+        if parts.query:
+            path += "?" + parts.query
+
+        http_connection.write_headers(
+            httputil.RequestStartLine(request.method, path, "HTTP/1.1"),
+            headers)
+        if body:
+            http_connection.write(body)
+
+        http_connection.finish()
+        yield http_connection.read_response(delegate)
+        if delegate.too_large or not delegate.finished:
+            raise StreamClosedError()
+
+    def _get_upstream(self, url):
+        parts = urlsplit(url)
+        if parts.scheme not in ("http", "https"):
+            raise ValueError("unsupported scheme: {}".format(parts.scheme))
+
+        port = parts.port or (443 if parts.scheme == "https" else 80)
+        name = "{}://{}:{}".format(parts.scheme, parts.hostname, port)
+        try:
+            return self._upstreams[name]
+        except KeyError:
+            if parts.scheme == "https":
+                ssl_options = self._ssl_options or ssl.create_default_context()
+            else:
+                ssl_options = None
+
+            pool = _ConnectionPool(
+                self._tcp_client,
+                parts.hostname,
+                port,
+                ssl_options,
+                self._connect_timeout,
+                name=name,
+                max_size=self._max_host_connections,
+                acquire_timeout=None,
+                idle_timeout=self._idle_timeout,
+                prewarm=False)
+            pool.start()
+            if self._breaker_kwargs is not None:
+                breaker = CircuitBreaker(name=name, metrics=self._metrics,
+                                         **self._breaker_kwargs)
+            else:
+                breaker = None
+
+            upstream = _Upstream(name, pool, breaker, self._metrics)
+            self._upstreams[name] = upstream
+            return upstream
+
+
+def _check_options(request):
+    for name in _UNSUPPORTED_OPTIONS:
+        if getattr(request, name) is not None:
+            raise ValueError("unsupported request option: {}".format(name))
+
+    if request.validate_cert is False:
+        raise ValueError("unsupported request option: validate_cert, set "
+                         "ssl_options of the client instead")
+
+    if request.auth_mode not in (None, "basic"):
+        raise ValueError("unsupported auth_mode: {}".format(
+            request.auth_mode))
+
+    if request.expect_100_continue:
+        raise ValueError("unsupported request option: expect_100_continue")
+
+    if request.allow_ipv6 is False:
+        raise ValueError("unsupported request option: allow_ipv6")
+
+
+def _get_redirect(request, response):
+    """Return the request following a redirect response, if any."""
+    max_redirects = request.max_redirects
+    if max_redirects is None:
+        max_redirects = 5
+
+    if (request.follow_redirects is False or max_redirects <= 0 or
+            response.code not in _REDIRECT_CODES or
+            "Location" not in response.headers):
+        return None
+
+    redirect = copy.copy(request)
+    redirect.url = urljoin(request.url, response.headers["Location"])
+    redirect.max_redirects = max_redirects - 1
+    redirect.headers = httputil.HTTPHeaders(request.headers)
+    redirect.headers.pop("Host", None)
+    # Like browsers (and Tornado's clients), follow a 302 as a 303: with
+    # a GET without body.
+    if response.code in (302, 303):
+        redirect.method = "GET"
+        redirect.body = None
+        for name in ("Content-Length", "Content-Type", "Content-Encoding",
+                     "Transfer-Encoding"):
+            redirect.headers.pop(name, None)
+
+    return redirect
+
+
+class _Upstream:
+    def __init__(self, name, pool, breaker, metrics):
+        self.name = name
+        self.pool = pool
+        self.breaker = breaker
+        self._metrics = metrics
+        self._latency = metrics.histogram("upstream_latency_seconds",
+                                          upstream=name)
+
+    def record_response(self, code, request_time, generation=None):
+        self._latency.observe(request_time)
+        self._metrics.counter(
+            "upstream_requests", upstream=self.name, code=str(code)).inc()
+        if code >= 500:
+            self.record_error("status", request_time, generation)
+        elif self.breaker is not None:
+            self.breaker.record(request_time, generation=generation)
+
+    def record_error(self, kind, request_time=None, generation=None):
+        self._metrics.counter(
+            "upstream_errors", upstream=self.name, kind=kind).inc()
+        if self.breaker is not None and request_time is not None:
+            self.breaker.record(request_time, failed=True,
+                                generation=generation)
+
+
+class _Connection:
+    def __init__(self, stream):
+        self.stream = stream
+        self.requests = 0
+
+
+class _ConnectionPool(ResourcePool):
+    def __init__(self, tcp_client, host, port, ssl_options, connect_timeout,
+                 **kwargs):
+        super().__init__(**kwargs)
+        self._tcp_client = tcp_client
+        self._host = host
+        self._port = port
+        self._ssl_options = ssl_options
+        self._connect_timeout = connect_timeout
+
+    @coroutine
+    def create(self):
+        stream = yield self._tcp_client.connect(
+            self._host,
+            self._port,
+            ssl_options=self._ssl_options,
+            timeout=self._connect_timeout)
+        return _Connection(stream)
+
+    def close(self, connection):
+        connection.stream.close()
+
+    def is_usable(self, connection):
+        return not connection.stream.closed()
+
+
+class _Exchange:
+    def __init__(self):
+        self.connection = None
+        self.aborted = False
+
+    def abort(self):
+        self.aborted = True
+        if self.connection is not None:
+            self.connection.stream.close()
+
+
+class _ResponseDelegate(httputil.HTTPMessageDelegate):
+    def __init__(self, max_size):
+        self.connection = None
+        self.max_size = max_size
+        self.start_line = None
+        self.headers = None
+        self.chunks = []
+        self.size = 0
+        self.started = False
+        self.finished = False
+        self.too_large = False
+
+    def headers_received(self, start_line, headers):
+        self.started = True
+        self.start_line = start_line
+        self.headers = headers
+        self.chunks = []
+        self.size = 0
+        try:
+            length = int(headers.get("Content-Length", 0))
+        except ValueError:
+            length = 0
+
+        if length > self.max_size:
+            self._abort()
+
+    def data_received(self, chunk):
+        self.size += len(chunk)
+        if self.size > self.max_size:
+            self._abort()
+        else:
+            self.chunks.append(chunk)
+
+    def finish(self):
+        self.finished = True
+
+    def _abort(self):
+        self.too_large = True
+        self.connection.close()
@@ -0,0 +1,235 @@
+# -*- coding: utf-8 -*-
+
+from functools import wraps
+import gc
+import logging
+import os
+import sys
+import threading
+import time
+import traceback
+
+import tornado
+from tornado.concurrent import is_future
+from tornado.escape import to_unicode
+from tornado.gen import Runner
+from tornado.ioloop import IOLoop
+from tornado.ioloop import PeriodicCallback
+
+__all__ = ["RequestWatchdog"]
+
+log = logging.getLogger(__name__)
+
+_TORNADO_PATH = os.path.dirname(tornado.__file__)
+
+
+class RequestWatchdog:
+    """Track active requests and log the stack of the slow ones.
+
+    Pass it as the ``watchdog`` object of a ``WebAPI`` (or set it as
+    ``watchdog`` of an ``EndpointHandler`` subclass) to track its
+    requests, from ``prepare`` until they are finished::
+
+        api = WebAPI(objects=dict(watchdog=RequestWatchdog(threshold=5)))
+
+    Every ``check_interval`` seconds, requests active for more than
+    ``threshold`` seconds are logged once, with their route, parameters
+    and the Python stack currently serving them: the executor thread's
+    stack while in ``EndpointHandler.run_in_executor``, otherwise the
+    frames of the coroutine returned by the handler's method and of the
+    coroutines it awaits. Requests whose connection is closed before
+    they are finished are no longer tracked.
+
+    Requests blocking the IOLoop can't be observed from it, see
+    ``limonado.contrib.loop_monitor`` for these.
+
+    """
+
+    def __init__(self, threshold=5, check_interval=1, autostart=True):
+        self._threshold = threshold
+        self._check_interval = check_interval
+        self._active = {}
+        self._callback = None
+        if autostart:
+            IOLoop.current().add_callback(self.start)
+
+    @property
+    def threshold(self):
+        return self._threshold
+
+    def start(self):
+        if self._callback is None:
+            self._callback = PeriodicCallback(self.check,
+                                              self._check_interval * 1000)
+            self._callback.start()
+
+    def stop(self):
+        if self._callback is not None:
+            self._callback.stop()
+            self._callback = None
+
+    def track(self, handler, phase="handling"):
+        request = _ActiveRequest(phase)
+        self._active[handler] = request
+        # Record the coroutine (or Future) returned by the method serving
+        # the request, to get its stack if the request is slow.
+        name = handler.request.method.lower()
+        method = getattr(handler, name, None)
+        if method is not None:
+            setattr(handler, name, _record_result(request, method))
+
+    def untrack(self, handler):
+        self._active.pop(handler, None)
+
+    def set_phase(self, handler, phase):
+        request = self._active.get(handler)
+        if request is not None:
+            request.phase = phase
+
+    def wrap(self, handler, func):
+        """Wrap ``func`` to be run in an executor thread for ``handler``."""
+        @wraps(func)
+        def _wrapper(*args, **kwargs):
+            request = self._active.get(handler)
+            if request is None:
+                return func(*args, **kwargs)
+
+            phase = request.phase
+            request.phase = "executor"
+            request.thread_id = threading.get_ident()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                request.thread_id = None
+                request.phase = phase
+
+        return _wrapper
+
+    def get_active_requests(self):
+        now = time.monotonic()
+        active = []
+        for handler, request in list(self._active.items()):
+            age = now - request.start_time
+            active.append(dict(_describe(handler),
+                               phase=request.phase,
+                               age=round(age, 3),
+                               slow=age > self._threshold))
+
+        active.sort(key=_get_age, reverse=True)
+        return active
+
+    def check(self):
+        now = time.monotonic()
+        for handler, request in list(self._active.items()):
+            age = now - request.start_time
+            if not request.logged and age > self._threshold:
+                request.logged = True
+                try:
+                    self._log(handler, request, age)
+                except Exception:
+                    log.exception("Failed to log slow request")
+
+    def _log(self, handler, request, age):
+        description = _describe(handler)
+        if request.thread_id is not None:
+            frame = sys._current_frames().get(request.thread_id)
+            stack = traceback.format_stack(frame) if frame else []
+        else:
+            stack = _get_coroutine_stack(request.coroutine)
+
+        log.warning("Slow request, active for %.3fs in phase '%s': "
+                    "%s %s (endpoint: %s, route: %s, params: %s)\n%s",
+                    age, request.phase, description["method"],
+                    description["path"], description["endpoint"],
+                    description["route"], description["params"],
+                    "".join(stack).rstrip() or "No stack available")
+
+
+class _ActiveRequest:
+    __slots__ = ("start_time", "phase", "thread_id", "coroutine", "logged")
+
+    def __init__(self, phase):
+        self.start_time = time.monotonic()
+        self.phase = phase
+        self.thread_id = None
+        self.coroutine = None
+        self.logged = False
+
+
+def _describe(handler):
+    request = handler.request
+    endpoint = getattr(handler, "endpoint", None)
+    params = {
+        name: [to_unicode(value) for value in values]
+        for name, values in request.query_arguments.items()
+    }
+    if handler.path_args:
+        params["path_args"] = list(handler.path_args)
+
+    if handler.path_kwargs:
+        params.update(handler.path_kwargs)
+
+    return {
+        "handler": handler.__class__.__name__,
+        "endpoint": getattr(endpoint, "name", None),
+        "route": getattr(request, "route", None),
+        "method": request.method,
+        "path": request.path,
+        "params": params
+    }
+
+
+def _get_age(request):
+    return request["age"]
+
+
+def _get_coroutine_stack(coroutine):
+    """Format the frames of ``coroutine`` and of the ones it awaits.
+
+    Tornado's own coroutines are left out. Futures of ``tornado.gen``
+    coroutines are followed to the generator running them.
+
+    """
+    stack = []
+    while coroutine is not None:
+        yielded = None
+        if is_future(coroutine):
+            runner = _find_runner(coroutine)
+            if runner is None:
+                break
+
+            coroutine, yielded = runner.gen, runner.future
+
+        frame = getattr(coroutine, "gi_frame", None)
+        if frame is None:
+            frame = getattr(coroutine, "cr_frame", None)
+
+        if frame is None:
+            break
+
+        if not frame.f_code.co_filename.startswith(_TORNADO_PATH):
+            stack.extend(traceback.format_stack(frame, limit=1))
+
+        coroutine = (getattr(coroutine, "gi_yieldfrom", None) or
+                     getattr(coroutine, "cr_await", None) or yielded)
+
+    return stack
+
+
+def _find_runner(future):
+    for referrer in gc.get_referrers(future):
+        if (isinstance(referrer, Runner) and
+                referrer.result_future is future):
+            return referrer
+
+    return None
+
+
+def _record_result(request, method):
+    @wraps(method)
+    def _wrapper(*args, **kwargs):
+        result = method(*args, **kwargs)
+        request.coroutine = result
+        return result
+
+    return _wrapper
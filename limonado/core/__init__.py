@@ -5,11 +5,15 @@ from .context import Context
 from .endpoint import Endpoint
 from .endpoint import EndpointAddon
 from .endpoint import EndpointHandler
+from .endpoint import LazyEndpoint
+from .routing import PrefixRouter
 
 __all__ = [
     "Application",
     "Context",
     "Endpoint",
     "EndpointAddon",
-    "EndpointHandler"
+    "EndpointHandler",
+    "LazyEndpoint",
+    "PrefixRouter"
 ]
@@ -1,12 +1,147 @@
 # -*- coding: utf-8 -*-
 
+import sys
+
 import tornado.web
 
+from ..exceptions import APIError
+from .routing import PrefixRouter
+
 
 class Application(tornado.web.Application):
-    def __init__(self, settings, **kwargs):
+    def __init__(self, settings, api=None, **kwargs):
         super(Application, self).__init__(**kwargs)
+        self.api = api
+        self._set_settings(settings)
+        # Replace Tornado's linear wildcard router, which is the last rule of
+        # the default router, by a router indexing rules by path prefixes.
+        self.wildcard_router = PrefixRouter(self, self.wildcard_router.rules)
+        self.default_router.rules[-1].target = self.wildcard_router
+
+    def reconfigure(self, settings, handlers):
+        """Swap settings and the route table of a (running) application.
+
+        Requests already routed are served by the handlers they were
+        routed to, new requests are routed with the new table.
+
+        """
+        router = PrefixRouter(self, handlers)
+        self._set_settings(settings)
+        self.wildcard_router = router
+        self.default_router.rules[-1].target = router
+
+    def get_handler_delegate(self, request, target_class, target_kwargs=None,
+                             path_args=None, path_kwargs=None):
+        endpoint = (target_kwargs or {}).get("endpoint")
+        max_body_size = getattr(target_class, "max_body_size", None)
+        if max_body_size is None:
+            max_body_size = getattr(endpoint, "max_body_size", None)
+
+        content_types = getattr(target_class, "content_types", None)
+        if content_types is None:
+            content_types = getattr(endpoint, "content_types", None)
+
+        if max_body_size is None and content_types is None:
+            return super(Application, self).get_handler_delegate(
+                request, target_class, target_kwargs, path_args, path_kwargs)
+
+        return _LimitedHandlerDelegate(
+            self, request, target_class, target_kwargs, path_args,
+            path_kwargs, max_body_size, content_types)
+
+    def log_request(self, handler):
+        capture = getattr(handler, "capture", None)
+        if capture is not None:
+            capture.log_request(handler)
+
+        access_log = getattr(handler, "access_log", None)
+        if access_log is None:
+            super(Application, self).log_request(handler)
+        else:
+            access_log.log_request(handler)
+
+    def _set_settings(self, settings):
         self.name = settings["name"]
         self.id = settings["id"]
         self.version = settings["version"]
         self.server = settings["server"]
+
+
+class _LimitedHandlerDelegate(tornado.web._HandlerDelegate):
+    """Reject request bodies over a size or of other media types.
+
+    Bodies are checked from the headers, then chunks are counted while
+    they are read (Tornado buffers them until the body is complete), so
+    that rejected bodies are not buffered. The response is sent by the
+    handler (through ``send_error``) without executing it, after which
+    the connection is closed rather than reading the rest of the body.
+
+    Handlers streaming the request body get Tornado's own limit, which
+    closes the connection once exceeded.
+
+    """
+
+    def __init__(self, application, request, handler_class, handler_kwargs,
+                 path_args, path_kwargs, max_body_size, content_types):
+        super().__init__(application, request, handler_class,
+                         handler_kwargs, path_args, path_kwargs)
+        self.max_body_size = max_body_size
+        self.content_types = content_types
+        self.body_size = 0
+        self.rejected = False
+
+    def headers_received(self, start_line, headers):
+        content_length = headers.get("Content-Length")
+        try:
+            content_length = int(content_length)
+        except (TypeError, ValueError):
+            content_length = None
+
+        has_body = bool(content_length) or "Transfer-Encoding" in headers
+        if has_body and self.content_types is not None:
+            content_type = headers.get("Content-Type", "").partition(
+                ";")[0].strip().lower()
+            if content_type not in self.content_types:
+                return self.reject(415, "Unsupported content type")
+
+        if self.max_body_size is not None:
+            if (content_length is not None and
+                    content_length > self.max_body_size):
+                return self.reject(413, "Request body too large")
+
+            if self.stream_request_body:
+                self.connection.set_max_body_size(self.max_body_size)
+
+        return super().headers_received(start_line, headers)
+
+    def data_received(self, data):
+        if self.rejected:
+            return None
+
+        self.body_size += len(data)
+        if (self.max_body_size is not None and
+                not self.stream_request_body and
+                self.body_size > self.max_body_size):
+            self.chunks = []
+            return self.reject(413, "Request body too large")
+
+        return super().data_received(data)
+
+    def finish(self):
+        if not self.rejected:
+            super().finish()
+
+    def on_connection_close(self):
+        if not self.rejected:
+            super().on_connection_close()
+
+    def reject(self, status, message):
+        self.rejected = True
+        handler = self.handler_class(self.application, self.request,
+                                     **self.handler_kwargs)
+        handler._transforms = [transform(self.request)
+                               for transform in self.application.transforms]
+        try:
+            raise APIError(status, message)
+        except APIError:
+            handler.send_error(status, exc_info=sys.exc_info())
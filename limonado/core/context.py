@@ -1,19 +1,43 @@
 # -*- coding: utf-8 -*-
 
+from ..validation.registry import SchemaRegistry
+
 
 class Context:
-    def __init__(self, settings, executor, **kwargs):
+    # Request services of the API (see ``EndpointHandler``), set from the
+    # objects of the ``WebAPI``.
+    authenticator = None
+    access_log = None
+    watchdog = None
+    capture = None
+
+    def __init__(self, settings, executor, schemas=None, **kwargs):
         self._settings = settings
         self._executor = executor
+        self._schemas = schemas if schemas is not None else SchemaRegistry()
+        self._lazy_endpoints = {}
         for name, value in kwargs.items():
             assert not name.startswith("_"), "internal name"
-            assert name not in ("settings", "executor"), "reserved name"
+            assert name not in ("settings", "executor", "schemas",
+                                "lazy_endpoints"), "reserved name"
             setattr(self, name, value)
 
     @property
     def settings(self):
         return self._settings
 
+    def update_settings(self, settings):
+        """Swap the settings snapshot, e.g. when reloading settings."""
+        self._settings = settings
+
     @property
     def executor(self):
         return self._executor
+
+    @property
+    def schemas(self):
+        return self._schemas
+
+    @property
+    def lazy_endpoints(self):
+        return self._lazy_endpoints
@@ -1,27 +1,57 @@
 # -*- coding: utf-8 -*-
 
 import abc
+from functools import partial
+import logging
 import weakref
 
 from tornado.escape import json_decode
 from tornado.escape import json_encode
+from tornado.concurrent import Future
+from tornado.gen import coroutine
+from tornado.ioloop import IOLoop
 from tornado.web import RequestHandler
 
 from ..exceptions import APIError
+from ..utils._params import exclude_parsed
 from ..utils._params import extract_params
+from ..utils.executor import get_class_executor
 from ..validation import validate_request_data
 
-__all__ = ["Endpoint", "EndpointAddon", "EndpointHandler"]
+__all__ = ["Endpoint", "EndpointAddon", "EndpointHandler", "LazyEndpoint"]
+
+log = logging.getLogger(__name__)
 
 
 class Endpoint:
-    """Base class for Endpoints."""
+    """Base class for Endpoints.
+
+    Endpoints with ``lazy`` set to True are only constructed on first use
+    (see ``LazyEndpoint``), their handlers must then be declared at class
+    level.
+
+    Named ``schemas`` are registered in the schema registry of the
+    context, so that handlers and other endpoints can refer to them.
+
+    ``max_body_size`` (in bytes) and ``content_types`` (lowercase media
+    types) limit the request bodies accepted by the handlers of the
+    endpoint which don't set their own, and ``priority_class`` is their
+    default executor class (see ``EndpointHandler``).
+
+    """
     name = None
     addons = []
+    lazy = False
+    schemas = {}
+    max_body_size = None
+    content_types = None
+    priority_class = None
 
     def __init__(self, context):
         self._context = context
         self._addon_map = {}
+        self._request_addons = []
+        context.schemas.register_all(self.schemas)
         for spec in self.addons:
             try:
                 addon_class, kwargs = spec
@@ -42,6 +72,8 @@ class Endpoint:
     def add_addon(self, addon_class, addon_kwargs=None):
         addon = addon_class(self, **(addon_kwargs or {}))
         self._addon_map[addon_class] = addon
+        if addon.prepare_request is not None:
+            self._request_addons.append(addon)
 
     def get_addon(self, name):
         return self._addon_map.get(name)
@@ -49,9 +81,152 @@ class Endpoint:
     def iter_addons(self):
         return (addon for addon in self._addon_map.values())
 
+    @property
+    def request_addons(self):
+        """Addons taking part in the requests of all endpoint handlers."""
+        return self._request_addons
+
+
+class LazyEndpoint:
+    """Placeholder for an endpoint constructed on first use.
+
+    Routes are taken from the class-level ``handlers`` of the endpoint
+    class. The endpoint itself is constructed in the context executor
+    when it is first requested (or preloaded), concurrent requests all
+    wait for the same construction.
+
+    """
+
+    def __init__(self, endpoint_class, context, endpoint_kwargs=None,
+                 preload=False):
+        if not isinstance(endpoint_class.handlers, (list, tuple)):
+            raise ValueError("lazy endpoint '{}' must declare handlers at "
+                             "class level".format(endpoint_class.name))
+
+        if endpoint_class.addons:
+            raise ValueError("lazy endpoint '{}' must not declare "
+                             "addons".format(endpoint_class.name))
+
+        context.schemas.register_all(endpoint_class.schemas)
+        self._endpoint_class = endpoint_class
+        self._endpoint_kwargs = endpoint_kwargs or {}
+        self._context = context
+        self._preload = preload
+        self._endpoint = None
+        self._error = None
+        self._future = None
+        context.lazy_endpoints[endpoint_class.name] = self
+        if preload:
+            IOLoop.current().add_callback(self._preload_endpoint)
+
+    @property
+    def name(self):
+        return self._endpoint_class.name
+
+    @property
+    def context(self):
+        return self._context
+
+    @property
+    def handlers(self):
+        return list(self._endpoint_class.handlers)
+
+    @property
+    def endpoint(self):
+        return self._endpoint
+
+    @property
+    def max_body_size(self):
+        return self._endpoint_class.max_body_size
+
+    @property
+    def content_types(self):
+        return self._endpoint_class.content_types
+
+    @property
+    def priority_class(self):
+        return self._endpoint_class.priority_class
+
+    @property
+    def preload(self):
+        return self._preload
+
+    @property
+    def state(self):
+        if self._endpoint is not None:
+            return "ready"
+        elif self._future is not None:
+            return "loading"
+        elif self._error is not None:
+            return "failed"
+
+        return "pending"
+
+    @property
+    def error(self):
+        return self._error
+
+    def iter_addons(self):
+        return iter(())
+
+    @property
+    def request_addons(self):
+        return ()
+
+    def load(self):
+        if self._endpoint is not None:
+            future = Future()
+            future.set_result(self._endpoint)
+            return future
+
+        if self._future is None:
+            self._future = self._load()
+
+        return self._future
+
+    @coroutine
+    def _preload_endpoint(self):
+        # Failures are logged by _load and reported by health checks (see
+        # limonado.contrib.health.check_endpoints), the endpoint is loaded
+        # again on first request.
+        try:
+            yield self.load()
+        except Exception:
+            pass
+
+    @coroutine
+    def _load(self):
+        create = partial(self._endpoint_class, self._context,
+                         **self._endpoint_kwargs)
+        try:
+            endpoint = yield IOLoop.current().run_in_executor(
+                self._context.executor, create)
+        except Exception as exc:
+            log.exception("Failed to load endpoint '%s'", self.name)
+            self._error = exc
+            raise
+        else:
+            self._endpoint = endpoint
+            self._error = None
+            return endpoint
+        finally:
+            self._future = None
+
 
 class EndpointAddon(abc.ABC):
-    """Base class for endpoint addons."""
+    """Base class for endpoint addons.
+
+    Besides handlers of their own, addons may take part in the requests
+    of all the handlers of their endpoint by defining both hooks:
+    ``prepare_request(handler)`` is called at the end of ``prepare``
+    (after authentication) and may return an awaitable or finish the
+    request itself, ``finish_request(handler)`` is called when the
+    handler finishes, before the response is flushed.
+
+    """
+
+    prepare_request = None
+    finish_request = None
 
     def __init__(self, endpoint):
         self._endpoint = weakref.proxy(endpoint)
@@ -70,7 +245,57 @@ class EndpointAddon(abc.ABC):
 
 
 class EndpointHandler(RequestHandler):
-    """Base class for endpoint handlers."""
+    """Base class for endpoint handlers.
+
+    The request services below default to the objects of the same name
+    of the ``WebAPI`` (attributes of the context), subclasses may set
+    their own as class attributes.
+
+    If ``authenticator`` is set (see ``limonado.access``), it resolves
+    ``current_user`` in ``prepare``. Subclasses overriding ``prepare``
+    must call it.
+
+    If ``access_log`` is set (see ``limonado.contrib.access_log``), it
+    logs requests instead of Tornado's access log.
+
+    If ``watchdog`` is set (see ``limonado.contrib.watchdog``), requests
+    are tracked from ``prepare`` until they are finished or their
+    connection is closed.
+
+    If ``capture`` is set (see ``limonado.contrib.capture``), requests
+    are sampled and recorded for replay.
+
+    Requests with a body larger than ``max_body_size`` get a 413, and
+    with a media type not in ``content_types`` a 415, before the body is
+    read (both default to the ones of the endpoint). Limits above the
+    ``max_body_size`` of the server have no effect.
+
+    With a ``PriorityExecutor`` (see ``limonado.utils.executor``) as the
+    context executor, ``run_in_executor`` queues calls in the class
+    ``priority_class`` (by default the one of the endpoint), if the
+    executor has it.
+
+    """
+
+    max_body_size = None
+    content_types = None
+    priority_class = None
+
+    @property
+    def authenticator(self):
+        return self.endpoint.context.authenticator
+
+    @property
+    def access_log(self):
+        return self.endpoint.context.access_log
+
+    @property
+    def watchdog(self):
+        return self.endpoint.context.watchdog
+
+    @property
+    def capture(self):
+        return self.endpoint.context.capture
 
     def set_default_headers(self):
         self.set_header("Content-Type", "application/json")
@@ -79,11 +304,103 @@ class EndpointHandler(RequestHandler):
         self.set_header("Server", self.application.server)
 
     def initialize(self, endpoint):
+        if isinstance(endpoint, LazyEndpoint) and endpoint.state == "ready":
+            endpoint = endpoint.endpoint
+
         self.endpoint = endpoint
 
+    def prepare(self):
+        if self.watchdog is not None:
+            self.watchdog.track(self)
+
+        if isinstance(self.endpoint, LazyEndpoint):
+            return self._load_endpoint()
+
+        future = None
+        if self.authenticator is not None:
+            future = self.authenticator.resolve_user(self)
+
+        if self.endpoint.request_addons:
+            return self._prepare_addons(future)
+
+        return future
+
+    async def _load_endpoint(self):
+        self.endpoint = await self.endpoint.load()
+        if self.authenticator is not None:
+            future = self.authenticator.resolve_user(self)
+            if future is not None:
+                await future
+
+    async def _prepare_addons(self, future):
+        if future is not None:
+            await future
+
+        for addon in self.endpoint.request_addons:
+            result = addon.prepare_request(self)
+            if result is not None:
+                await result
+
+            if self._finished:
+                break
+
+    def finish(self, chunk=None):
+        if not self._finished and not isinstance(self.endpoint,
+                                                 LazyEndpoint):
+            if chunk is not None:
+                self.write(chunk)
+                chunk = None
+
+            for addon in self.endpoint.request_addons:
+                addon.finish_request(self)
+
+        return super().finish(chunk)
+
+    def on_finish(self):
+        if self.watchdog is not None:
+            self.watchdog.untrack(self)
+
+    def on_connection_close(self):
+        if self.watchdog is not None:
+            self.watchdog.untrack(self)
+
+        super().on_connection_close()
+
+    def run_in_executor(self, func, *args):
+        """Run ``func`` in the context executor."""
+        if self.watchdog is not None:
+            func = self.watchdog.wrap(self, func)
+
+        priority_class = self.priority_class
+        if priority_class is None:
+            priority_class = self.endpoint.priority_class
+
+        return IOLoop.current().run_in_executor(
+            get_class_executor(self.endpoint.context.executor,
+                               priority_class),
+            func, *args)
+
     def get_params(self, schema):
-        params = extract_params(self.request.arguments, schema)
-        validate_request_data(params, schema)
+        """Extract and validate query parameters.
+
+        ``schema`` is a schema or the name of a schema registered in the
+        context, like the one of ``get_json``. Array parameters with an
+        ``itemSeparator`` and ``"compact": true`` of integers or numbers
+        are parsed in bulk into a ``NumberArray`` (an ``array.array``).
+
+        """
+        schemas = self.endpoint.context.schemas
+        if isinstance(schema, str):
+            params_schema = schemas.get(schema)
+        else:
+            params_schema = schema
+
+        params = extract_params(self.request.arguments, params_schema)
+        excluded_schema = exclude_parsed(params_schema, params)
+        validate_request_data(
+            params,
+            schema if excluded_schema is params_schema else excluded_schema,
+            registry=schemas)
         return params
 
     def get_json(self, schema=None):
@@ -96,7 +413,8 @@ class EndpointHandler(RequestHandler):
             raise APIError(400, "Malformed JSON")
         else:
             if schema is not None:
-                validate_request_data(json, schema)
+                validate_request_data(
+                    json, schema, registry=self.endpoint.context.schemas)
 
             return json
 
@@ -0,0 +1,170 @@
+# -*- coding: utf-8 -*-
+
+from inspect import isclass
+import re
+
+from tornado.routing import PathMatches
+from tornado.routing import ReversibleRuleRouter
+from tornado.web import RequestHandler
+
+__all__ = ["PrefixRouter"]
+
+_REGEX_SPECIAL_CHARS = re.compile(r"[\\.^$*+?{}\[\]|()]")
+
+
+class PrefixRouter(ReversibleRuleRouter):
+    """Router indexing path rules by their literal path segments.
+
+    Rules are looked up in a trie keyed by the literal segments of their
+    path pattern (e.g. ``v1`` and the endpoint name), so that only rules
+    sharing a prefix with the requested path are matched against it.
+    Regular expression matching is only used for the dynamic remainder
+    of a pattern. Rules keep their registration order, hence the first
+    matching rule wins, exactly like with Tornado's linear router.
+
+    The path pattern of the matched rule is set as ``route`` of the
+    request (e.g. for access logs).
+
+    """
+
+    def __init__(self, application, rules=None):
+        self.application = application
+        self._root = _Node()
+        super().__init__(rules)
+
+    def add_rules(self, rules):
+        start = len(self.rules)
+        super().add_rules(rules)
+        for index in range(start, len(self.rules)):
+            self._index_rule(index, self.rules[index])
+
+    def process_rule(self, rule):
+        rule = super().process_rule(rule)
+        if isinstance(rule.target, (list, tuple)):
+            rule.target = self.__class__(self.application, rule.target)
+
+        return rule
+
+    def find_handler(self, request, **kwargs):
+        for _, rule in self._get_candidates(request.path):
+            target_params = rule.matcher.match(request)
+            if target_params is not None:
+                if isinstance(rule.matcher, PathMatches):
+                    request.route = rule.matcher.regex.pattern.rstrip("$")
+
+                if rule.target_kwargs:
+                    target_params["target_kwargs"] = rule.target_kwargs
+
+                delegate = self.get_target_delegate(
+                    rule.target, request, **target_params)
+                if delegate is not None:
+                    return delegate
+
+        return None
+
+    def get_target_delegate(self, target, request, **target_params):
+        if isclass(target) and issubclass(target, RequestHandler):
+            return self.application.get_handler_delegate(
+                request, target, **target_params)
+
+        return super().get_target_delegate(target, request, **target_params)
+
+    def _index_rule(self, index, rule):
+        node = self._root
+        segments = _get_literal_segments(rule.matcher)
+        if segments is None:
+            node.dynamic.append((index, rule))
+            return
+
+        literal, complete = segments
+        for segment in literal:
+            node = node.children.setdefault(segment, _Node())
+
+        if complete:
+            node.exact.append((index, rule))
+        else:
+            node.dynamic.append((index, rule))
+
+    def _get_candidates(self, path):
+        node = self._root
+        candidates = list(node.dynamic)
+        for segment in path.split("/"):
+            node = node.children.get(segment)
+            if node is None:
+                break
+
+            candidates.extend(node.dynamic)
+        else:
+            candidates.extend(node.exact)
+
+        candidates.sort(key=_get_index)
+        return candidates
+
+
+class _Node:
+    __slots__ = ("children", "dynamic", "exact")
+
+    def __init__(self):
+        self.children = {}
+        self.dynamic = []
+        self.exact = []
+
+
+def _get_index(item):
+    return item[0]
+
+
+def _get_literal_segments(matcher):
+    """Split a path pattern into its leading literal segments.
+
+    Returns a tuple of the literal segments and a flag telling whether
+    the whole pattern is literal, or None if the matcher is not a path
+    matcher (or a pattern with a top-level alternation) and hence has to
+    be tried for every request.
+
+    """
+    if not isinstance(matcher, PathMatches):
+        return None
+
+    pattern = matcher.regex.pattern
+    if not isinstance(pattern, str) or matcher.regex.flags & re.IGNORECASE:
+        return None
+
+    # Each branch of a top-level alternation has its own prefix.
+    if _has_top_level_alternation(pattern):
+        return None
+
+    if pattern.endswith("$") and not pattern.endswith("\\$"):
+        pattern = pattern[:-1]
+
+    literal = []
+    for segment in pattern.split("/"):
+        if _REGEX_SPECIAL_CHARS.search(segment):
+            return literal, False
+
+        literal.append(segment)
+
+    return literal, True
+
+
+def _has_top_level_alternation(pattern):
+    depth = 0
+    in_class = False
+    escaped = False
+    for char in pattern:
+        if escaped:
+            escaped = False
+        elif char == "\\":
+            escaped = True
+        elif in_class:
+            in_class = char != "]"
+        elif char == "[":
+            in_class = True
+        elif char == "(":
+            depth += 1
+        elif char == ")":
+            depth -= 1
+        elif char == "|" and depth == 0:
+            return True
+
+    return False
@@ -2,6 +2,7 @@
 
 from functools import wraps
 
+from .access import Principal
 from .exceptions import APIError
 from .utils.decorators import container
 
@@ -22,6 +23,8 @@ def authenticated(rh_method):
 
 
 def authorized(*permissions):
+    required_permissions = frozenset(permissions)
+
     @container
     def _check(rh_method):
         @wraps(rh_method)
@@ -30,9 +33,7 @@ def authorized(*permissions):
             if user is None:
                 raise APIError(401, "Not Authenticated")
 
-            if not any(
-                    user.has_permission(permission)
-                    for permission in permissions):
+            if not _has_any_permission(user, required_permissions):
                 raise APIError(403, "Insufficient Permissions")
 
             return rh_method(self, *args, **kwargs)
@@ -40,3 +41,10 @@ def authorized(*permissions):
         return _wrapper
 
     return _check
+
+
+def _has_any_permission(user, permissions):
+    if isinstance(user, Principal):
+        return user.has_any_permission(permissions)
+
+    return any(user.has_permission(permission) for permission in permissions)
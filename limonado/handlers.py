@@ -6,6 +6,7 @@ from tornado.gen import coroutine
 from tornado.web import RequestHandler
 
 from .exceptions import APIError
+from .utils._params import exclude_parsed
 from .utils._params import extract_params
 from .validation import schemas
 from .validation import validate_request_data
@@ -57,7 +58,7 @@ class EndpointHandler(RequestHandler):
 
     def get_params(self, schema):
         params = extract_params(self.request.arguments, schema)
-        validate_request_data(params, schema)
+        validate_request_data(params, exclude_parsed(schema, params))
         return params
 
     def get_json(self, schema=None):
@@ -0,0 +1,467 @@
+# -*- coding: utf-8 -*-
+
+from bisect import bisect_left
+import glob
+import json
+import mmap
+import os
+import struct
+import threading
+
+__all__ = [
+    "Counter",
+    "Gauge",
+    "Histogram",
+    "MetricsRegistry",
+    "default_registry"
+]
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0,
+                   10.0)
+
+# Metrics files start with the size used, followed by entries made of
+# the size of a key and the key (JSON), padded to 8 bytes, and a value.
+_USED_SIZE = struct.Struct("<Q")
+_KEY_SIZE = struct.Struct("<I")
+_VALUE = struct.Struct("<d")
+
+_INITIAL_FILE_SIZE = 64 * 1024
+
+
+class Counter:
+    """Monotonically increasing value."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._value = 0
+
+    @property
+    def value(self):
+        return self._value
+
+    def inc(self, amount=1):
+        with self._lock:
+            self._value += amount
+
+    def snapshot(self):
+        return {"value": self._value}
+
+
+class Gauge:
+    """Value which can go up and down."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._value = 0
+
+    @property
+    def value(self):
+        return self._value
+
+    def set(self, value):
+        self._value = value
+
+    def inc(self, amount=1):
+        with self._lock:
+            self._value += amount
+
+    def dec(self, amount=1):
+        self.inc(-amount)
+
+    def snapshot(self):
+        return {"value": self._value}
+
+
+class Histogram:
+    """Distribution of observed values in cumulative buckets."""
+
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self._lock = threading.Lock()
+        self._bounds = tuple(sorted(buckets))
+        self._counts = [0] * (len(self._bounds) + 1)
+        self._sum = 0.0
+        self._count = 0
+
+    @property
+    def bounds(self):
+        return self._bounds
+
+    @property
+    def count(self):
+        return self._count
+
+    @property
+    def sum(self):
+        return self._sum
+
+    def observe(self, value):
+        index = bisect_left(self._bounds, value)
+        with self._lock:
+            self._counts[index] += 1
+            self._sum += value
+            self._count += 1
+
+    def snapshot(self):
+        with self._lock:
+            counts = list(self._counts)
+            total = self._sum
+
+        buckets = []
+        cumulative = 0
+        for bound, count in zip(self._bounds + ("+Inf",), counts):
+            cumulative += count
+            buckets.append([bound, cumulative])
+
+        return {"buckets": buckets, "sum": total, "count": cumulative}
+
+
+class _SharedCounter:
+    """Counter stored in the metrics file of the process."""
+
+    def __init__(self, metrics_file, key):
+        self._file = metrics_file
+        self._key = _encode_key(key)
+
+    @property
+    def value(self):
+        return _to_number(self._file.get(self._key))
+
+    def inc(self, amount=1):
+        self._file.add(((self._key, amount),))
+
+
+class _SharedGauge(_SharedCounter):
+    """Gauge stored in the metrics file of the process."""
+
+    def set(self, value):
+        self._file.set(self._key, value)
+
+    def dec(self, amount=1):
+        self.inc(-amount)
+
+
+class _SharedHistogram:
+    """Histogram stored in the metrics file of the process."""
+
+    def __init__(self, metrics_file, key, buckets=DEFAULT_BUCKETS):
+        self._file = metrics_file
+        self._bounds = tuple(sorted(buckets))
+        self._bucket_keys = tuple(
+            _encode_key(key, _format_bound(bound)) for bound in self._bounds)
+        self._bucket_keys += (_encode_key(key, "+Inf"),)
+        self._sum_key = _encode_key(key, "sum")
+        self._count_key = _encode_key(key, "count")
+        self._pid = None
+
+    @property
+    def bounds(self):
+        return self._bounds
+
+    @property
+    def count(self):
+        return int(self._file.get(self._count_key))
+
+    @property
+    def sum(self):
+        return self._file.get(self._sum_key)
+
+    def observe(self, value):
+        if self._pid != os.getpid():
+            # All buckets are reported, even if empty.
+            self._file.add((key, 0) for key in self._bucket_keys)
+            self._pid = os.getpid()
+
+        index = bisect_left(self._bounds, value)
+        self._file.add(((self._bucket_keys[index], 1),
+                        (self._sum_key, value),
+                        (self._count_key, 1)))
+
+
+class MetricsRegistry:
+    """Named metrics, identified by their name and labels.
+
+    Getting a metric creates it on first use, callers should keep a
+    reference to metrics updated on hot paths.
+
+    Metrics are kept in process unless the registry is shared (see
+    ``share``) by the worker processes of an instance.
+
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._metrics = {}
+        self._file = None
+
+    def share(self, directory):
+        """Share the metrics of the processes using ``directory``.
+
+        Every process then writes its metrics to its own memory-mapped
+        file in ``directory`` (which must exist and only be used by the
+        processes of one instance), snapshots merge the files of live
+        processes: counters and histograms are summed, gauges are
+        reported by process (with a ``pid`` label). Files of dead
+        processes are removed.
+
+        Must be called before metrics are created, e.g. before forking
+        workers for ``default_registry``.
+
+        """
+        with self._lock:
+            if self._metrics:
+                raise ValueError("metrics must be shared before being "
+                                 "created")
+
+            self._file = _MetricsFile(directory)
+
+        self._file.remove_dead_files()
+
+    def counter(self, name, **labels):
+        return self._get("counter", name, labels, Counter, _SharedCounter)
+
+    def gauge(self, name, **labels):
+        return self._get("gauge", name, labels, Gauge, _SharedGauge)
+
+    def histogram(self, name, buckets=DEFAULT_BUCKETS, **labels):
+        return self._get(
+            "histogram", name, labels,
+            lambda: Histogram(buckets),
+            lambda metrics_file, key: _SharedHistogram(metrics_file, key,
+                                                       buckets))
+
+    def snapshot(self):
+        if self._file is not None:
+            return self._file.snapshot()
+
+        with self._lock:
+            items = sorted(self._metrics.items())
+
+        snapshot = {"counters": [], "gauges": [], "histograms": []}
+        for (kind, name, labels), metric in items:
+            entry = {"name": name, "labels": dict(labels)}
+            entry.update(metric.snapshot())
+            snapshot[kind + "s"].append(entry)
+
+        return snapshot
+
+    def _get(self, kind, name, labels, factory, shared_factory):
+        key = (kind, name, tuple(sorted(labels.items())))
+        try:
+            return self._metrics[key]
+        except KeyError:
+            with self._lock:
+                metric = self._metrics.get(key)
+                if metric is None:
+                    if self._file is None:
+                        metric = factory()
+                    else:
+                        metric = shared_factory(self._file, key)
+
+                    self._metrics[key] = metric
+
+                return metric
+
+
+class _MetricsFile:
+    """Memory-mapped metrics files of the processes of an instance.
+
+    Each process only writes to its own file, which is created on its
+    first write (after forking, values start from zero in children).
+
+    """
+
+    def __init__(self, directory):
+        self._directory = directory
+        self._lock = threading.Lock()
+        self._pid = None
+        self._memory = None
+        self._used = 0
+        self._offsets = {}
+
+    def get(self, key):
+        with self._lock:
+            offset = self._get_offset(key)
+            return _VALUE.unpack_from(self._memory, offset)[0]
+
+    def set(self, key, value):
+        with self._lock:
+            _VALUE.pack_into(self._memory, self._get_offset(key), value)
+
+    def add(self, items):
+        with self._lock:
+            for key, amount in items:
+                offset = self._get_offset(key)
+                value = _VALUE.unpack_from(self._memory, offset)[0]
+                _VALUE.pack_into(self._memory, offset, value + amount)
+
+    def snapshot(self):
+        counters = {}
+        gauges = {}
+        histograms = {}
+        for pid, entries in self._read_files():
+            for key, value in entries:
+                kind, name, labels, field = json.loads(key)
+                labels = tuple(sorted(tuple(label) for label in labels))
+                if kind == "counter":
+                    counters[name, labels] = (
+                        counters.get((name, labels), 0) + _to_number(value))
+                elif kind == "gauge":
+                    gauges[name, labels + (("pid", str(pid)),)] = (
+                        _to_number(value))
+                else:
+                    histogram = histograms.setdefault((name, labels), {})
+                    histogram[field] = histogram.get(field, 0) + value
+
+        snapshot = {"counters": [], "gauges": [], "histograms": []}
+        for (name, labels), value in sorted(counters.items()):
+            snapshot["counters"].append(
+                {"name": name, "labels": dict(labels), "value": value})
+
+        for (name, labels), value in sorted(gauges.items()):
+            snapshot["gauges"].append(
+                {"name": name, "labels": dict(labels), "value": value})
+
+        for (name, labels), fields in sorted(histograms.items()):
+            entry = {"name": name, "labels": dict(labels)}
+            entry.update(_get_histogram_snapshot(fields))
+            snapshot["histograms"].append(entry)
+
+        return snapshot
+
+    def remove_dead_files(self):
+        for _ in self._read_files():
+            pass
+
+    def _get_offset(self, key):
+        if self._pid != os.getpid():
+            self._open()
+
+        try:
+            return self._offsets[key]
+        except KeyError:
+            pass
+
+        encoded_key = key.encode("utf-8")
+        position = self._used
+        offset = position + _align(_KEY_SIZE.size + len(encoded_key))
+        while offset + _VALUE.size > len(self._memory):
+            self._memory.resize(len(self._memory) * 2)
+
+        memory = self._memory
+        _KEY_SIZE.pack_into(memory, position, len(encoded_key))
+        start = position + _KEY_SIZE.size
+        memory[start:start + len(encoded_key)] = encoded_key
+        _VALUE.pack_into(memory, offset, 0.0)
+        # Readers only see entries once they are written.
+        self._used = offset + _VALUE.size
+        _USED_SIZE.pack_into(memory, 0, self._used)
+        self._offsets[key] = offset
+        return offset
+
+    def _open(self):
+        pid = os.getpid()
+        fd = os.open(self._get_path(pid), os.O_RDWR | os.O_CREAT | os.O_TRUNC,
+                     0o600)
+        try:
+            os.ftruncate(fd, _INITIAL_FILE_SIZE)
+            self._memory = mmap.mmap(fd, _INITIAL_FILE_SIZE)
+        finally:
+            os.close(fd)
+
+        self._pid = pid
+        self._used = _USED_SIZE.size
+        self._offsets = {}
+        _USED_SIZE.pack_into(self._memory, 0, self._used)
+
+    def _get_path(self, pid):
+        return os.path.join(self._directory, "metrics-{}.db".format(pid))
+
+    def _read_files(self):
+        for path in glob.glob(os.path.join(self._directory,
+                                           "metrics-*.db")):
+            try:
+                pid = int(os.path.basename(path)[8:-3])
+            except ValueError:
+                continue
+
+            if not _is_alive(pid):
+                _remove_file(path)
+                continue
+
+            try:
+                with open(path, "rb") as metrics_file:
+                    data = metrics_file.read()
+            except OSError:
+                continue
+
+            yield pid, _read_entries(data)
+
+
+def _read_entries(data):
+    if len(data) < _USED_SIZE.size:
+        return
+
+    used = min(_USED_SIZE.unpack_from(data, 0)[0], len(data))
+    position = _USED_SIZE.size
+    while position + _KEY_SIZE.size <= used:
+        key_size = _KEY_SIZE.unpack_from(data, position)[0]
+        start = position + _KEY_SIZE.size
+        offset = position + _align(_KEY_SIZE.size + key_size)
+        if offset + _VALUE.size > used:
+            return
+
+        yield (data[start:start + key_size].decode("utf-8"),
+               _VALUE.unpack_from(data, offset)[0])
+        position = offset + _VALUE.size
+
+
+def _align(size):
+    return (size + 7) // 8 * 8
+
+
+def _get_histogram_snapshot(fields):
+    bounds = sorted(float(field) for field in fields
+                    if field not in ("sum", "count", "+Inf"))
+    buckets = []
+    cumulative = 0
+    for bound in bounds + ["+Inf"]:
+        cumulative += int(fields.get(bound if bound == "+Inf" else
+                                     _format_bound(bound), 0))
+        buckets.append([bound, cumulative])
+
+    return {"buckets": buckets, "sum": fields.get("sum", 0.0),
+            "count": cumulative}
+
+
+def _encode_key(key, field=None):
+    kind, name, labels = key
+    return json.dumps([kind, name, labels, field])
+
+
+def _to_number(value):
+    return int(value) if value.is_integer() else value
+
+
+def _format_bound(bound):
+    return repr(float(bound))
+
+
+def _is_alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+
+    return True
+
+
+def _remove_file(path):
+    try:
+        os.remove(path)
+    except OSError:
+        pass
+
+
+default_registry = MetricsRegistry()
@@ -14,5 +14,6 @@ def get_default_settings():
         "name": "Limonado",
         "id": uuid.uuid4().hex[:8],
         "version": "1",
-        "server": "Limonado/{}".format(__version__)
+        "server": "Limonado/{}".format(__version__),
+        "preload_endpoints": False
     }
@@ -1,9 +1,24 @@
 # -*- coding: utf-8 -*-
 
-__all__ = ["extract_params"]
+from array import array
+from collections import OrderedDict
+import threading
+
+__all__ = ["NumberArray", "exclude_parsed", "extract_params"]
 
 _ITEM_SEPARATORS = {None: None, " ": b" ", ",": b",", "|": b"|"}
 
+_ANNOTATIONS = frozenset(["default", "description", "example", "title"])
+
+# Keywords checked while parsing compact arrays and their items.
+_COMPACT_KEYWORDS = frozenset(
+    ["compact", "itemSeparator", "items", "maxItems", "minItems", "type"])
+
+_COMPACT_ITEM_KEYWORDS = frozenset(
+    ["exclusiveMaximum", "exclusiveMinimum", "maximum", "minimum", "type"])
+
+_COMPACT_TYPECODES = {"integer": "q", "number": "d"}
+
 _CONVERTERS = {
     "boolean": lambda v: v == b"true" if v in (b"true", b"false") else v,
     "integer": int,
@@ -13,6 +28,19 @@ _CONVERTERS = {
 }
 
 
+# Schemas without the properties of compact arrays, by schema and names,
+# for the last _EXCLUDED_SCHEMAS_SIZE ones used.
+_excluded_schemas = OrderedDict()
+_excluded_schemas_lock = threading.Lock()
+_EXCLUDED_SCHEMAS_SIZE = 256
+
+
+class NumberArray(array):
+    """Numbers of a compact array parameter, validated while parsed."""
+
+    __slots__ = ()
+
+
 def extract_params(arguments, schema):
     properties = schema.get("properties", {})
     additional_properties = schema.get("additionalProperties")
@@ -47,6 +75,11 @@ def _convert_array(values, schema):
     except KeyError:
         raise ValueError("invalid item separator: {}".format(separator))
 
+    if separator is not None and schema.get("compact") is True:
+        numbers = _parse_numbers(values[-1], separator, schema)
+        if numbers is not None:
+            return numbers
+
     if separator is None:
         items = values
     elif values[-1]:
@@ -74,6 +107,99 @@ def _convert_array(values, schema):
     ]
 
 
+def _parse_numbers(buffer, separator, schema):
+    """Parse and validate the numbers of a compact array in bulk.
+
+    Compact arrays (with ``"compact": true``) of integers or numbers are
+    converted in one pass into a ``NumberArray``. Return None, for the
+    generic conversion and validation (and their error messages) to be
+    used instead, if the schema uses other keywords or the value is
+    invalid.
+
+    """
+    items_schema = schema.get("items")
+    if (not isinstance(items_schema, dict) or
+            not schema.keys() - _ANNOTATIONS <= _COMPACT_KEYWORDS or
+            not items_schema.keys() - _ANNOTATIONS <= _COMPACT_ITEM_KEYWORDS):
+        return None
+
+    try:
+        typecode = _COMPACT_TYPECODES[items_schema.get("type")]
+    except (KeyError, TypeError):
+        return None
+
+    parts = buffer.split(separator) if buffer else []
+    if not (schema.get("minItems", 0) <= len(parts) <=
+            schema.get("maxItems", len(parts))):
+        return None
+
+    convert = int if typecode == "q" else float
+    try:
+        numbers = NumberArray(typecode, map(convert, parts))
+    except (ValueError, OverflowError):
+        return None
+
+    # Comparisons with NaN are left to the generic validation.
+    if typecode == "d" and numbers != numbers:
+        return None
+
+    if numbers and not _check_bounds(min(numbers), max(numbers),
+                                     items_schema):
+        return None
+
+    return numbers
+
+
+def _check_bounds(smallest, largest, schema):
+    if "minimum" in schema:
+        if schema.get("exclusiveMinimum", False):
+            if smallest <= schema["minimum"]:
+                return False
+        elif smallest < schema["minimum"]:
+            return False
+
+    if "maximum" in schema:
+        if schema.get("exclusiveMaximum", False):
+            if largest >= schema["maximum"]:
+                return False
+        elif largest > schema["maximum"]:
+            return False
+
+    return True
+
+
+def exclude_parsed(schema, params):
+    """Return the schema to validate ``params`` extracted with ``schema``.
+
+    Compact arrays are validated while parsed, their properties are not
+    validated again.
+
+    """
+    names = frozenset(name for name, value in params.items()
+                      if isinstance(value, NumberArray))
+    if not names:
+        return schema
+
+    key = (id(schema), names)
+    with _excluded_schemas_lock:
+        cached_schema, excluded_schema = _excluded_schemas.get(
+            key, (None, None))
+        if cached_schema is schema:
+            _excluded_schemas.move_to_end(key)
+            return excluded_schema
+
+    properties = dict(schema.get("properties", {}))
+    properties.update((name, {}) for name in names)
+    excluded_schema = dict(schema, properties=properties)
+    with _excluded_schemas_lock:
+        # The schema is kept alive while cached for its id to stay valid.
+        _excluded_schemas[key] = (schema, excluded_schema)
+        if len(_excluded_schemas) > _EXCLUDED_SCHEMAS_SIZE:
+            _excluded_schemas.popitem(last=False)
+
+    return excluded_schema
+
+
 def _convert(value, schema):
     type_name = _guess_type(schema)
     if type_name == "object":
@@ -0,0 +1,130 @@
+# -*- coding: utf-8 -*-
+
+import abc
+from collections import OrderedDict
+import time
+
+__all__ = ["CacheBackend", "TTLCache"]
+
+_MISSING = object()
+
+
+class CacheBackend(abc.ABC):
+    """Bounded cache whose entries expire after a time to live.
+
+    Implemented in process by ``TTLCache`` and across the worker
+    processes of a host by ``limonado.utils.shared_cache``.
+
+    """
+
+    @abc.abstractproperty
+    def max_size(self):
+        pass
+
+    @abc.abstractproperty
+    def ttl(self):
+        pass
+
+    def __contains__(self, key):
+        return self.get(key, _MISSING) is not _MISSING
+
+    @abc.abstractmethod
+    def get(self, key, default=None):
+        pass
+
+    @abc.abstractmethod
+    def set(self, key, value, ttl=None):
+        """Set an entry expiring after ``ttl`` (default: ``self.ttl``).
+
+        Return whether it was set: backends may not store every entry
+        (e.g. too large ones).
+
+        """
+
+    @abc.abstractmethod
+    def add(self, key, value, ttl=None):
+        """Set an entry if ``key`` is missing, return whether it was set.
+
+        Checking and setting are atomic, for one of concurrent callers to
+        claim a key.
+
+        """
+
+    @abc.abstractmethod
+    def pop(self, key, default=None):
+        pass
+
+    @abc.abstractmethod
+    def clear(self):
+        pass
+
+
+class TTLCache(CacheBackend):
+    """Bounded mapping whose entries expire after a time to live.
+
+    When full, the least recently used entry is evicted. The cache is not
+    thread safe, it is meant to be used from the IOLoop thread.
+
+    """
+
+    def __init__(self, max_size, ttl, timer=time.monotonic):
+        if max_size < 1:
+            raise ValueError("max_size must be positive")
+
+        self._max_size = max_size
+        self._ttl = ttl
+        self._timer = timer
+        self._entries = OrderedDict()
+
+    @property
+    def max_size(self):
+        return self._max_size
+
+    @property
+    def ttl(self):
+        return self._ttl
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, key, default=None):
+        try:
+            expiration_time, value = self._entries[key]
+        except KeyError:
+            return default
+
+        if expiration_time <= self._timer():
+            del self._entries[key]
+            return default
+
+        self._entries.move_to_end(key)
+        return value
+
+    def set(self, key, value, ttl=None):
+        if ttl is None:
+            ttl = self._ttl
+
+        self._entries[key] = (self._timer() + ttl, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self._max_size:
+            self._entries.popitem(last=False)
+
+        return True
+
+    def add(self, key, value, ttl=None):
+        if self.get(key, _MISSING) is not _MISSING:
+            return False
+
+        self.set(key, value, ttl)
+        return True
+
+    def pop(self, key, default=None):
+        try:
+            expiration_time, value = self._entries.pop(key)
+        except KeyError:
+            return default
+
+        return value if expiration_time > self._timer() else default
+
+    def clear(self):
+        self._entries.clear()
@@ -1,14 +1,21 @@
 # -*- coding: utf-8 -*-
 
+from datetime import datetime
 from datetime import timedelta
-
-from dateutil.parser import parse as parse_date
+from datetime import timezone
+import re
 
 __all__ = [
     "parse_date",
-    "parse_duration"
+    "parse_datetime",
+    "parse_duration",
+    "parse_rfc3339"
 ]
 
+_RFC3339_PATTERN = re.compile(
+    r"(\d{4})-(\d{2})-(\d{2})[Tt](\d{2}):(\d{2}):(\d{2})(?:\.(\d+))?"
+    r"(?:[Zz]|([+-])(\d{2}):(\d{2}))\Z", re.ASCII)
+
 _UNIT_TIMEDELTA_ARGS = (
     ("ms", "milliseconds"),
     ("s", "seconds"),
@@ -19,6 +26,50 @@ _UNIT_TIMEDELTA_ARGS = (
 )
 
 
+def parse_date(*args, **kwargs):
+    """Parse a date with ``dateutil``, which is only imported when used."""
+    from dateutil.parser import parse
+
+    return parse(*args, **kwargs)
+
+
+def parse_datetime(value):
+    """Parse a timestamp, strict RFC 3339 ones without ``dateutil``.
+
+    Other formats (and invalid RFC 3339 timestamps, e.g. with a leap
+    second) are parsed with ``parse_date``.
+
+    """
+    try:
+        return parse_rfc3339(value)
+    except ValueError:
+        return parse_date(value)
+
+
+def parse_rfc3339(value):
+    """Parse a strict RFC 3339 timestamp, raise ValueError otherwise.
+
+    Leap seconds can't be represented by ``datetime`` and are rejected.
+
+    """
+    match = _RFC3339_PATTERN.match(value)
+    if match is None:
+        raise ValueError("invalid RFC 3339 timestamp: {}".format(value))
+
+    (year, month, day, hour, minute, second, fraction, sign, offset_hours,
+     offset_minutes) = match.groups()
+    microsecond = int(fraction[:6].ljust(6, "0")) if fraction else 0
+    if sign is None:
+        tzinfo = timezone.utc
+    else:
+        offset = timedelta(hours=int(offset_hours),
+                           minutes=int(offset_minutes))
+        tzinfo = timezone(-offset if sign == "-" else offset)
+
+    return datetime(int(year), int(month), int(day), int(hour),
+                    int(minute), int(second), microsecond, tzinfo)
+
+
 def parse_duration(value):
     if isinstance(value, (float, int)):
         return timedelta(seconds=value)
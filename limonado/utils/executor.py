@@ -0,0 +1,263 @@
+# -*- coding: utf-8 -*-
+
+from collections import deque
+from concurrent import futures
+import os
+import threading
+import time
+
+from ..metrics import default_registry
+
+__all__ = ["DEFAULT_CLASSES", "PriorityExecutor", "get_class_executor"]
+
+DEFAULT_CLASSES = {"health": 100, "default": 10, "batch": 1}
+
+
+class PriorityExecutor(futures.Executor):
+    """Thread pool running queued calls by priority class.
+
+    Calls are queued in the class of their executor view (see
+    ``for_class``), ``submit`` queues them in ``default_class``.
+    ``classes`` maps class names to weights: idle workers take the next
+    call of the class with the highest weight if ``strict``, otherwise
+    classes share the workers in proportion to their weights (stride
+    scheduling), calls of a class are run in order.
+
+    Calls already running are not preempted, so ``reserved_workers``
+    workers are kept for the ``reserved_classes`` (health checks by
+    default): calls of other classes only run on the rest of them.
+
+    The wait of calls in the queue is observed per class in the
+    ``executor_wait_seconds`` histogram of ``metrics``.
+
+    """
+
+    def __init__(self, max_workers=None, classes=None, strict=False,
+                 default_class="default", reserved_workers=1,
+                 reserved_classes=("health",), metrics=None,
+                 thread_name_prefix="limonado-executor"):
+        if max_workers is None:
+            max_workers = (os.cpu_count() or 1) * 5
+
+        if classes is None:
+            classes = DEFAULT_CLASSES
+
+        if metrics is None:
+            metrics = default_registry
+
+        if any(weight <= 0 for weight in classes.values()):
+            raise ValueError("class weights must be positive")
+
+        if default_class not in classes:
+            raise ValueError("unknown default class '{}'".format(
+                default_class))
+
+        reserved_classes = frozenset(reserved_classes) & frozenset(classes)
+        if not reserved_classes:
+            reserved_workers = 0
+
+        if not 0 <= reserved_workers < max_workers:
+            raise ValueError("reserved_workers must leave workers to the "
+                             "other classes")
+
+        self._max_workers = max_workers
+        self._weights = dict(classes)
+        self._strict = strict
+        self._default_class = default_class
+        self._reserved_workers = reserved_workers
+        self._reserved_classes = reserved_classes
+        self._thread_name_prefix = thread_name_prefix
+        self._queues = {name: deque() for name in classes}
+        # Classes by decreasing weight, for strict priorities.
+        self._order = sorted(classes, key=lambda name: -classes[name])
+        self._passes = dict.fromkeys(classes, 0.0)
+        self._virtual_time = 0.0
+        self._queued = 0
+        self._running_shared = 0
+        self._idle_workers = 0
+        self._threads = []
+        self._shutdown = False
+        self._condition = threading.Condition()
+        self._views = {name: _ClassExecutor(self, name) for name in classes}
+        self._wait_times = {
+            name: metrics.histogram("executor_wait_seconds",
+                                    priority_class=name)
+            for name in classes
+        }
+
+    @property
+    def max_workers(self):
+        return self._max_workers
+
+    @property
+    def classes(self):
+        return dict(self._weights)
+
+    def for_class(self, name):
+        """Return an executor queuing calls in the class ``name``.
+
+        Shutting the returned executor down has no effect.
+
+        """
+        try:
+            return self._views[name]
+        except KeyError:
+            raise ValueError("unknown priority class '{}'".format(name))
+
+    def get_stats(self):
+        """Return the queued calls and wait times by class."""
+        with self._condition:
+            queued = {name: len(queue) for name, queue in
+                      self._queues.items()}
+
+        return {
+            name: {
+                "queued": queued[name],
+                "waited": histogram.count,
+                "wait_time": histogram.sum
+            }
+            for name, histogram in self._wait_times.items()
+        }
+
+    def submit(self, fn, *args, **kwargs):
+        return self.submit_to(self._default_class, fn, *args, **kwargs)
+
+    def submit_to(self, name, fn, *args, **kwargs):
+        """Queue a call in the class ``name``."""
+        if name not in self._queues:
+            raise ValueError("unknown priority class '{}'".format(name))
+
+        future = futures.Future()
+        with self._condition:
+            if self._shutdown:
+                raise RuntimeError("cannot schedule new futures after "
+                                   "shutdown")
+
+            queue = self._queues[name]
+            if not queue:
+                # Idle classes don't accumulate credit while idle.
+                self._passes[name] = max(self._passes[name],
+                                         self._virtual_time)
+
+            queue.append((future, fn, args, kwargs, time.monotonic()))
+            self._queued += 1
+            if (self._idle_workers < self._queued and
+                    len(self._threads) < self._max_workers):
+                self._start_worker()
+
+            self._condition.notify()
+
+        return future
+
+    def shutdown(self, wait=True):
+        with self._condition:
+            self._shutdown = True
+            self._condition.notify_all()
+
+        if wait:
+            for thread in self._threads:
+                thread.join()
+
+    def _start_worker(self):
+        thread = threading.Thread(
+            target=self._run_worker,
+            name="{}-{}".format(self._thread_name_prefix, len(self._threads)),
+            daemon=True)
+        self._threads.append(thread)
+        thread.start()
+
+    def _run_worker(self):
+        while True:
+            with self._condition:
+                while True:
+                    item = self._pop()
+                    if item is not None or (self._shutdown and
+                                            not self._queued):
+                        break
+
+                    self._idle_workers += 1
+                    self._condition.wait()
+                    self._idle_workers -= 1
+
+            if item is None:
+                return
+
+            name, (future, fn, args, kwargs, queue_time) = item
+            self._wait_times[name].observe(time.monotonic() - queue_time)
+            try:
+                if future.set_running_or_notify_cancel():
+                    try:
+                        result = fn(*args, **kwargs)
+                    except BaseException as exc:
+                        future.set_exception(exc)
+                    else:
+                        future.set_result(result)
+            finally:
+                if name not in self._reserved_classes:
+                    with self._condition:
+                        self._running_shared -= 1
+                        # A call waiting for a shared worker may now run.
+                        self._condition.notify()
+
+            del future, fn, args, kwargs
+
+    def _pop(self):
+        if not self._queued:
+            return None
+
+        shared = (self._running_shared <
+                  self._max_workers - self._reserved_workers)
+        candidates = [
+            name for name in self._order
+            if self._queues[name] and (
+                shared or name in self._reserved_classes)
+        ]
+        if not candidates:
+            return None
+
+        if self._strict:
+            name = candidates[0]
+        else:
+            name = min(candidates, key=lambda name: self._passes[name])
+            self._virtual_time = self._passes[name]
+            self._passes[name] += 1.0 / self._weights[name]
+
+        if name not in self._reserved_classes:
+            self._running_shared += 1
+
+        self._queued -= 1
+        return name, self._queues[name].popleft()
+
+
+def get_class_executor(executor, name):
+    """Return the view of the class ``name`` of a ``PriorityExecutor``.
+
+    Other executors, and priority executors without such a class, are
+    returned as they are.
+
+    """
+    if name is None or not isinstance(executor, PriorityExecutor):
+        return executor
+
+    try:
+        return executor.for_class(name)
+    except ValueError:
+        return executor
+
+
+class _ClassExecutor(futures.Executor):
+    def __init__(self, executor, name):
+        self._executor = executor
+        self._name = name
+
+    @property
+    def name(self):
+        return self._name
+
+    def submit(self, fn, *args, **kwargs):
+        return self._executor.submit_to(self._name, fn, *args, **kwargs)
+
+    def shutdown(self, wait=True):
+        # Views share the pool of their executor, which is shut down by
+        # its owner.
+        pass
@@ -0,0 +1,229 @@
+# -*- coding: utf-8 -*-
+
+import hashlib
+import mmap
+import multiprocessing
+import pickle
+import struct
+import time
+
+from .cache import CacheBackend
+
+__all__ = ["SharedMemoryCache"]
+
+_MISSING = object()
+
+# Slots start with a sequence number, odd while the slot is written,
+# followed by the hash of the key, the expiration time (0 for empty
+# slots), the sizes of the key and of the pickled value, then both.
+_SEQUENCE = struct.Struct("<I")
+_ENTRY = struct.Struct("<QdHI")
+_HEADER_SIZE = _SEQUENCE.size + _ENTRY.size
+
+# Reads overlapping writes are retried, then count as misses.
+_MAX_READ_ATTEMPTS = 8
+
+
+class SharedMemoryCache(CacheBackend):
+    """Cache shared by the worker processes forked after its creation.
+
+    Entries are stored in fixed-size slots (of ``slot_size`` bytes,
+    including a 26 bytes header, larger entries are not cached) of an
+    anonymous shared memory map, values are pickled. Keys (bytes or
+    strings) are hashed to a set of ``ways`` slots, in which the entry
+    closest to expiration is evicted when it is full. Expiration times
+    use ``timer``, which must be the same for all processes.
+
+    Writers lock the set of their key (with one of ``lock_count`` locks
+    shared by all the sets), readers don't: slots are versioned with a
+    sequence number, reads overlapping a write are retried.
+
+    """
+
+    def __init__(self, max_size, ttl, slot_size=1024, ways=8,
+                 lock_count=64, timer=time.time):
+        if max_size < 1:
+            raise ValueError("max_size must be positive")
+
+        if slot_size <= _HEADER_SIZE:
+            raise ValueError("slot_size must be greater than {}".format(
+                _HEADER_SIZE))
+
+        self._ways = max(1, min(ways, max_size))
+        self._set_count = -(-max_size // self._ways)
+        self._slot_size = slot_size
+        self._ttl = ttl
+        self._timer = timer
+        self._memory = mmap.mmap(-1, self.max_size * slot_size)
+        self._locks = [multiprocessing.Lock()
+                       for _ in range(min(lock_count, self._set_count))]
+
+    @property
+    def max_size(self):
+        return self._set_count * self._ways
+
+    @property
+    def ttl(self):
+        return self._ttl
+
+    @property
+    def slot_size(self):
+        return self._slot_size
+
+    def __len__(self):
+        now = self._timer()
+        memory = self._memory
+        return sum(
+            1 for offset in range(0, len(memory), self._slot_size)
+            if _ENTRY.unpack_from(memory, offset + _SEQUENCE.size)[1] > now)
+
+    def get(self, key, default=None):
+        key, digest, offset = self._locate(key)
+        for offset in range(offset, offset + self._ways * self._slot_size,
+                            self._slot_size):
+            value = self._read(offset, key, digest)
+            if value is not _MISSING:
+                return value
+
+        return default
+
+    def set(self, key, value, ttl=None):
+        """Set an entry, or remove it if it does not fit in a slot.
+
+        Return whether it was set.
+
+        """
+        if ttl is None:
+            ttl = self._ttl
+
+        data = pickle.dumps(value, pickle.HIGHEST_PROTOCOL)
+        encoded_key, digest, offset = self._locate(key)
+        if _HEADER_SIZE + len(encoded_key) + len(data) > self._slot_size:
+            self.pop(key)
+            return False
+
+        with self._get_lock(offset):
+            now = self._timer()
+            slot_offset = self._find_slot(offset, encoded_key, digest, now)
+            self._write(slot_offset, digest, now + ttl, encoded_key, data)
+
+        return True
+
+    def add(self, key, value, ttl=None):
+        """Set an entry if ``key`` is missing, under the lock of its set.
+
+        Raise ValueError if the entry does not fit in a slot.
+
+        """
+        if ttl is None:
+            ttl = self._ttl
+
+        data = pickle.dumps(value, pickle.HIGHEST_PROTOCOL)
+        encoded_key, digest, offset = self._locate(key)
+        if _HEADER_SIZE + len(encoded_key) + len(data) > self._slot_size:
+            raise ValueError("entry larger than a slot")
+
+        with self._get_lock(offset):
+            now = self._timer()
+            slot_offset = self._find_slot(offset, encoded_key, digest, now)
+            if self._read(slot_offset, encoded_key, digest) is not _MISSING:
+                return False
+
+            self._write(slot_offset, digest, now + ttl, encoded_key, data)
+
+        return True
+
+    def pop(self, key, default=None):
+        key, digest, offset = self._locate(key)
+        with self._get_lock(offset):
+            slot_offset = self._find_slot(offset, key, digest)
+            if slot_offset is None:
+                return default
+
+            value = self._read(slot_offset, key, digest)
+            self._write(slot_offset, 0, 0, b"", b"")
+
+        return default if value is _MISSING else value
+
+    def clear(self):
+        set_size = self._ways * self._slot_size
+        for offset in range(0, len(self._memory), set_size):
+            with self._get_lock(offset):
+                for slot_offset in range(offset, offset + set_size,
+                                         self._slot_size):
+                    self._write(slot_offset, 0, 0, b"", b"")
+
+    def _locate(self, key):
+        if isinstance(key, str):
+            key = key.encode("utf-8")
+
+        digest = int.from_bytes(
+            hashlib.blake2b(key, digest_size=8).digest(), "little")
+        set_index = digest % self._set_count
+        return key, digest, set_index * self._ways * self._slot_size
+
+    def _get_lock(self, offset):
+        set_index = offset // (self._ways * self._slot_size)
+        return self._locks[set_index % len(self._locks)]
+
+    def _read(self, offset, key, digest):
+        memory = self._memory
+        entry_offset = offset + _SEQUENCE.size
+        for _ in range(_MAX_READ_ATTEMPTS):
+            sequence = _SEQUENCE.unpack_from(memory, offset)[0]
+            if sequence & 1:
+                continue
+
+            (slot_digest, expiration_time, key_size,
+             value_size) = _ENTRY.unpack_from(memory, entry_offset)
+            if slot_digest != digest:
+                return _MISSING
+
+            start = offset + _HEADER_SIZE
+            data = memory[start:start + key_size + value_size]
+            if _SEQUENCE.unpack_from(memory, offset)[0] != sequence:
+                continue
+
+            if data[:key_size] != key or expiration_time <= self._timer():
+                return _MISSING
+
+            return pickle.loads(data[key_size:])
+
+        return _MISSING
+
+    def _find_slot(self, offset, key, digest, now=None):
+        """Return the slot of a key, or the one to set it in if ``now``."""
+        memory = self._memory
+        key_size = len(key)
+        candidate_offset = None
+        candidate_expiration_time = None
+        for offset in range(offset, offset + self._ways * self._slot_size,
+                            self._slot_size):
+            (slot_digest, expiration_time, slot_key_size,
+             _) = _ENTRY.unpack_from(memory, offset + _SEQUENCE.size)
+            start = offset + _HEADER_SIZE
+            if (slot_digest == digest and expiration_time and
+                    slot_key_size == key_size and
+                    memory[start:start + key_size] == key):
+                return offset
+
+            if now is not None:
+                if expiration_time <= now:
+                    expiration_time = 0
+
+                if (candidate_offset is None or
+                        expiration_time < candidate_expiration_time):
+                    candidate_offset = offset
+                    candidate_expiration_time = expiration_time
+
+        return candidate_offset
+
+    def _write(self, offset, digest, expiration_time, key, data):
+        memory = self._memory
+        sequence = _SEQUENCE.unpack_from(memory, offset)[0]
+        _SEQUENCE.pack_into(memory, offset, (sequence + 1) & 0xffffffff)
+        _ENTRY.pack_into(memory, offset + _SEQUENCE.size, digest,
+                         expiration_time, len(key), len(data))
+        start = offset + _HEADER_SIZE
+        memory[start:start + len(key) + len(data)] = key + data
+        _SEQUENCE.pack_into(memory, offset, (sequence + 2) & 0xffffffff)
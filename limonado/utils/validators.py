@@ -1,12 +1,29 @@
 # -*- coding: utf-8 -*
 
 from .date import parse_duration
+from .date import parse_rfc3339
 
 __all__ = [
+    "validate_datetime",
     "validate_duration"
 ]
 
 
+def validate_datetime(instance):
+    """Check that ``instance`` is a strict RFC 3339 timestamp."""
+    if not isinstance(instance, str):
+        return True
+
+    try:
+        parse_rfc3339(instance)
+    except ValueError:
+        # Leap seconds are valid, but can't be parsed.
+        return (instance[17:19] == "60" and
+                validate_datetime(instance[:17] + "59" + instance[19:]))
+    else:
+        return True
+
+
 def validate_duration(instance):
     try:
         parse_duration(instance)
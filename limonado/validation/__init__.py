@@ -1,63 +1,187 @@
 # -*- coding: utf-8 -*-
 
+from functools import lru_cache
 from functools import wraps
+from inspect import isawaitable
+from inspect import iscoroutinefunction
 import logging
 
-import jsonschema
-from tornado.concurrent import is_future
-from tornado.gen import coroutine
-
 from ..exceptions import APIError
 from ..utils.decorators import container
+from ..utils.validators import validate_datetime
 from ..utils.validators import validate_duration
+from .registry import SchemaRegistry
 
-__all__ = ["format_checker", "validate_response"]
+__all__ = [
+    "SchemaRegistry",
+    "default_registry",
+    "format_checker",
+    "validate_response"
+]
 
 log = logging.getLogger(__name__)
 
-format_checker = jsonschema.FormatChecker()
+
+class _FormatChecker:
+    """Format checker deferring the import of ``jsonschema``.
+
+    Quacks like ``jsonschema.FormatChecker``, the actual checker (with
+    the formats known to ``jsonschema`` and the ones registered here) is
+    created on first use.
+
+    Checks of the formats registered here are memoized: the results for
+    the last ``cache_size`` (hashable) values are kept for each format.
+
+    """
+
+    def __init__(self, cache_size=1024):
+        self._formats = []
+        self._checker = None
+        self._cache_size = cache_size
+
+    def checks(self, format, raises=()):
+        def _register(func):
+            check = _memoize_check(func, raises, self._cache_size)
+            self._formats.append((format, check, raises))
+            if self._checker is not None:
+                self._checker.checks(format, raises)(check)
+
+            return func
+
+        return _register
+
+    def check(self, instance, format):
+        self._get_checker().check(instance, format)
+
+    def conforms(self, instance, format):
+        return self._get_checker().conforms(instance, format)
+
+    def _get_checker(self):
+        if self._checker is None:
+            import jsonschema
+
+            checker = jsonschema.FormatChecker()
+            for format, func, raises in self._formats:
+                checker.checks(format, raises)(func)
+
+            self._checker = checker
+
+        return self._checker
+
+
+def _memoize_check(func, raises, cache_size):
+    @lru_cache(maxsize=cache_size, typed=True)
+    def _cached_check(instance):
+        try:
+            return func(instance), None
+        except raises as error:
+            return False, error
+
+    @wraps(func)
+    def _check(instance):
+        try:
+            hash(instance)
+        except TypeError:
+            return func(instance)
+
+        result, error = _cached_check(instance)
+        if error is not None:
+            raise error.with_traceback(None)
+
+        return result
+
+    return _check
+
+
+format_checker = _FormatChecker()
 
 
 def register_format(name, validator):
     format_checker.checks(name)(validator)
 
 
+register_format("date-time", validate_datetime)
 register_format("duration", validate_duration)
 
+default_registry = SchemaRegistry()
+
 
 def validate_response(schema):
+    """Validate and write the value returned by a handler method.
+
+    The value is validated while being encoded to JSON, by a serializer
+    compiled once from the schema.
+
+    ``schema`` is a schema or the name of a schema registered in the
+    schema registry of the handler's context (``default_registry`` for
+    handlers without one).
+
+    Native coroutine methods get a native coroutine wrapper, other
+    methods a plain wrapper which only awaits results which are
+    awaitable (e.g. Futures of ``tornado.gen.coroutine`` methods, or
+    coroutines passed through by other decorators). No Future nor
+    IOLoop callback is added for either.
+
+    """
     @container
     def _validate(rh_method):
+        if iscoroutinefunction(rh_method):
+            @wraps(rh_method)
+            async def _async_wrapper(self, *args, **kwargs):
+                result = await rh_method(self, *args, **kwargs)
+                _write_response(self, result, schema)
+
+            return _async_wrapper
+
         @wraps(rh_method)
-        @coroutine
         def _wrapper(self, *args, **kwargs):
             result = rh_method(self, *args, **kwargs)
-            if is_future(result):
-                result = yield result
-
-            if result is not None:
-                try:
-                    jsonschema.validate(
-                        result, schema, format_checker=format_checker)
-                except jsonschema.ValidationError:
-                    log.exception("Invalid response")
-                    raise APIError(500, "Invalid response")
+            if isawaitable(result):
+                return _write_awaited_response(self, result, schema)
 
-                self.write_json(result)
-                self.finish()
+            _write_response(self, result, schema)
 
         return _wrapper
 
     return _validate
 
 
-def validate_request_data(data, schema):
+async def _write_awaited_response(handler, awaitable, schema):
+    _write_response(handler, await awaitable, schema)
+
+
+def _write_response(handler, result, schema):
+    if result is not None:
+        import jsonschema
+
+        try:
+            body = _get_registry(handler).serialize(result, schema)
+        except jsonschema.ValidationError:
+            log.exception("Invalid response")
+            raise APIError(500, "Invalid response")
+
+        handler.write(body)
+        handler.finish()
+
+
+def validate_request_data(data, schema, registry=None):
+    import jsonschema
+
+    if registry is None:
+        registry = default_registry
+
     try:
-        jsonschema.validate(data, schema, format_checker=format_checker)
+        registry.validate(data, schema)
     except jsonschema.ValidationError as error:
         raise APIError(400, error.message, details=_get_details(error))
 
 
+def _get_registry(handler):
+    endpoint = getattr(handler, "endpoint", None)
+    registry = getattr(getattr(endpoint, "context", None), "schemas", None)
+    return default_registry if registry is None else registry
+
+
 def _get_details(error):
     path = ["root"]
     for item in error.absolute_path:
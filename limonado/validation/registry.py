@@ -0,0 +1,233 @@
+# -*- coding: utf-8 -*-
+
+from collections import OrderedDict
+import threading
+
+__all__ = ["SchemaRegistry"]
+
+_resolver_class = None
+
+
+class SchemaRegistry:
+    """Named JSON schemas with shared, memoized ``$ref`` resolution.
+
+    Registered schemas are checked once and can reference each other by
+    name (e.g. ``{"$ref": "item"}`` or ``{"$ref": "item#/definitions/id"}``).
+    References are only resolved from the registry, remote references
+    are rejected instead of being fetched.
+
+    Validators and serializers are cached per thread for the last
+    ``cache_size`` schemas used (registered names or schema dicts, which
+    are kept alive while cached), resolved references to registered
+    schemas are shared by all validators until a schema is registered.
+    Formats are checked with ``format_checker``, by default the one of
+    ``limonado.validation``.
+
+    """
+
+    def __init__(self, format_checker=None, cache_size=256):
+        if cache_size < 1:
+            raise ValueError("cache_size must be positive")
+
+        self._format_checker = format_checker
+        self._cache_size = cache_size
+        self._schemas = {}
+        self._resolved = {}
+        self._generation = 0
+        self._local = threading.local()
+
+    @property
+    def names(self):
+        return frozenset(self._schemas)
+
+    def __contains__(self, name):
+        return name in self._schemas
+
+    def get(self, name):
+        try:
+            return self._schemas[name]
+        except KeyError:
+            raise ValueError("unknown schema: {}".format(name))
+
+    def register(self, name, schema):
+        """Check and register a schema under ``name``.
+
+        Registering an equal schema again under the same name is a no-op,
+        registering a different one fails.
+
+        """
+        if name in self._schemas:
+            if self._schemas[name] != schema:
+                raise ValueError("duplicate schema name: {}".format(name))
+
+            return
+
+        import jsonschema
+
+        try:
+            jsonschema.validators.validator_for(schema).check_schema(schema)
+        except jsonschema.SchemaError as error:
+            raise ValueError("invalid schema '{}': {}".format(
+                name, error.message))
+
+        self._schemas[name] = schema
+        self._resolved = {}
+        self._generation += 1
+
+    def register_all(self, schemas):
+        for name, schema in schemas.items():
+            self.register(name, schema)
+
+    def get_validator(self, schema, base_uri=None, referrer=None):
+        """Return the validator of a registered name or of a schema.
+
+        References of a schema which is part of a larger document are
+        resolved against ``base_uri`` and ``referrer`` (the document).
+
+        """
+        cache = self._get_cache()
+        key = ("validator", _get_key(schema), base_uri)
+        validator = _get_cached(cache, key, schema)
+        if validator is None:
+            validator = self._create_validator(schema, base_uri, referrer)
+            self._set_cached(cache, key, schema, validator)
+
+        return validator
+
+    def validate(self, instance, schema, base_uri=None, referrer=None):
+        """Raise ``jsonschema.ValidationError`` if ``instance`` is invalid."""
+        self.get_validator(schema, base_uri, referrer).validate(instance)
+
+    def get_serializer(self, schema):
+        """Return the serializer of a registered name or of a schema.
+
+        Serializers validate a value and encode it to JSON in a single
+        pass, see ``limonado.validation.serializer``.
+
+        """
+        cache = self._get_cache()
+        key = ("serializer", _get_key(schema))
+        serializer = _get_cached(cache, key, schema)
+        if serializer is not None:
+            return serializer
+
+        from .serializer import compile_serializer
+
+        if isinstance(schema, str):
+            serializer = compile_serializer(self.get(schema), self,
+                                            base_uri=schema)
+        else:
+            # Checks the schema.
+            self.get_validator(schema)
+            serializer = compile_serializer(schema, self,
+                                            base_uri=schema.get("id", ""))
+
+        self._set_cached(cache, key, schema, serializer)
+        return serializer
+
+    def serialize(self, instance, schema):
+        """Validate ``instance`` and return it encoded as JSON.
+
+        Raise ``jsonschema.ValidationError`` if ``instance`` is invalid.
+        The result is the same as ``tornado.escape.json_encode``.
+
+        """
+        return self.get_serializer(schema)(instance).replace("</", "<\\/")
+
+    def _get_cache(self):
+        local = self._local
+        if getattr(local, "generation", None) != self._generation:
+            local.cache = OrderedDict()
+            local.generation = self._generation
+
+        return local.cache
+
+    def _set_cached(self, cache, key, schema, value):
+        # The schema is kept alive for its id to stay valid.
+        cache[key] = (schema, value)
+        if len(cache) > self._cache_size:
+            cache.popitem(last=False)
+
+    def _create_validator(self, schema, base_uri=None, referrer=None):
+        import jsonschema
+
+        if isinstance(schema, str):
+            if base_uri is None:
+                base_uri = schema
+
+            schema = self.get(schema)
+        else:
+            if base_uri is None:
+                base_uri = schema.get("id", "")
+
+            validator_class = jsonschema.validators.validator_for(schema)
+            try:
+                validator_class.check_schema(schema)
+            except jsonschema.SchemaError as error:
+                raise ValueError("invalid schema: {}".format(error.message))
+
+        format_checker = self._format_checker
+        if format_checker is None:
+            from . import format_checker
+
+        if referrer is None:
+            referrer = schema
+
+        resolver = _get_resolver_class()(base_uri, referrer, self._schemas,
+                                         self._resolved)
+        validator_class = jsonschema.validators.validator_for(schema)
+        return validator_class(schema, resolver=resolver,
+                               format_checker=format_checker)
+
+
+def _get_key(schema):
+    return schema if isinstance(schema, str) else id(schema)
+
+
+def _get_cached(cache, key, schema):
+    try:
+        cached_schema, value = cache[key]
+    except KeyError:
+        return None
+
+    if cached_schema is not schema and not isinstance(schema, str):
+        return None
+
+    cache.move_to_end(key)
+    return value
+
+
+def _get_resolver_class():
+    global _resolver_class
+    if _resolver_class is None:
+        from urllib.parse import urldefrag
+
+        from jsonschema import RefResolutionError
+        from jsonschema import RefResolver
+
+        class _RegistryRefResolver(RefResolver):
+            def __init__(self, base_uri, referrer, schemas, resolved):
+                super().__init__(base_uri, referrer, store=schemas,
+                                 cache_remote=False)
+                self._schemas = schemas
+                self._resolved = resolved
+
+            def resolve_from_url(self, url):
+                try:
+                    return self._resolved[url]
+                except KeyError:
+                    document = super().resolve_from_url(url)
+                    # Only references into registered schemas are shared,
+                    # others are relative to the validated schema.
+                    if urldefrag(url)[0] in self._schemas:
+                        self._resolved[url] = document
+
+                    return document
+
+            def resolve_remote(self, uri):
+                raise RefResolutionError(
+                    "unknown schema reference: {}".format(uri))
+
+        _resolver_class = _RegistryRefResolver
+
+    return _resolver_class
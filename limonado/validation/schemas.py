@@ -25,6 +25,9 @@ SETTINGS = {
         "base_path": {
             "type": "string",
             "minLength": 1
+        },
+        "preload_endpoints": {
+            "type": "boolean"
         }
     },
     "required": [
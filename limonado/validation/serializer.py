@@ -0,0 +1,278 @@
+# -*- coding: utf-8 -*-
+
+import json
+from json.encoder import encode_basestring_ascii
+from numbers import Number
+from urllib.parse import unquote
+from urllib.parse import urldefrag
+from urllib.parse import urljoin
+
+__all__ = ["compile_serializer"]
+
+# Keywords which don't constrain values.
+_ANNOTATIONS = frozenset([
+    "$schema", "default", "definitions", "description", "example",
+    "examples", "id", "title"
+])
+
+_TYPE_KEYWORDS = {
+    "array": frozenset(["items", "type"]),
+    "boolean": frozenset(["type"]),
+    "integer": frozenset(["type"]),
+    "null": frozenset(["type"]),
+    "number": frozenset(["type"]),
+    "object": frozenset([
+        "additionalProperties", "properties", "required", "type"
+    ]),
+    "string": frozenset(["type"])
+}
+
+_encode_any = json.JSONEncoder().encode
+
+
+def compile_serializer(schema, registry, base_uri=""):
+    """Compile a function validating a value and encoding it to JSON.
+
+    The value is walked once: types, properties, required properties and
+    array items are checked while the JSON document is built, with key
+    prefixes computed at compile time. Parts of the schema using other
+    keywords are validated with the validators of ``registry`` and
+    encoded generically. ``$ref`` are resolved from ``registry`` at
+    compile time.
+
+    The output is the same as the one of ``json.dumps`` (hence of
+    ``tornado.escape.json_encode`` but the escaping of ``</``), invalid
+    values raise ``jsonschema.ValidationError``.
+
+    """
+    import jsonschema
+
+    compiler = _Compiler(registry, schema, base_uri,
+                         jsonschema.ValidationError)
+    return compiler.compile(schema, base_uri)
+
+
+class _Compiler:
+    def __init__(self, registry, root, root_uri, error_class):
+        self._registry = registry
+        self._root = root
+        self._root_uri = root_uri
+        self._error_class = error_class
+        self._refs = {}
+
+    def compile(self, schema, base_uri):
+        if not isinstance(schema, dict):
+            return self._compile_fallback(schema, base_uri)
+
+        if "id" in schema:
+            base_uri = urljoin(base_uri, schema["id"])
+
+        if "$ref" in schema:
+            return self._compile_ref(schema["$ref"], base_uri)
+
+        keywords = schema.keys() - _ANNOTATIONS
+        if not keywords:
+            return _encode_any
+
+        type_name = schema.get("type")
+        if (not isinstance(type_name, str) or
+                not keywords <= _TYPE_KEYWORDS.get(type_name, frozenset())):
+            return self._compile_fallback(schema, base_uri)
+
+        if type_name == "object":
+            return self._compile_object(schema, base_uri)
+        elif type_name == "array":
+            return self._compile_array(schema, base_uri)
+
+        return self._compile_scalar(type_name)
+
+    def _compile_ref(self, ref, base_uri):
+        url = urljoin(base_uri, ref)
+        try:
+            return self._refs[url]
+        except KeyError:
+            pass
+
+        document_uri, fragment = urldefrag(url)
+        try:
+            if document_uri == self._root_uri:
+                document = self._root
+            else:
+                document = self._registry.get(document_uri)
+
+            subschema = _resolve_fragment(document, fragment)
+        except (LookupError, TypeError, ValueError):
+            return self._compile_fallback({"$ref": ref}, base_uri)
+
+        # References may be recursive, the compiled schema is looked up
+        # through a placeholder until it is known.
+        compiled = []
+
+        def _encode_ref(value):
+            return compiled[0](value)
+
+        self._refs[url] = _encode_ref
+        compiled.append(self.compile(subschema, document_uri))
+        return compiled[0]
+
+    def _compile_fallback(self, schema, base_uri):
+        validate = self._registry.validate
+        # References of the schema are relative to its whole document.
+        if base_uri == self._root_uri:
+            referrer = self._root
+        elif base_uri in self._registry:
+            referrer = self._registry.get(base_uri)
+        else:
+            referrer = None
+
+        def _encode_validated(value):
+            validate(value, schema, base_uri=base_uri, referrer=referrer)
+            return _encode_any(value)
+
+        return _encode_validated
+
+    def _compile_object(self, schema, base_uri):
+        error_class = self._error_class
+        properties = {
+            name: (encode_basestring_ascii(name) + ": ",
+                   self.compile(subschema, base_uri))
+            for name, subschema in schema.get("properties", {}).items()
+        }
+        required = tuple(schema.get("required", ()))
+        additional_properties = schema.get("additionalProperties", True)
+        if additional_properties is True:
+            encode_additional = _encode_any
+        elif additional_properties is False:
+            encode_additional = None
+        else:
+            encode_additional = self.compile(additional_properties,
+                                             base_uri)
+
+        def _encode_object(value):
+            if not isinstance(value, dict):
+                raise _type_error(error_class, value, "object")
+
+            for name in required:
+                if name not in value:
+                    raise error_class(
+                        "{!r} is a required property".format(name))
+
+            parts = []
+            for name, item in value.items():
+                try:
+                    prefix, encode = properties[name]
+                except (KeyError, TypeError):
+                    if encode_additional is None:
+                        raise error_class(
+                            "Additional properties are not allowed "
+                            "({!r} was unexpected)".format(name))
+
+                    prefix = _encode_key(name) + ": "
+                    encode = encode_additional
+
+                try:
+                    parts.append(prefix + encode(item))
+                except error_class as error:
+                    error.path.appendleft(name)
+                    raise
+
+            return "{" + ", ".join(parts) + "}"
+
+        return _encode_object
+
+    def _compile_array(self, schema, base_uri):
+        error_class = self._error_class
+        items = schema.get("items", {})
+        if not isinstance(items, dict):
+            return self._compile_fallback(schema, base_uri)
+
+        encode_item = self.compile(items, base_uri)
+
+        def _encode_array(value):
+            if not isinstance(value, list):
+                raise _type_error(error_class, value, "array")
+
+            try:
+                return "[" + ", ".join([encode_item(item)
+                                        for item in value]) + "]"
+            except error_class as error:
+                for index, item in enumerate(value):
+                    try:
+                        encode_item(item)
+                    except error_class:
+                        error.path.appendleft(index)
+                        break
+
+                raise
+
+        return _encode_array
+
+    def _compile_scalar(self, type_name):
+        error_class = self._error_class
+
+        if type_name == "string":
+            def _encode_string(value):
+                if not isinstance(value, str):
+                    raise _type_error(error_class, value, type_name)
+
+                return encode_basestring_ascii(value)
+
+            return _encode_string
+        elif type_name == "integer":
+            def _encode_integer(value):
+                if not isinstance(value, int) or isinstance(value, bool):
+                    raise _type_error(error_class, value, type_name)
+
+                return int.__repr__(value)
+
+            return _encode_integer
+        elif type_name == "number":
+            def _encode_number(value):
+                if not isinstance(value, Number) or isinstance(value, bool):
+                    raise _type_error(error_class, value, type_name)
+
+                return _encode_any(value)
+
+            return _encode_number
+        elif type_name == "boolean":
+            def _encode_boolean(value):
+                if value is True:
+                    return "true"
+                elif value is False:
+                    return "false"
+
+                raise _type_error(error_class, value, type_name)
+
+            return _encode_boolean
+
+        def _encode_null(value):
+            if value is not None:
+                raise _type_error(error_class, value, type_name)
+
+            return "null"
+
+        return _encode_null
+
+
+def _type_error(error_class, value, type_name):
+    return error_class("{!r} is not of type {!r}".format(value, type_name))
+
+
+def _encode_key(key):
+    if not isinstance(key, str):
+        # Same conversion of non-string keys as the json module.
+        key = _encode_any(key)
+
+    return encode_basestring_ascii(key)
+
+
+def _resolve_fragment(document, fragment):
+    fragment = fragment.lstrip("/")
+    for part in unquote(fragment).split("/") if fragment else ():
+        part = part.replace("~1", "/").replace("~0", "~")
+        if isinstance(document, list):
+            part = int(part)
+
+        document = document[part]
+
+    return document
@@ -36,11 +36,10 @@ def setup_package():
             "Operating System :: OS Independent",
             "Topic :: Internet :: WWW/HTTP",
             "Programming Language :: Python :: 3",
-            "Programming Language :: Python :: 3.4",
             "Programming Language :: Python :: 3.5",
             "Programming Language :: Python :: 3.6",
         ],
-        python_requires='>=3.4',
+        python_requires='>=3.5',
         install_requires=[
             "jsonschema>=2.5.1,<3.0",
             "python-dateutil>=2.5,<3.0",
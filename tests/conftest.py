@@ -0,0 +1,47 @@
+# -*- coding: utf-8 -*-
+
+import pytest
+from tornado.httpclient import AsyncHTTPClient
+from tornado.httpserver import HTTPServer
+from tornado.ioloop import IOLoop
+from tornado.testing import bind_unused_port
+
+
+@pytest.fixture
+def io_loop():
+    """Fresh IOLoop, made current for the duration of the test."""
+    loop = IOLoop()
+    loop.make_current()
+    yield loop
+    loop.clear_current()
+    loop.close(all_fds=True)
+
+
+@pytest.fixture
+def serve(io_loop):
+    """Serve an application on a local port and return its base URL."""
+    servers = []
+
+    def _serve(app):
+        sock, port = bind_unused_port()
+        server = HTTPServer(app)
+        server.add_sockets([sock])
+        servers.append(server)
+        return "http://127.0.0.1:{}".format(port)
+
+    yield _serve
+    for server in servers:
+        server.stop()
+
+
+@pytest.fixture
+def fetch(io_loop):
+    """Fetch a URL synchronously, without raising on HTTP errors."""
+    client = AsyncHTTPClient()
+
+    def _fetch(url, **kwargs):
+        kwargs.setdefault("raise_error", False)
+        return io_loop.run_sync(lambda: client.fetch(url, **kwargs))
+
+    yield _fetch
+    client.close()
@@ -0,0 +1,157 @@
+# -*- coding: utf-8 -*-
+
+from concurrent.futures import ThreadPoolExecutor
+import threading
+import time
+from types import SimpleNamespace
+
+import pytest
+from tornado.gen import multi
+
+from limonado.access import Principal
+from limonado.access import TokenAuthenticator
+from limonado.utils.cache import TTLCache
+
+
+_UNSET = object()
+
+
+class Timer:
+    def __init__(self):
+        self.now = 0
+
+    def __call__(self):
+        return self.now
+
+
+class Authenticator(TokenAuthenticator):
+    def __init__(self, users, **kwargs):
+        super().__init__(**kwargs)
+        self.users = users
+        self.calls = []
+        self.release = threading.Event()
+        self.release.set()
+
+    def verify(self, token):
+        self.calls.append(token)
+        self.release.wait(1)
+        return self.users.get(token)
+
+
+@pytest.fixture
+def executor():
+    executor = ThreadPoolExecutor(2)
+    yield executor
+    executor.shutdown()
+
+
+@pytest.fixture
+def timer():
+    return Timer()
+
+
+@pytest.fixture
+def authenticator(timer):
+    users = {
+        "good": Principal("user"),
+        "expired": Principal("old", expiration_time=time.time() - 1),
+        "expiring": Principal("new", expiration_time=time.time() + 10)
+    }
+    return Authenticator(users, negative_ttl=30,
+                         cache=TTLCache(100, 300, timer=timer))
+
+
+def make_handler(executor, token=None):
+    headers = {} if token is None else {"Authorization": "Bearer " + token}
+    context = SimpleNamespace(executor=executor)
+    return SimpleNamespace(request=SimpleNamespace(headers=headers),
+                           endpoint=SimpleNamespace(context=context),
+                           current_user=_UNSET)
+
+
+def resolve(io_loop, authenticator, handler):
+    result = authenticator.resolve_user(handler)
+    if result is not None:
+        io_loop.run_sync(lambda: result)
+
+    return handler.current_user
+
+
+def test_verify_is_abstract():
+    with pytest.raises(TypeError):
+        TokenAuthenticator()
+
+
+def test_no_token(io_loop, authenticator, executor):
+    handler = make_handler(executor)
+    assert authenticator.resolve_user(handler) is None
+    assert handler.current_user is None
+    assert authenticator.calls == []
+
+
+def test_principals_are_cached_until_expiry(io_loop, authenticator,
+                                            executor, timer):
+    user = resolve(io_loop, authenticator, make_handler(executor, "good"))
+    assert user.id == "user"
+    handler = make_handler(executor, "good")
+    # Cached principals are set synchronously.
+    assert authenticator.resolve_user(handler) is None
+    assert handler.current_user is user
+    assert authenticator.calls == ["good"]
+
+    timer.now = 300
+    assert resolve(io_loop, authenticator,
+                   make_handler(executor, "good")).id == "user"
+    assert authenticator.calls == ["good", "good"]
+
+
+def test_principals_expire_with_their_token(io_loop, authenticator,
+                                            executor, timer):
+    assert resolve(io_loop, authenticator,
+                   make_handler(executor, "expiring")).id == "new"
+    timer.now = 9
+    resolve(io_loop, authenticator, make_handler(executor, "expiring"))
+    assert authenticator.calls == ["expiring"]
+    timer.now = 10
+    resolve(io_loop, authenticator, make_handler(executor, "expiring"))
+    assert authenticator.calls == ["expiring", "expiring"]
+
+    assert resolve(io_loop, authenticator,
+                   make_handler(executor, "expired")) is None
+
+
+def test_denials_are_cached(io_loop, authenticator, executor, timer):
+    for _ in range(3):
+        assert resolve(io_loop, authenticator,
+                       make_handler(executor, "bad")) is None
+
+    assert authenticator.calls == ["bad"]
+    timer.now = 30
+    assert resolve(io_loop, authenticator,
+                   make_handler(executor, "bad")) is None
+    assert authenticator.calls == ["bad", "bad"]
+
+
+def test_invalidate(io_loop, authenticator, executor):
+    resolve(io_loop, authenticator, make_handler(executor, "good"))
+    authenticator.invalidate("good")
+    resolve(io_loop, authenticator, make_handler(executor, "good"))
+    assert authenticator.calls == ["good", "good"]
+
+
+def test_concurrent_lookups_share_one_verification(io_loop, authenticator,
+                                                   executor):
+    authenticator.release.clear()
+    handlers = [make_handler(executor, "good") for _ in range(3)]
+    pending = [authenticator.resolve_user(handler) for handler in handlers]
+    assert all(result is not None for result in pending)
+
+    async def run():
+        io_loop.call_later(0.05, authenticator.release.set)
+        await multi(pending)
+
+    io_loop.run_sync(run)
+    assert authenticator.calls == ["good"]
+    users = [handler.current_user for handler in handlers]
+    assert users[0].id == "user"
+    assert users[0] is users[1] is users[2]
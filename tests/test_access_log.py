@@ -0,0 +1,100 @@
+# -*- coding: utf-8 -*-
+
+import io
+import json
+
+import pytest
+
+from limonado import WebAPI
+from limonado.access import Principal
+from limonado.access import TokenAuthenticator
+from limonado.contrib import access_log as access_log_module
+from limonado.contrib.access_log import AccessLog
+from limonado.core.endpoint import Endpoint
+from limonado.core.endpoint import EndpointHandler
+from limonado.metrics import MetricsRegistry
+
+
+class Authenticator(TokenAuthenticator):
+    def verify(self, token):
+        return Principal(token)
+
+
+class ItemHandler(EndpointHandler):
+    def get(self, item_id):
+        self.write_json({"id": item_id})
+        self.finish()
+
+    def post(self, item_id):
+        self.set_status(201)
+        self.finish()
+
+
+class ItemsEndpoint(Endpoint):
+    name = "items"
+    handlers = [("/{name}/([0-9]+)", ItemHandler)]
+
+
+def read_records(access_log, stream):
+    access_log.stop()
+    return [json.loads(line) for line in stream.getvalue().splitlines()]
+
+
+def test_record_format(serve, fetch):
+    stream = io.StringIO()
+    access_log = AccessLog(stream=stream, metrics=MetricsRegistry())
+    api = WebAPI(objects=dict(access_log=access_log,
+                              authenticator=Authenticator()))
+    base_url = serve(api.add_endpoint(ItemsEndpoint).get_application())
+    fetch(base_url + "/v1/items/42", headers={"Authorization": "Bearer bob"})
+    fetch(base_url + "/v1/items/7", method="POST", body="{}")
+    records = read_records(access_log, stream)
+    assert [sorted(record) for record in records] == [sorted([
+        "time", "endpoint", "route", "method", "status", "latency_ms",
+        "bytes_sent", "bytes_received", "user"
+    ])] * 2
+    first, second = records
+    assert first["endpoint"] == second["endpoint"] == "items"
+    assert first["route"] == second["route"] == "/v1/items/([0-9]+)"
+    assert (first["method"], first["status"]) == ("GET", 200)
+    assert (second["method"], second["status"]) == ("POST", 201)
+    assert first["bytes_sent"] == len(b'{"id": "42"}')
+    assert (first["bytes_received"], second["bytes_received"]) == (0, 2)
+    assert (first["user"], second["user"]) == ("bob", None)
+    assert first["latency_ms"] >= 0
+    assert access_log.stats["written"] == 2
+
+
+@pytest.mark.parametrize("random_value, status, sampled", [
+    (0.3, 200, False),
+    (0.1, 200, True),
+    (0.1, 204, True),
+    (0.0, 404, False),
+    (0.99, 500, True),
+    (0.3, 302, True),
+    (0.6, 302, False)
+])
+def test_sampling(monkeypatch, random_value, status, sampled):
+    monkeypatch.setattr(access_log_module.random, "random",
+                        lambda: random_value)
+    access_log = AccessLog(sample_rates={"2xx": 0.25, 404: 0, "5xx": 1},
+                           default_sample_rate=0.5,
+                           metrics=MetricsRegistry())
+    assert access_log.is_sampled(status) is sampled
+    assert access_log.stats["sampled_out"] == (0 if sampled else 1)
+
+
+def test_access_log_is_per_api(serve, fetch, caplog):
+    stream = io.StringIO()
+    access_log = AccessLog(stream=stream, metrics=MetricsRegistry())
+    logged_api = WebAPI(objects=dict(access_log=access_log))
+    logged_url = serve(
+        logged_api.add_endpoint(ItemsEndpoint).get_application())
+    other_url = serve(WebAPI().add_endpoint(ItemsEndpoint).get_application())
+    with caplog.at_level("INFO", "tornado.access"):
+        fetch(other_url + "/v1/items/1")
+
+    fetch(logged_url + "/v1/items/2")
+    assert [record["status"]
+            for record in read_records(access_log, stream)] == [200]
+    assert "GET /v1/items/1" in caplog.text
@@ -0,0 +1,74 @@
+# -*- coding: utf-8 -*-
+
+import json
+
+import pytest
+
+from limonado import WebAPI
+from limonado.access import Principal
+from limonado.access import TokenAuthenticator
+from limonado.contrib.admin import AdminEndpoint
+
+USERS = {
+    "admin-token": Principal("admin", scopes=["admin"]),
+    "root-token": Principal("root", is_superuser=True),
+    "user-token": Principal("user", scopes=["read"])
+}
+
+
+class Authenticator(TokenAuthenticator):
+    def verify(self, token):
+        return USERS.get(token)
+
+
+@pytest.fixture
+def base_url(serve):
+    api = WebAPI().add_endpoint(
+        AdminEndpoint, dict(authenticator=Authenticator()))
+    return serve(api.get_application())
+
+
+def get_headers(token):
+    if token is None:
+        return {}
+
+    return {"Authorization": "Bearer " + token}
+
+
+def test_admin_endpoint_requires_authenticator(io_loop):
+    with pytest.raises(ValueError):
+        WebAPI().add_endpoint(AdminEndpoint).get_application()
+
+
+def test_admin_endpoint_uses_api_authenticator(serve, fetch):
+    api = WebAPI(objects=dict(authenticator=Authenticator()))
+    base_url = serve(api.add_endpoint(AdminEndpoint).get_application())
+    response = fetch(base_url + "/v1/admin/requests",
+                     headers=get_headers("user-token"))
+    assert response.code == 403
+    response = fetch(base_url + "/v1/admin/requests",
+                     headers=get_headers("admin-token"))
+    assert response.code == 501
+
+
+@pytest.mark.parametrize("token, status", [
+    (None, 401),
+    ("unknown-token", 401),
+    ("user-token", 403),
+    # The request watchdog is not enabled: the handler was reached.
+    ("admin-token", 501),
+    ("root-token", 501)
+])
+def test_admin_access(base_url, fetch, token, status):
+    response = fetch(base_url + "/v1/admin/requests",
+                     headers=get_headers(token))
+    assert response.code == status
+    if status == 501:
+        body = json.loads(response.body.decode("utf-8"))
+        assert body["error"]["message"] == "Request watchdog not enabled"
+
+
+def test_reload_requires_admin(base_url, fetch):
+    response = fetch(base_url + "/v1/admin/reload", method="POST",
+                     body="{}", headers=get_headers("user-token"))
+    assert response.code == 403
@@ -0,0 +1,117 @@
+# -*- coding: utf-8 -*-
+
+import json
+
+import pytest
+
+from limonado import WebAPI
+from limonado.core.endpoint import Endpoint
+from limonado.core.endpoint import EndpointHandler
+
+
+class SettingsHandler(EndpointHandler):
+    def get(self):
+        settings = self.endpoint.context.settings
+        self.write_json({
+            "endpoint": self.endpoint.name,
+            "version": settings["version"],
+            "id": settings["id"]
+        })
+        self.finish()
+
+
+class ItemsEndpoint(Endpoint):
+    name = "items"
+    handlers = [("/{name}", SettingsHandler)]
+
+
+class UsersEndpoint(Endpoint):
+    name = "users"
+    handlers = [("/{name}", SettingsHandler)]
+
+
+class ConflictingEndpoint(Endpoint):
+    name = "conflicting"
+    handlers = [("/items", SettingsHandler)]
+
+
+@pytest.fixture
+def api():
+    return WebAPI(settings={"id": "api-1"}).add_endpoints(
+        [ItemsEndpoint, UsersEndpoint, ConflictingEndpoint])
+
+
+def get(fetch, base_url, path):
+    response = fetch(base_url + path)
+    if response.code != 200:
+        return response.code, None
+
+    return response.code, json.loads(response.body.decode("utf-8"))
+
+
+def test_reload_requires_application(api):
+    with pytest.raises(RuntimeError):
+        api.reload()
+
+
+def test_reload_enabled_endpoints(api, serve, fetch):
+    base_url = serve(api.get_application(enable=["items"]))
+    assert get(fetch, base_url, "/v1/users")[0] == 404
+
+    api.reload(enable=["items", "users"])
+    assert api.enabled_endpoint_names == {"items", "users"}
+    assert get(fetch, base_url, "/v1/items")[0] == 200
+    assert get(fetch, base_url, "/v1/users")[0] == 200
+
+    api.reload(enable=["users"])
+    assert get(fetch, base_url, "/v1/items")[0] == 404
+    assert get(fetch, base_url, "/v1/users")[0] == 200
+
+    # Enabled endpoints are kept by default.
+    api.reload(settings={"version": "1"})
+    assert api.enabled_endpoint_names == {"users"}
+    assert get(fetch, base_url, "/v1/items")[0] == 404
+
+
+def test_reload_version(api, serve, fetch):
+    base_url = serve(api.get_application(enable=["items"]))
+    api.reload(settings={"version": "2"})
+    assert get(fetch, base_url, "/v1/items")[0] == 404
+    status, data = get(fetch, base_url, "/v2/items")
+    assert status == 200
+    assert data == {"endpoint": "items", "version": "2", "id": "api-1"}
+    assert api.settings["version"] == "2"
+
+
+def test_reload_from_settings_source(api, serve, fetch):
+    base_url = serve(api.get_application(enable=["items"]))
+    api.settings_source = lambda: {"version": "3"}
+    api.reload()
+    assert get(fetch, base_url, "/v3/items")[1]["version"] == "3"
+
+
+def test_reload_invalid_settings(api, serve, fetch):
+    base_url = serve(api.get_application(enable=["items"]))
+    with pytest.raises(ValueError):
+        api.reload(settings={"version": ""}, enable=["items", "users"])
+
+    assert api.settings["version"] == "1"
+    assert api.enabled_endpoint_names == {"items"}
+    status, data = get(fetch, base_url, "/v1/items")
+    assert status == 200
+    assert data["version"] == "1"
+    assert get(fetch, base_url, "/v1/users")[0] == 404
+
+
+def test_reload_rollback(api, serve, fetch):
+    base_url = serve(api.get_application(enable=["items"]))
+    with pytest.raises(ValueError):
+        api.reload(settings={"version": "2"},
+                   enable=["items", "conflicting"])
+
+    assert api.settings["version"] == "1"
+    assert api.enabled_endpoint_names == {"items"}
+    status, data = get(fetch, base_url, "/v1/items")
+    assert status == 200
+    assert data["version"] == "1"
+    assert get(fetch, base_url, "/v2/items")[0] == 404
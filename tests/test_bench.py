@@ -0,0 +1,67 @@
+# -*- coding: utf-8 -*-
+
+import os
+
+import pytest
+from tornado.ioloop import IOLoop
+
+from limonado import WebAPI
+from limonado.bench import BenchRequest
+from limonado.bench import bench_api
+from limonado.core.endpoint import Endpoint
+from limonado.core.endpoint import EndpointHandler
+from limonado.exceptions import APIError
+
+
+class StartedHandler(EndpointHandler):
+    def get(self):
+        if self.endpoint.started_in != os.getpid():
+            raise APIError(503, "Not started")
+
+        self.write_json({"pid": os.getpid()})
+
+
+class StartedEndpoint(Endpoint):
+    """Start on the IOLoop, like a watchdog or a pool do."""
+
+    name = "started"
+    handlers = [("/{name}", StartedHandler)]
+
+    def __init__(self, context):
+        super().__init__(context)
+        self.started_in = None
+        IOLoop.current().add_callback(self._start)
+
+    def _start(self):
+        self.started_in = os.getpid()
+
+
+@pytest.fixture
+def api():
+    return WebAPI().add_endpoint(StartedEndpoint)
+
+
+def write_pid(path):
+    with open(path, "a") as handle:
+        handle.write("{}\n".format(os.getpid()))
+
+
+def test_bench_with_existing_loop(io_loop, api, tmpdir):
+    # Callbacks of the existing loop must only run in this process.
+    path = str(tmpdir.join("pids"))
+    io_loop.add_callback(write_pid, path)
+    result = bench_api(api, [BenchRequest("GET", "/v1/started")],
+                       concurrency=2, duration=0.3)
+    stats = result.get_stats()["total"]
+    assert stats["count"] > 0
+    assert stats["statuses"] == {200: stats["count"]}
+    with open(path) as handle:
+        assert handle.read() == "{}\n".format(os.getpid())
+
+
+def test_bench_application_error(io_loop):
+    api = WebAPI(settings={"version": 1})
+    with pytest.raises(RuntimeError) as info:
+        bench_api(api, [BenchRequest("GET", "/")], duration=0.1)
+
+    assert "can't serve the application" in str(info.value)
@@ -0,0 +1,138 @@
+# -*- coding: utf-8 -*-
+
+import pytest
+
+from limonado.contrib.breaker import CircuitBreaker
+from limonado.contrib.health import HealthIssue
+from limonado.exceptions import APIError
+from limonado.metrics import MetricsRegistry
+
+
+class Timer:
+    def __init__(self):
+        self.now = 0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def timer():
+    return Timer()
+
+
+@pytest.fixture
+def breaker(timer):
+    return CircuitBreaker(window_size=4, minimum_calls=4, open_duration=10,
+                          half_open_calls=2, timer=timer,
+                          metrics=MetricsRegistry())
+
+
+def trip(breaker):
+    for _ in range(4):
+        breaker.record(0.1, failed=True, generation=breaker.before_call())
+
+    assert breaker.state == "open"
+
+
+def test_opens_on_failures(breaker):
+    for failed in [True, False, False]:
+        breaker.record(0.1, failed=failed, generation=breaker.before_call())
+
+    assert breaker.state == "closed"
+    breaker.record(0.1, failed=True, generation=breaker.before_call())
+    assert breaker.state == "open"
+    with pytest.raises(APIError) as info:
+        breaker.before_call()
+
+    assert info.value.status_code == 503
+    assert breaker.stats["rejected"] == 1
+    with pytest.raises(HealthIssue):
+        breaker.check_health()
+
+
+def test_opens_on_slow_calls(timer):
+    breaker = CircuitBreaker(window_size=2, minimum_calls=2,
+                             slow_call_rate_threshold=0.5,
+                             slow_call_duration=1, timer=timer,
+                             metrics=MetricsRegistry())
+    breaker.record(0.1, generation=breaker.before_call())
+    breaker.record(2, generation=breaker.before_call())
+    assert breaker.state == "open"
+
+
+def test_half_open_closes(breaker, timer):
+    trip(breaker)
+    timer.now = 10
+    assert breaker.state == "half_open"
+    probes = [breaker.before_call(), breaker.before_call()]
+    with pytest.raises(APIError):
+        breaker.before_call()
+
+    for generation in probes:
+        breaker.record(0.1, generation=generation)
+
+    assert breaker.state == "closed"
+    breaker.check_health()
+
+
+def test_half_open_opens_again(breaker, timer):
+    trip(breaker)
+    timer.now = 10
+    probes = [breaker.before_call(), breaker.before_call()]
+    breaker.record(0.1, failed=True, generation=probes[0])
+    breaker.record(0.1, generation=probes[1])
+    assert breaker.state == "open"
+    timer.now = 19
+    assert breaker.state == "open"
+    timer.now = 20
+    assert breaker.state == "half_open"
+
+
+def test_unrecorded_probes_are_given_up(breaker, timer):
+    trip(breaker)
+    timer.now = 10
+    lost = [breaker.before_call(), breaker.before_call()]
+    with pytest.raises(APIError):
+        breaker.before_call()
+
+    timer.now = 20
+    assert breaker.state == "half_open"
+    probes = [breaker.before_call(), breaker.before_call()]
+    # Outcomes of the probes given up don't count.
+    for generation in lost:
+        breaker.record(0.1, failed=True, generation=generation)
+
+    assert breaker.state == "half_open"
+    for generation in probes:
+        breaker.record(0.1, generation=generation)
+
+    assert breaker.state == "closed"
+
+
+def test_late_outcomes_of_closed_calls_are_ignored(breaker, timer):
+    late = [breaker.before_call() for _ in range(2)]
+    trip(breaker)
+    timer.now = 10
+    probes = [breaker.before_call(), breaker.before_call()]
+    for generation in late:
+        breaker.record(0.1, failed=True, generation=generation)
+
+    assert breaker.state == "half_open"
+    for generation in probes:
+        breaker.record(0.1, generation=generation)
+
+    assert breaker.state == "closed"
+
+
+def test_call(io_loop, breaker):
+    async def fail():
+        raise ConnectionError()
+
+    for _ in range(4):
+        with pytest.raises(ConnectionError):
+            io_loop.run_sync(lambda: breaker.call(fail))
+
+    assert breaker.state == "open"
+    with pytest.raises(APIError):
+        io_loop.run_sync(lambda: breaker.call(fail))
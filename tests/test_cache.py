@@ -0,0 +1,72 @@
+# -*- coding: utf-8 -*-
+
+import multiprocessing
+import sys
+
+import pytest
+
+from limonado.utils.cache import TTLCache
+from limonado.utils.shared_cache import SharedMemoryCache
+
+
+class Timer:
+    def __init__(self):
+        self.now = 0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture(params=[TTLCache, SharedMemoryCache])
+def cache_and_timer(request):
+    timer = Timer()
+    return request.param(16, 10, timer=timer), timer
+
+
+def test_add(cache_and_timer):
+    cache, timer = cache_and_timer
+    assert cache.add("key", 1)
+    assert not cache.add("key", 2)
+    assert cache.get("key") == 1
+    timer.now = 10
+    assert cache.add("key", 3, ttl=5)
+    assert cache.get("key") == 3
+    cache.pop("key")
+    assert cache.add("key", 4)
+
+
+def test_shared_add_too_large():
+    cache = SharedMemoryCache(16, 10, slot_size=64)
+    with pytest.raises(ValueError):
+        cache.add("key", b"x" * 64)
+
+
+def test_shared_set_too_large():
+    cache = SharedMemoryCache(16, 10, slot_size=64)
+    assert cache.set("key", b"x")
+    assert not cache.set("key", b"x" * 64)
+    assert cache.get("key") is None
+
+
+def _claim(cache, key, claims):
+    if cache.add(key, multiprocessing.current_process().pid):
+        with claims.get_lock():
+            claims.value += 1
+
+
+@pytest.mark.skipif(sys.platform == "win32", reason="requires fork")
+def test_shared_add_is_atomic():
+    context = multiprocessing.get_context("fork")
+    cache = SharedMemoryCache(16, 10)
+    claims = context.Value("i", 0)
+    for attempt in range(5):
+        key = "key-{}".format(attempt)
+        processes = [context.Process(target=_claim, args=(cache, key, claims))
+                     for _ in range(8)]
+        for process in processes:
+            process.start()
+
+        for process in processes:
+            process.join()
+
+    assert claims.value == 5
@@ -0,0 +1,72 @@
+# -*- coding: utf-8 -*-
+
+import base64
+import json
+
+from tornado.escape import json_decode
+
+from limonado import WebAPI
+from limonado.bench import parse_capture
+from limonado.bench import replay_api
+from limonado.contrib.capture import TrafficCapture
+from limonado.core.endpoint import Endpoint
+from limonado.core.endpoint import EndpointHandler
+from limonado.exceptions import APIError
+
+
+class ItemsHandler(EndpointHandler):
+    def get(self):
+        self.write_json({"q": self.get_query_argument("q")})
+
+    def post(self):
+        try:
+            item = json_decode(self.request.body)
+        except ValueError:
+            raise APIError(400, "Invalid item")
+
+        self.set_status(201)
+        self.write_json(item)
+
+
+class ItemsEndpoint(Endpoint):
+    name = "items"
+    handlers = [("/{name}", ItemsHandler)]
+
+
+REQUESTS = [
+    ("GET", "/v1/items?q=a", None, 200),
+    ("POST", "/v1/items", b'{"id": 1}', 201),
+    ("POST", "/v1/items", b"not json", 400),
+    ("GET", "/v1/items?q=b", None, 200)
+]
+
+
+def test_capture_and_replay(io_loop, serve, fetch, tmpdir):
+    path = str(tmpdir.join("capture.jsonl"))
+    capture = TrafficCapture(path, sample_rate=1, bodies=True)
+    api = WebAPI(objects=dict(capture=capture)).add_endpoint(ItemsEndpoint)
+    base_url = serve(api.get_application())
+    for method, url, body, status in REQUESTS:
+        assert fetch(base_url + url, method=method, body=body).code == status
+
+    capture.stop()
+    with open(path) as handle:
+        records = [json.loads(line) for line in handle]
+
+    assert [(record["method"], record["status"]) for record in records] == [
+        (method, status) for method, _, _, status in REQUESTS]
+    assert [record["query"] for record in records] == ["q=a", "", "", "q=b"]
+    assert [base64.b64decode(record["body"])
+            for record in records] == [b"", b'{"id": 1}', b"not json", b""]
+
+    with open(path) as handle:
+        schedule, skipped = parse_capture(handle)
+
+    assert skipped == 0
+    assert [request.get_url("") for _, request in schedule] == [
+        url for _, url, _, _ in REQUESTS]
+    api = WebAPI().add_endpoint(ItemsEndpoint)
+    result = replay_api(api, schedule, speed=0, concurrency=1)
+    stats = result.get_stats()
+    assert stats["GET /v1/items"]["statuses"] == {200: 2}
+    assert stats["POST /v1/items"]["statuses"] == {201: 1, 400: 1}
@@ -0,0 +1,132 @@
+# -*- coding: utf-8 -*-
+
+import json
+import logging
+
+from tornado.gen import sleep
+from tornado.tcpclient import TCPClient
+
+from limonado import WebAPI
+from limonado.contrib.health import HealthEndpoint
+from limonado.core.endpoint import Endpoint
+from limonado.core.endpoint import EndpointHandler
+
+
+class ItemHandler(EndpointHandler):
+    def get(self):
+        self.write_json({"endpoint": self.endpoint.name})
+        self.finish()
+
+
+class FailingEndpoint(Endpoint):
+    name = "failing"
+    lazy = True
+    handlers = [("/{name}", ItemHandler)]
+    attempts = 0
+
+    def __init__(self, context):
+        type(self).attempts += 1
+        if type(self).attempts == 1:
+            raise RuntimeError("not ready")
+
+        super().__init__(context)
+
+
+class UploadHandler(EndpointHandler):
+    def post(self):
+        self.endpoint.uploads.append(self.request.body)
+        self.write_json({"size": len(self.request.body)})
+        self.finish()
+
+
+class UploadEndpoint(Endpoint):
+    name = "uploads"
+    handlers = [("/{name}", UploadHandler)]
+    max_body_size = 100
+    content_types = ["application/json"]
+
+    def __init__(self, context, uploads):
+        super().__init__(context)
+        self.uploads = uploads
+
+
+def test_lazy_endpoint_preload_failure(io_loop, serve, fetch, caplog):
+    api = WebAPI(settings={"preload_endpoints": True})
+    api.add_endpoints([FailingEndpoint, HealthEndpoint])
+    with caplog.at_level(logging.ERROR, "limonado.core.endpoint"):
+        base_url = serve(api.get_application())
+        io_loop.run_sync(lambda: sleep(0.1))
+
+    assert "Failed to load endpoint 'failing'" in caplog.text
+    response = fetch(base_url + "/v1/health")
+    assert response.code == 503
+    issues = json.loads(response.body.decode("utf-8"))["issues"]
+    assert issues["endpoints"]["details"] == {"failing": "failed"}
+
+    # The endpoint is loaded again on first request.
+    response = fetch(base_url + "/v1/failing")
+    assert response.code == 200
+    response = fetch(base_url + "/v1/health")
+    assert response.code == 200
+
+
+def upload(fetch, base_url, body, content_type="application/json"):
+    return fetch(base_url + "/v1/uploads", method="POST", body=body,
+                 headers={"Content-Type": content_type})
+
+
+def test_body_within_limits(serve, fetch):
+    uploads = []
+    api = WebAPI().add_endpoint(UploadEndpoint, dict(uploads=uploads))
+    base_url = serve(api.get_application())
+    body = json.dumps("x" * 90)
+    response = upload(fetch, base_url, body,
+                      "Application/JSON; charset=utf-8")
+    assert response.code == 200
+    assert uploads == [body.encode("utf-8")]
+
+
+def test_body_too_large(serve, fetch):
+    uploads = []
+    api = WebAPI().add_endpoint(UploadEndpoint, dict(uploads=uploads))
+    base_url = serve(api.get_application())
+    response = upload(fetch, base_url, json.dumps("x" * 100))
+    assert response.code == 413
+    error = json.loads(response.body.decode("utf-8"))["error"]
+    assert error["message"] == "Request body too large"
+    assert uploads == []
+
+
+def test_unsupported_content_type(serve, fetch):
+    uploads = []
+    api = WebAPI().add_endpoint(UploadEndpoint, dict(uploads=uploads))
+    base_url = serve(api.get_application())
+    response = upload(fetch, base_url, "x=1",
+                      "application/x-www-form-urlencoded")
+    assert response.code == 415
+    response = upload(fetch, base_url, "{}", "")
+    assert response.code == 415
+    assert uploads == []
+
+
+def test_streamed_body_too_large(io_loop, serve):
+    uploads = []
+    api = WebAPI().add_endpoint(UploadEndpoint, dict(uploads=uploads))
+    port = int(serve(api.get_application()).rpartition(":")[2])
+
+    async def post_chunks():
+        stream = await TCPClient().connect("127.0.0.1", port)
+        await stream.write(b"POST /v1/uploads HTTP/1.1\r\n"
+                           b"Host: 127.0.0.1\r\n"
+                           b"Connection: close\r\n"
+                           b"Content-Type: application/json\r\n"
+                           b"Transfer-Encoding: chunked\r\n\r\n")
+        # Without a Content-Length, the limit is checked on each chunk.
+        await stream.write((b"40\r\n" + b"x" * 64 + b"\r\n") * 3 +
+                           b"0\r\n\r\n")
+        return await stream.read_until_close()
+
+    response = io_loop.run_sync(post_chunks)
+    assert response.startswith(b"HTTP/1.1 413 ")
+    assert b"Request body too large" in response
+    assert uploads == []
@@ -0,0 +1,82 @@
+# -*- coding: utf-8 -*-
+
+import threading
+
+import pytest
+
+from limonado.metrics import MetricsRegistry
+from limonado.utils.executor import PriorityExecutor
+
+
+@pytest.fixture
+def release():
+    event = threading.Event()
+    yield event
+    event.set()
+
+
+def make_executor(**kwargs):
+    return PriorityExecutor(metrics=MetricsRegistry(), **kwargs)
+
+
+def test_reserved_workers_run_health_when_shared_workers_are_busy(release):
+    executor = make_executor(max_workers=3, reserved_workers=1)
+    blocked = [executor.submit(release.wait) for _ in range(2)]
+    queued = executor.submit(lambda: "default")
+    health = executor.for_class("health").submit(lambda: "health")
+    assert health.result(timeout=1) == "health"
+    assert not queued.done()
+    assert executor.get_stats()["default"]["queued"] == 1
+
+    release.set()
+    assert queued.result(timeout=1) == "default"
+    for future in blocked:
+        future.result(timeout=1)
+
+    executor.shutdown()
+
+
+def test_classes_share_workers_by_weight(release):
+    executor = make_executor(max_workers=2, reserved_workers=1,
+                             classes={"high": 3, "low": 1, "health": 100},
+                             default_class="high")
+    order = []
+    blocked = executor.submit(release.wait)
+    calls = [executor.submit_to(name, order.append, name)
+             for _ in range(12) for name in ["low", "high"]]
+    release.set()
+    blocked.result(timeout=1)
+    for future in calls:
+        future.result(timeout=1)
+
+    # A single shared worker runs calls one at a time, three of the high
+    # class for one of the low class while both have queued calls.
+    assert order[:8].count("high") == 6
+    assert order[:8].count("low") == 2
+    executor.shutdown()
+
+
+def test_strict_priorities(release):
+    executor = make_executor(max_workers=2, reserved_workers=1, strict=True)
+    order = []
+    blocked = executor.submit(release.wait)
+    calls = [executor.submit_to(name, order.append, name)
+             for name in ["batch", "default", "batch", "default"]]
+    release.set()
+    blocked.result(timeout=1)
+    for future in calls:
+        future.result(timeout=1)
+
+    assert order == ["default", "default", "batch", "batch"]
+    executor.shutdown()
+
+
+def test_class_executor_shutdown_keeps_the_pool_running():
+    executor = make_executor(max_workers=2)
+    view = executor.for_class("batch")
+    view.shutdown()
+    assert view.submit(lambda: 1).result(timeout=1) == 1
+    assert executor.submit(lambda: 2).result(timeout=1) == 2
+    executor.shutdown()
+    with pytest.raises(RuntimeError):
+        executor.submit(lambda: 3)
@@ -0,0 +1,131 @@
+# -*- coding: utf-8 -*-
+
+import pytest
+from tornado.concurrent import is_future
+from tornado.gen import convert_yielded
+from tornado.gen import coroutine
+from tornado.gen import multi
+from tornado.gen import sleep
+from tornado.httpclient import AsyncHTTPClient
+from tornado.httpclient import HTTPError
+from tornado.httpclient import HTTPRequest
+
+from limonado import WebAPI
+from limonado.contrib.health import HealthAddon
+from limonado.contrib.health import HealthEndpoint
+from limonado.contrib.health import HealthIssue
+from limonado.contrib.health import cache_health
+
+
+class FakeEndpoint:
+    pass
+
+
+class StreamingHealthEndpoint(HealthEndpoint):
+    def __init__(self, context):
+        super().__init__(context, stream_path="/{name}/stream",
+                         stream_kwargs=dict(interval=0.05))
+
+
+class Subscriber:
+    """Record the headers and events of a health stream."""
+
+    def __init__(self, url):
+        self.headers = {}
+        self.chunks = []
+        self.request = HTTPRequest(
+            url, request_timeout=0.3, header_callback=self.on_header,
+            streaming_callback=self.chunks.append)
+
+    def on_header(self, line):
+        name, _, value = line.partition(":")
+        if value:
+            self.headers[name.strip().lower()] = value.strip()
+
+    @property
+    def events(self):
+        return b"".join(self.chunks).decode("utf-8")
+
+    async def listen(self, client):
+        # Streams don't end, requests time out.
+        with pytest.raises(HTTPError) as info:
+            await client.fetch(self.request)
+
+        assert info.value.code == 599
+
+
+def test_concurrent_subscribers(io_loop, serve):
+    api = WebAPI().add_endpoint(StreamingHealthEndpoint)
+    base_url = serve(api.get_application())
+    client = AsyncHTTPClient()
+    first = Subscriber(base_url + "/v1/health/stream")
+    second = Subscriber(base_url + "/v1/health/stream")
+
+    async def run():
+        # The second subscriber joins a running stream, which sends it the
+        # current health right away.
+        first_listener = convert_yielded(first.listen(client))
+        await sleep(0.1)
+        await multi([first_listener, second.listen(client)])
+
+    io_loop.run_sync(run)
+    for subscriber in [first, second]:
+        assert subscriber.headers["content-type"] == "text/event-stream"
+        assert subscriber.headers["cache-control"] == "no-cache"
+        assert subscriber.events.startswith(
+            'event: health\ndata: {"status": "healthy"')
+
+    client.close()
+
+
+def test_cache_health_returns_future(io_loop):
+    calls = []
+
+    @cache_health(60)
+    def check(endpoint):
+        calls.append(endpoint)
+        if len(calls) == 1:
+            raise HealthIssue("Down")
+
+    future = check("endpoint")
+    assert is_future(future)
+    with pytest.raises(HealthIssue):
+        io_loop.run_sync(lambda: future)
+
+    # The issue is cached.
+    with pytest.raises(HealthIssue):
+        io_loop.run_sync(lambda: check("endpoint"))
+
+    assert calls == ["endpoint"]
+
+
+def test_check_health_returns_future(io_loop):
+    @coroutine
+    def legacy_check(endpoint):
+        yield sleep(0)
+        raise HealthIssue("Legacy", {"ok": False})
+
+    async def native_check(endpoint):
+        await sleep(0)
+
+    def yielding_check(endpoint):
+        return [sleep(0), sleep(0)]
+
+    endpoint = FakeEndpoint()
+    addon = HealthAddon(endpoint, checks={
+        "legacy": legacy_check,
+        "native": native_check,
+        "sync": lambda endpoint: None,
+        "yielding": yielding_check
+    }, context_checks=False)
+    future = addon.check_health()
+    assert is_future(future)
+    done = []
+    future.add_done_callback(done.append)
+    issues = io_loop.run_sync(lambda: future)
+    assert done == [future]
+    assert issues == {
+        "legacy": {"message": "Legacy", "details": {"ok": False}}
+    }
+    assert io_loop.run_sync(
+        lambda: addon.check_health(include=["native"])) == {}
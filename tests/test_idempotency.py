@@ -0,0 +1,126 @@
+# -*- coding: utf-8 -*-
+
+import json
+import logging
+
+from tornado.gen import multi
+from tornado.gen import sleep
+from tornado.httpclient import AsyncHTTPClient
+
+from limonado import WebAPI
+from limonado.contrib.idempotency import IdempotencyAddon
+from limonado.core.endpoint import Endpoint
+from limonado.core.endpoint import EndpointHandler
+from limonado.metrics import MetricsRegistry
+from limonado.utils.shared_cache import SharedMemoryCache
+
+
+class OrderHandler(EndpointHandler):
+    async def post(self):
+        self.endpoint.orders += 1
+        order = self.endpoint.orders
+        await sleep(self.endpoint.delay)
+        self.set_status(201)
+        self.write_json({"order": order, "padding": self.endpoint.padding})
+
+
+class OrderEndpoint(Endpoint):
+    name = "orders"
+    handlers = [("/{name}", OrderHandler)]
+
+    def __init__(self, context, store=None, delay=0.05, padding="",
+                 lock_timeout=60, metrics=None):
+        super().__init__(context)
+        self.orders = 0
+        self.delay = delay
+        self.padding = padding
+        if metrics is None:
+            metrics = MetricsRegistry()
+
+        self.add_addon(IdempotencyAddon, dict(store=store,
+                                              lock_timeout=lock_timeout,
+                                              metrics=metrics))
+
+
+def post_orders(io_loop, base_url, keys, bodies):
+    client = AsyncHTTPClient()
+
+    async def run():
+        return await multi([
+            client.fetch(base_url + "/v1/orders", method="POST", body=body,
+                         headers={"Idempotency-Key": key},
+                         raise_error=False)
+            for key, body in zip(keys, bodies)
+        ])
+
+    return io_loop.run_sync(run)
+
+
+def test_concurrent_duplicates_are_handled_once(io_loop, serve):
+    for store in [None, SharedMemoryCache(16, 60)]:
+        api = WebAPI().add_endpoint(OrderEndpoint, dict(store=store))
+        base_url = serve(api.get_application())
+        responses = post_orders(io_loop, base_url, ["a", "a", "a", "b"],
+                                ["{}"] * 4)
+        assert [response.code for response in responses] == [201] * 4
+        orders = [json.loads(response.body.decode("utf-8"))["order"]
+                  for response in responses]
+        assert orders[0] == orders[1] == orders[2] != orders[3]
+        replayed = [response.headers.get("Idempotent-Replayed")
+                    for response in responses]
+        assert replayed.count("true") == 2
+
+
+def test_key_reused_with_another_body(io_loop, serve):
+    api = WebAPI().add_endpoint(OrderEndpoint)
+    base_url = serve(api.get_application())
+    responses = post_orders(io_loop, base_url, ["a", "a"], ["{}", "[]"])
+    assert sorted(response.code for response in responses) == [201, 422]
+
+
+def test_oversized_responses_are_not_stored(serve, fetch, caplog):
+    store = SharedMemoryCache(16, 60, slot_size=256)
+    metrics = MetricsRegistry()
+    api = WebAPI().add_endpoint(OrderEndpoint, dict(
+        store=store, padding="x" * 1000, metrics=metrics))
+    base_url = serve(api.get_application())
+    with caplog.at_level(logging.WARNING, "limonado.contrib.idempotency"):
+        orders = []
+        for _ in range(2):
+            response = fetch(base_url + "/v1/orders", method="POST",
+                             body="{}", headers={"Idempotency-Key": "a"})
+            assert response.code == 201
+            assert "Idempotent-Replayed" not in response.headers
+            orders.append(json.loads(response.body.decode("utf-8"))["order"])
+
+    assert orders == [1, 2]
+    assert "not stored for idempotency" in caplog.text
+    assert metrics.counter("idempotency_not_stored",
+                           endpoint="orders").value == 2
+
+
+def test_pending_entry_is_refreshed(io_loop, serve):
+    store = SharedMemoryCache(16, 60)
+    api = WebAPI().add_endpoint(OrderEndpoint, dict(
+        store=store, delay=0.6, lock_timeout=0.2))
+    base_url = serve(api.get_application())
+    client = AsyncHTTPClient()
+
+    def post():
+        return client.fetch(base_url + "/v1/orders", method="POST",
+                            body="{}", headers={"Idempotency-Key": "a"},
+                            raise_error=False)
+
+    async def run():
+        first = post()
+        # The pending entry would have expired without being refreshed.
+        await sleep(0.3)
+        return await multi([first, post()])
+
+    first, duplicate = io_loop.run_sync(run)
+    assert first.code == 201
+    assert duplicate.code == 409
+    retry = io_loop.run_sync(post)
+    assert retry.code == 201
+    assert retry.headers.get("Idempotent-Replayed") == "true"
+    assert retry.body == first.body
@@ -0,0 +1,72 @@
+# -*- coding: utf-8 -*-
+"""Import cost of limonado modules.
+
+Each module is imported in a fresh interpreter, and the modules it
+imports are checked: heavy dependencies must only be imported when used.
+A single, generous wall-clock budget guards against regressions which
+don't show up as modules (set ``LIMONADO_IMPORT_BUDGET_SCALE`` on slow
+machines rather than raising it).
+
+"""
+
+import json
+import os
+import subprocess
+import sys
+
+import pytest
+
+# Modules which must not be imported as a side effect of importing the key.
+LAZY_MODULES = {
+    "limonado": ["jsonschema", "dateutil", "tornado.web"],
+    "limonado.cli": ["jsonschema", "dateutil", "tornado.web"],
+    "limonado.utils.date": ["dateutil"],
+    "limonado.api": ["jsonschema", "dateutil"]
+}
+
+# Best of REPEAT cold imports of limonado.cli, in milliseconds. It takes
+# about 25 ms, importing Tornado's web stack takes over 100 ms.
+CLI_BUDGET = 80
+
+REPEAT = 5
+
+_SCRIPT = """
+import json, sys, time
+start = time.perf_counter()
+import {module}
+elapsed = time.perf_counter() - start
+print(json.dumps({{"elapsed": elapsed, "modules": sorted(sys.modules)}}))
+"""
+
+
+def import_cold(module):
+    """Return the import time (in ms) and the modules imported."""
+    output = subprocess.check_output(
+        [sys.executable, "-c", _SCRIPT.format(module=module)])
+    result = json.loads(output.decode("utf-8"))
+    return result["elapsed"] * 1000, set(result["modules"])
+
+
+@pytest.mark.parametrize("module", sorted(LAZY_MODULES))
+def test_lazy_imports(module):
+    _, modules = import_cold(module)
+    eager = [name for name in LAZY_MODULES[module] if name in modules]
+    assert not eager, "{} imported eagerly: {}".format(
+        module, ", ".join(eager))
+
+
+def test_exports_are_imported_on_access():
+    script = ("import sys, limonado; assert 'limonado.api' not in "
+              "sys.modules; from limonado import WebAPI, APIError; "
+              "print(WebAPI.__module__, APIError.__module__)")
+    output = subprocess.check_output([sys.executable, "-c", script])
+    assert output.decode("utf-8").split() == ["limonado.api",
+                                              "limonado.exceptions"]
+
+
+def test_cli_import_time():
+    scale = float(os.environ.get("LIMONADO_IMPORT_BUDGET_SCALE", 1))
+    budget = CLI_BUDGET * scale
+    elapsed = min(import_cold("limonado.cli")[0] for _ in range(REPEAT))
+    assert elapsed <= budget, "took {:.1f} ms (budget {:.0f} ms)".format(
+        elapsed, budget)
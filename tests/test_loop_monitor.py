@@ -0,0 +1,103 @@
+# -*- coding: utf-8 -*-
+
+import threading
+import time
+
+import pytest
+from tornado.gen import sleep
+
+from limonado import WebAPI
+from limonado.contrib.health import HealthIssue
+from limonado.contrib.loop_monitor import LoopMonitor
+from limonado.core.endpoint import Endpoint
+from limonado.core.endpoint import EndpointHandler
+from limonado.metrics import MetricsRegistry
+
+BLOCKING_TIME = 0.3
+
+
+class BlockingHandler(EndpointHandler):
+    def get(self):
+        time.sleep(BLOCKING_TIME)
+        self.write_json({})
+        self.finish()
+
+
+class BlockingEndpoint(Endpoint):
+    name = "blocking"
+    handlers = [("/{name}", BlockingHandler)]
+
+
+@pytest.fixture
+def metrics():
+    return MetricsRegistry()
+
+
+@pytest.fixture
+def monitor(io_loop, metrics):
+    monitor = LoopMonitor(interval=0.02, threshold=0.1, autostart=False,
+                          metrics=metrics)
+    io_loop.run_sync(monitor.start)
+    yield monitor
+    monitor.stop()
+
+
+def wait(io_loop, seconds):
+    io_loop.run_sync(lambda: sleep(seconds))
+
+
+def get_watcher_threads():
+    return [thread for thread in threading.enumerate()
+            if thread.name == "limonado-loop-monitor"]
+
+
+def test_lag_is_measured(io_loop, monitor, metrics):
+    wait(io_loop, 0.1)
+    assert monitor.stats["max_lag"] == 0
+    monitor.check_health()
+
+    io_loop.add_callback(time.sleep, BLOCKING_TIME)
+    wait(io_loop, 0.1)
+    stats = monitor.stats
+    assert BLOCKING_TIME - 0.05 <= stats["max_lag"] < BLOCKING_TIME + 0.2
+    assert stats["last_lag"] < stats["max_lag"]
+    lags = metrics.histogram("ioloop_lag_seconds")
+    assert lags.count >= 5
+    assert lags.sum >= stats["max_lag"]
+    with pytest.raises(HealthIssue):
+        monitor.check_health()
+
+
+def test_blocking_handler_is_reported(io_loop, serve, fetch, monitor,
+                                      metrics):
+    api = WebAPI().add_endpoint(BlockingEndpoint)
+    base_url = serve(api.get_application())
+    assert fetch(base_url + "/v1/blocking").code == 200
+    wait(io_loop, 0.1)
+    reports = monitor.reports
+    assert len(reports) == 1
+    report = reports[0]
+    assert report["handler"] == "BlockingHandler"
+    assert report["endpoint"] == "blocking"
+    assert report["route"] == "/v1/blocking"
+    assert 0.1 < report["blocked"] < BLOCKING_TIME
+    assert "time.sleep(BLOCKING_TIME)" in "".join(report["stack"])
+    assert metrics.counter("ioloop_blocked", endpoint="blocking").value == 1
+
+
+def test_stop(io_loop, monitor, metrics):
+    wait(io_loop, 0.1)
+    assert len(get_watcher_threads()) == 1
+    monitor.stop()
+    monitor.stop()
+    count = metrics.histogram("ioloop_lag_seconds").count
+    io_loop.add_callback(time.sleep, BLOCKING_TIME)
+    wait(io_loop, 0.1)
+    assert metrics.histogram("ioloop_lag_seconds").count == count
+    assert monitor.reports == []
+    assert get_watcher_threads() == []
+
+    io_loop.run_sync(monitor.start)
+    wait(io_loop, 0.1)
+    assert metrics.histogram("ioloop_lag_seconds").count > count
+    assert len(get_watcher_threads()) == 1
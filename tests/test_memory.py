@@ -0,0 +1,152 @@
+# -*- coding: utf-8 -*-
+
+import json
+import threading
+import tracemalloc
+
+import pytest
+
+from limonado import WebAPI
+from limonado.access import Principal
+from limonado.access import TokenAuthenticator
+from limonado.contrib.admin import AdminEndpoint
+from limonado.contrib.memory import MemoryAddon
+from limonado.exceptions import APIError
+
+HEADERS = {"Authorization": "Bearer admin-token"}
+
+
+class Authenticator(TokenAuthenticator):
+    def verify(self, token):
+        if token == "admin-token":
+            return Principal("admin", scopes=["admin"])
+
+        return None
+
+
+class FakeEndpoint:
+    pass
+
+
+@pytest.fixture(autouse=True)
+def stop_tracing():
+    yield
+    tracemalloc.stop()
+
+
+@pytest.fixture
+def base_url(serve):
+    api = WebAPI().add_endpoint(
+        AdminEndpoint, dict(authenticator=Authenticator()))
+    return serve(api.get_application()) + "/v1/admin/memory"
+
+
+@pytest.fixture
+def addon():
+    endpoint = FakeEndpoint()
+    yield MemoryAddon(endpoint, max_snapshots=2)
+
+
+def request(fetch, url, method="GET", data=None):
+    body = None if data is None else json.dumps(data)
+    response = fetch(url, method=method, body=body, headers=HEADERS)
+    if not response.body:
+        return response.code, None
+
+    return response.code, json.loads(response.body.decode("utf-8"))
+
+
+def test_stats(base_url, fetch):
+    status, stats = request(fetch, base_url)
+    assert status == 200
+    assert stats["tracing"] is False
+    assert stats["snapshots"] == []
+    assert "traced" not in stats
+
+
+def test_tracing_and_snapshots(base_url, fetch):
+    status, _ = request(fetch, base_url + "/snapshots", "POST",
+                        {"name": "base"})
+    assert status == 409
+
+    status, stats = request(fetch, base_url + "/tracing", "POST",
+                            {"enabled": True, "frames": 3})
+    assert status == 200
+    assert stats["tracing"] is True
+    assert stats["traced"]["frames"] == 3
+
+    status, data = request(fetch, base_url + "/snapshots", "POST",
+                           {"name": "base"})
+    assert status == 201
+    assert data == {"snapshots": ["base"]}
+
+    leak = [bytearray(1024) for _ in range(100)]
+    status, diff = request(fetch, base_url + "/diff?base=base&limit=5")
+    assert status == 200
+    assert diff["base"] == "base"
+    assert diff["target"] is None
+    assert len(diff["top"]) <= 5
+    assert diff["size_diff"] > 0
+    del leak
+
+    status, _ = request(fetch, base_url + "/diff?base=missing")
+    assert status == 404
+
+    status, _ = request(fetch, base_url + "/snapshots/base", "DELETE")
+    assert status == 204
+    status, _ = request(fetch, base_url + "/snapshots/base", "DELETE")
+    assert status == 404
+
+    status, stats = request(fetch, base_url + "/tracing", "POST",
+                            {"enabled": False})
+    assert status == 200
+    assert stats["tracing"] is False
+
+
+@pytest.mark.parametrize("frames", [0, 101])
+def test_frames_are_bounded(base_url, fetch, frames):
+    status, _ = request(fetch, base_url + "/tracing", "POST",
+                        {"enabled": True, "frames": frames})
+    assert status == 400
+    assert not tracemalloc.is_tracing()
+
+
+@pytest.mark.parametrize("frames", [0, 101])
+def test_start_tracing_rejects_frames(addon, frames):
+    with pytest.raises(ValueError):
+        addon.start_tracing(frames)
+
+
+def test_oldest_snapshots_are_dropped(addon):
+    addon.start_tracing()
+    for name in ("a", "b", "c"):
+        addon.take_snapshot(name)
+
+    assert addon.snapshot_names == ["b", "c"]
+    addon.take_snapshot("b")
+    assert addon.snapshot_names == ["c", "b"]
+    with pytest.raises(APIError) as exc_info:
+        addon.compare_snapshots("a")
+
+    assert exc_info.value.status_code == 404
+
+
+def test_snapshots_taken_concurrently(addon):
+    addon.start_tracing()
+    done = threading.Event()
+
+    def take_snapshots():
+        try:
+            for index in range(20):
+                addon.take_snapshot("snapshot{}".format(index))
+        finally:
+            done.set()
+
+    thread = threading.Thread(target=take_snapshots)
+    thread.start()
+    while not done.is_set():
+        assert len(addon.snapshot_names) <= 2
+        addon.get_stats()
+
+    thread.join()
+    assert addon.snapshot_names == ["snapshot18", "snapshot19"]
@@ -0,0 +1,94 @@
+# -*- coding: utf-8 -*-
+
+import multiprocessing
+import os
+import sys
+
+import pytest
+
+from limonado.metrics import MetricsRegistry
+
+WORKERS = 3
+REQUESTS = 200
+# Enough entries for the metrics file to grow past its initial size.
+ROUTES = 1500
+
+
+def _work(registry, index, ready, done):
+    try:
+        requests = registry.counter("requests", endpoint="items")
+        latency = registry.histogram("latency", buckets=(0.1, 1))
+        for request in range(REQUESTS):
+            requests.inc()
+            latency.observe(0.05 if request % 2 else 0.5)
+
+        for route in range(ROUTES):
+            registry.counter("routes", route=str(route)).inc(index + 1)
+
+        registry.gauge("workers").set(index)
+    finally:
+        ready.release()
+
+    done.wait(10)
+
+
+def find(entries, name, **labels):
+    return [entry for entry in entries
+            if entry["name"] == name and
+            all(entry["labels"].get(label) == value
+                for label, value in labels.items())]
+
+
+@pytest.mark.skipif(sys.platform == "win32", reason="requires fork")
+def test_shared_metrics_are_merged(tmpdir):
+    context = multiprocessing.get_context("fork")
+    registry = MetricsRegistry()
+    registry.share(str(tmpdir))
+    # Counted by the parent only, children start from zero.
+    registry.counter("requests", endpoint="items").inc(5)
+    ready = context.Semaphore(0)
+    done = context.Event()
+    processes = [context.Process(target=_work,
+                                 args=(registry, index, ready, done))
+                 for index in range(WORKERS)]
+    for process in processes:
+        process.start()
+
+    try:
+        for _ in processes:
+            assert ready.acquire(timeout=10)
+
+        snapshot = registry.snapshot()
+    finally:
+        done.set()
+        for process in processes:
+            process.join(10)
+
+    assert [process.exitcode for process in processes] == [0] * WORKERS
+    counters = snapshot["counters"]
+    assert find(counters, "requests", endpoint="items")[0]["value"] == (
+        5 + WORKERS * REQUESTS)
+    routes = find(counters, "routes")
+    assert len(routes) == ROUTES
+    assert all(entry["value"] == sum(range(1, WORKERS + 1))
+               for entry in routes)
+
+    histogram = find(snapshot["histograms"], "latency")[0]
+    assert histogram["count"] == WORKERS * REQUESTS
+    assert histogram["sum"] == pytest.approx(WORKERS * REQUESTS * 0.275)
+    assert histogram["buckets"] == [
+        [0.1, WORKERS * REQUESTS // 2],
+        [1, WORKERS * REQUESTS],
+        ["+Inf", WORKERS * REQUESTS]
+    ]
+
+    gauges = find(snapshot["gauges"], "workers")
+    assert sorted(entry["value"] for entry in gauges) == list(range(WORKERS))
+    assert sorted(entry["labels"]["pid"] for entry in gauges) == sorted(
+        str(process.pid) for process in processes)
+
+    # Files of dead processes are removed.
+    snapshot = registry.snapshot()
+    assert find(snapshot["counters"], "requests")[0]["value"] == 5
+    assert find(snapshot["counters"], "routes") == []
+    assert os.listdir(str(tmpdir)) == ["metrics-{}.db".format(os.getpid())]
@@ -0,0 +1,39 @@
+# -*- coding: utf-8 -*-
+
+from limonado.utils import _params
+from limonado.utils._params import NumberArray
+from limonado.utils._params import exclude_parsed
+from limonado.utils._params import extract_params
+
+
+def get_schema():
+    return {
+        "type": "object",
+        "properties": {
+            "ids": {
+                "type": "array",
+                "itemSeparator": ",",
+                "compact": True,
+                "items": {"type": "integer"}
+            }
+        }
+    }
+
+
+def test_exclude_parsed():
+    schema = get_schema()
+    params = extract_params({"ids": [b"1,2,3"]}, schema)
+    assert isinstance(params["ids"], NumberArray)
+    excluded_schema = exclude_parsed(schema, params)
+    assert excluded_schema["properties"] == {"ids": {}}
+    assert exclude_parsed(schema, params) is excluded_schema
+    assert exclude_parsed(schema, {"ids": [1, 2, 3]}) is schema
+
+
+def test_excluded_schemas_are_bounded(monkeypatch):
+    monkeypatch.setattr(_params, "_EXCLUDED_SCHEMAS_SIZE", 2)
+    params = {"ids": NumberArray("q", [1])}
+    for _ in range(10):
+        exclude_parsed(get_schema(), params)
+
+    assert len(_params._excluded_schemas) <= 2
@@ -0,0 +1,236 @@
+# -*- coding: utf-8 -*-
+
+import logging
+
+import pytest
+from tornado.gen import sleep
+from tornado.iostream import StreamClosedError
+from tornado.tcpclient import TCPClient
+from tornado.tcpserver import TCPServer
+from tornado.testing import bind_unused_port
+
+from limonado.contrib.health import HealthIssue
+from limonado.contrib.pool import ResourcePool
+from limonado.exceptions import APIError
+
+
+class EchoServer(TCPServer):
+    async def handle_stream(self, stream, address):
+        try:
+            while True:
+                line = await stream.read_until(b"\n")
+                await stream.write(line)
+        except StreamClosedError:
+            pass
+
+
+class EchoPool(ResourcePool):
+    def __init__(self, port, **kwargs):
+        kwargs.setdefault("prewarm", False)
+        super().__init__(name="echo", **kwargs)
+        self.port = port
+        self.client = TCPClient()
+        self.created = 0
+
+    async def create(self):
+        stream = await self.client.connect("127.0.0.1", self.port)
+        self.created += 1
+        return stream
+
+    def close(self, stream):
+        stream.close()
+
+    def is_usable(self, stream):
+        return not stream.closed()
+
+    async def ping(self, stream):
+        await stream.write(b"ping\n")
+        await stream.read_until(b"\n")
+
+
+@pytest.fixture
+def echo_port(io_loop):
+    sock, port = bind_unused_port()
+    server = EchoServer()
+    server.add_sockets([sock])
+    yield port
+    server.stop()
+
+
+@pytest.fixture
+def closed_port():
+    sock, port = bind_unused_port()
+    sock.close()
+    return port
+
+
+async def echo(stream, message):
+    await stream.write(message + b"\n")
+    return (await stream.read_until(b"\n")).rstrip(b"\n")
+
+
+def test_acquire_reuses_released_resources(io_loop, echo_port):
+    pool = EchoPool(echo_port, max_size=2)
+
+    async def run():
+        first = await pool.acquire()
+        assert await echo(first, b"hello") == b"hello"
+        pool.release(first)
+        second = await pool.acquire()
+        assert second is first
+        pool.release(second)
+
+    io_loop.run_sync(run)
+    assert pool.created == 1
+    assert pool.stats["idle"] == 1
+
+
+def test_acquire_timeout(io_loop, echo_port):
+    pool = EchoPool(echo_port, max_size=1, acquire_timeout=0.05)
+
+    async def run():
+        resource = await pool.acquire()
+        with pytest.raises(APIError) as info:
+            await pool.acquire()
+
+        assert info.value.status_code == 503
+        pool.release(resource)
+
+    io_loop.run_sync(run)
+    assert pool.stats["exhausted"] == 1
+    assert pool.stats["waiting"] == 0
+
+
+def test_hand_over_to_waiter(io_loop, echo_port):
+    pool = EchoPool(echo_port, max_size=1, acquire_timeout=1)
+
+    async def run():
+        resource = await pool.acquire()
+        waiter = pool.acquire()
+        await sleep(0.01)
+        assert pool.stats["waiting"] == 1
+        pool.release(resource)
+        assert await waiter is resource
+        pool.release(resource)
+
+    io_loop.run_sync(run)
+    assert pool.created == 1
+
+
+def test_broken_resource_is_replaced(io_loop, echo_port):
+    pool = EchoPool(echo_port, max_size=1, acquire_timeout=1)
+
+    async def run():
+        resource = await pool.acquire()
+        waiter = pool.acquire()
+        await sleep(0.01)
+        pool.release(resource, broken=True)
+        replacement = await waiter
+        assert replacement is not resource
+        assert resource.closed()
+        assert await echo(replacement, b"again") == b"again"
+        pool.release(replacement)
+
+    io_loop.run_sync(run)
+    assert pool.created == 2
+    assert pool.stats["broken"] == 1
+    assert pool.stats["size"] == 1
+
+
+def test_idle_resources_are_evicted(io_loop, echo_port):
+    pool = EchoPool(echo_port, max_size=3, idle_timeout=0.1)
+
+    async def run():
+        await pool.start()
+        resources = [await pool.acquire() for _ in range(3)]
+        for resource in resources:
+            pool.release(resource)
+
+        assert pool.stats["idle"] == 3
+        # Evictions run at most every second.
+        await sleep(1.2)
+        pool.stop()
+        return resources
+
+    resources = io_loop.run_sync(run)
+    assert pool.stats["size"] == 0
+    assert all(resource.closed() for resource in resources)
+
+
+def test_min_size_is_kept_on_eviction(io_loop, echo_port):
+    pool = EchoPool(echo_port, min_size=1, max_size=3, idle_timeout=0.1)
+
+    async def run():
+        await pool.start()
+        await sleep(1.2)
+        pool.stop()
+
+    io_loop.run_sync(run)
+    assert pool.created == 1
+
+
+def test_health_issue_when_exhausted(io_loop, echo_port):
+    pool = EchoPool(echo_port, max_size=1, acquire_timeout=1)
+
+    async def run():
+        resource = await pool.acquire()
+        waiter = pool.acquire()
+        await sleep(0.01)
+        with pytest.raises(HealthIssue) as info:
+            await pool.check_health()
+
+        assert "exhausted" in info.value.message
+        assert info.value.details["waiting"] == 1
+        pool.release(resource)
+        pool.release(await waiter)
+        await pool.check_health()
+
+    io_loop.run_sync(run)
+
+
+def test_health_issue_when_creation_fails(io_loop, closed_port):
+    pool = EchoPool(closed_port, max_size=1)
+
+    async def run():
+        with pytest.raises(StreamClosedError):
+            await pool.acquire()
+
+        with pytest.raises(HealthIssue) as info:
+            await pool.check_health()
+
+        assert "can't create" in info.value.message
+        assert "error" in info.value.details
+
+    io_loop.run_sync(run)
+    assert pool.stats["size"] == 0
+
+
+def test_health_issue_when_ping_fails(io_loop, echo_port):
+    pool = EchoPool(echo_port, max_size=1)
+    pool.is_usable = lambda stream: True
+
+    async def run():
+        resource = await pool.acquire()
+        pool.release(resource)
+        resource.close()
+        with pytest.raises(HealthIssue) as info:
+            await pool.check_health()
+
+        assert "broken" in info.value.message
+
+    io_loop.run_sync(run)
+    assert pool.stats["broken"] == 1
+
+
+def test_prewarm_failure_is_logged(io_loop, closed_port, caplog):
+    pool = EchoPool(closed_port, min_size=1, prewarm=True)
+    with caplog.at_level(logging.WARNING, "limonado.contrib.pool"):
+        io_loop.run_sync(lambda: sleep(0.1))
+
+    assert "Failed to prewarm pool 'echo'" in caplog.text
+    assert pool.stats["size"] == 0
+
+
+def test_create_is_abstract():
+    with pytest.raises(TypeError):
+        ResourcePool(prewarm=False)
@@ -0,0 +1,35 @@
+# -*- coding: utf-8 -*-
+
+import pytest
+from jsonschema import RefResolutionError
+
+from limonado.validation.registry import SchemaRegistry
+
+
+def test_validators_are_cached():
+    registry = SchemaRegistry()
+    registry.register("item", {"type": "object"})
+    schema = {"type": "array", "items": {"$ref": "item"}}
+    assert registry.get_validator("item") is registry.get_validator("item")
+    assert registry.get_validator(schema) is registry.get_validator(schema)
+
+
+def test_cache_is_bounded():
+    registry = SchemaRegistry(cache_size=2)
+    schema = {"type": "integer"}
+    validator = registry.get_validator(schema)
+    for _ in range(10):
+        registry.validate(1, {"type": "integer"})
+
+    assert len(registry._get_cache()) == 2
+    assert registry.get_validator(schema) is not validator
+
+
+def test_cache_is_reset_on_register():
+    registry = SchemaRegistry()
+    schema = {"$ref": "item"}
+    with pytest.raises(RefResolutionError):
+        registry.validate(1, schema)
+
+    registry.register("item", {"type": "integer"})
+    registry.validate(1, schema)
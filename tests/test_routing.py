@@ -0,0 +1,145 @@
+# -*- coding: utf-8 -*-
+
+import re
+
+import pytest
+from tornado.httputil import HTTPServerRequest
+from tornado.routing import HostMatches
+from tornado.routing import PathMatches
+from tornado.routing import Rule
+from tornado.web import RequestHandler
+from tornado.web import _ApplicationRouter
+
+from limonado.core import Application
+from limonado.core import PrefixRouter
+from limonado.settings import get_default_settings
+
+PATTERNS = [
+    r"/v1/items",
+    r"/v1/items/([^/]+)",
+    r"/v1/items/special",
+    r"/v1/items/(?P<key>[0-9]+)/tags",
+    r"/v1/items/[a-z]+/tags",
+    r"/v1/users$",
+    r"/v1/users/(.*)",
+    r"/v2/items",
+    r"/v\d+/status",
+    r"/(v1|v2)/health",
+    r"/v1/a|/b",
+    r"/v1/dotted\.path",
+    r"/v1/(?:x|y)/z",
+    r"/v1/[|]/pipe",
+    r"/v1/\|/escaped",
+    r".*/fallback",
+]
+
+PATHS = [
+    "/v1/items",
+    "/v1/items/",
+    "/v1/items/42",
+    "/v1/items/special",
+    "/v1/items/42/tags",
+    "/v1/items/abc/tags",
+    "/v1/users",
+    "/v1/users/",
+    "/v1/users/a/b",
+    "/v2/items",
+    "/v2/items/42",
+    "/v1/status",
+    "/v7/status",
+    "/v1/health",
+    "/v2/health",
+    "/v3/health",
+    "/v1/a",
+    "/b",
+    "/b/c",
+    "/v1/dotted.path",
+    "/v1/dottedxpath",
+    "/v1/x/z",
+    "/v1/y/z",
+    "/v1/|/pipe",
+    "/v1/|/escaped",
+    "/anything/fallback",
+    "/v1/items/fallback",
+    "/",
+    "/unknown",
+]
+
+
+def make_rules(patterns):
+    rules = []
+    for index, pattern in enumerate(patterns):
+        handler = type("Handler{}".format(index), (RequestHandler,), {})
+        rules.append((pattern, handler))
+
+    return rules
+
+
+def find(router, path, host="localhost"):
+    request = HTTPServerRequest(uri=path, headers={"Host": host})
+    delegate = router.find_handler(request)
+    if delegate is None:
+        return None
+
+    return (delegate.handler_class.__name__, delegate.path_args,
+            delegate.path_kwargs)
+
+
+@pytest.fixture
+def application():
+    return Application(get_default_settings())
+
+
+@pytest.mark.parametrize("path", PATHS)
+def test_matches_like_linear_router(application, path):
+    rules = make_rules(PATTERNS)
+    linear = _ApplicationRouter(application, rules)
+    prefix = PrefixRouter(application, rules)
+    assert find(prefix, path) == find(linear, path)
+
+
+def test_registration_order_wins(application):
+    rules = make_rules([r"/v1/items/([^/]+)", r"/v1/items/special"])
+    router = PrefixRouter(application, rules)
+    assert find(router, "/v1/items/special")[0] == "Handler0"
+    rules.reverse()
+    router = PrefixRouter(application, rules)
+    assert find(router, "/v1/items/special")[0] == "Handler1"
+
+
+def test_falls_back_to_regex_rules(application):
+    rules = make_rules([r"/v1/items", r"/v\d+/items", r".*"])
+    router = PrefixRouter(application, rules)
+    assert find(router, "/v1/items")[0] == "Handler0"
+    assert find(router, "/v2/items")[0] == "Handler1"
+    assert find(router, "/v2/other")[0] == "Handler2"
+
+
+def test_top_level_alternation(application):
+    rules = make_rules([r"/v1/a|/b", r"/v1/(?:c|d)"])
+    router = PrefixRouter(application, rules)
+    assert find(router, "/v1/a")[0] == "Handler0"
+    assert find(router, "/b")[0] == "Handler0"
+    assert find(router, "/v1/c")[0] == "Handler1"
+    assert find(router, "/v1/d")[0] == "Handler1"
+    assert find(router, "/c") is None
+
+
+def test_non_path_and_ignorecase_rules(application):
+    handler = type("HostHandler", (RequestHandler,), {})
+    rules = make_rules([r"/v1/items"])
+    rules.insert(0, Rule(HostMatches("api.example.com"), handler))
+    rules.append(Rule(PathMatches(re.compile("/v1/USERS", re.IGNORECASE)),
+                      handler))
+    router = PrefixRouter(application, rules)
+    assert find(router, "/v1/items", host="api.example.com")[0] == \
+        "HostHandler"
+    assert find(router, "/v1/items")[0] == "Handler0"
+    assert find(router, "/v1/users")[0] == "HostHandler"
+
+
+def test_sets_route(application):
+    router = PrefixRouter(application, make_rules([r"/v1/items/([^/]+)$"]))
+    request = HTTPServerRequest(uri="/v1/items/42")
+    router.find_handler(request)
+    assert request.route == r"/v1/items/([^/]+)"
@@ -0,0 +1,217 @@
+# -*- coding: utf-8 -*-
+"""Serializers must behave exactly like ``jsonschema`` and ``json.dumps``."""
+
+import json
+import random
+
+import pytest
+from jsonschema import ValidationError
+
+from limonado.validation.registry import SchemaRegistry
+
+SCHEMAS = {
+    "item": {
+        "type": "object",
+        "properties": {
+            "id": {"type": "integer"},
+            "name": {"type": "string"},
+            "price": {"type": "number"},
+            "tags": {"type": "array", "items": {"type": "string"}}
+        },
+        "required": ["id"],
+        "additionalProperties": False
+    },
+    "tree": {
+        "type": "object",
+        "properties": {
+            "value": {"type": "integer"},
+            "children": {"type": "array", "items": {"$ref": "tree"}}
+        },
+        "required": ["value"]
+    },
+    "page": {
+        "definitions": {
+            "cursor": {"type": ["string", "null"]}
+        },
+        "type": "object",
+        "properties": {
+            "items": {"type": "array", "items": {"$ref": "item"}},
+            "next": {"$ref": "#/definitions/cursor"},
+            "total": {"type": "integer", "minimum": 0}
+        },
+        "additionalProperties": {"type": "boolean"}
+    },
+    "event": {
+        "type": "object",
+        "properties": {
+            "at": {"type": "string", "format": "date-time"},
+            "kind": {"enum": ["created", "deleted"]},
+            "data": {"anyOf": [{"type": "null"}, {"$ref": "item"}]}
+        }
+    }
+}
+
+CASES = [
+    ("item", {"id": 1}),
+    ("item", {"id": 1, "name": "café </b>", "price": 1.5,
+              "tags": ["a", "b"]}),
+    ("item", {"id": 1, "price": 2}),
+    ("item", {"id": "1"}),
+    ("item", {"id": True}),
+    ("item", {"id": 1.0}),
+    ("item", {"name": "no id"}),
+    ("item", {"id": 1, "extra": 1}),
+    ("item", {"id": 1, "tags": ["a", 2]}),
+    ("item", {"id": 1, "price": False}),
+    ("item", []),
+    ("tree", {"value": 1, "children": [{"value": 2, "children": []},
+                                       {"value": 3}]}),
+    ("tree", {"value": 1, "children": [{"value": 2, "children": [{}]}]}),
+    ("tree", {"value": 1, "other": {"nested": [1, None]}}),
+    ("page", {"items": [{"id": 1}], "next": None, "total": 1}),
+    ("page", {"items": [], "next": "abc", "more": True}),
+    ("page", {"items": [{"id": 1}, {"id": "2"}]}),
+    ("page", {"next": 1}),
+    ("page", {"total": -1}),
+    ("page", {"more": "yes"}),
+    ("event", {"at": "2018-06-01T12:00:00Z", "kind": "created",
+               "data": {"id": 1}}),
+    ("event", {"at": "June", "kind": "created"}),
+    ("event", {"kind": "updated"}),
+    ("event", {"data": None}),
+    ("event", {"data": {"id": "x"}})
+]
+
+
+@pytest.fixture(scope="module")
+def registry():
+    registry = SchemaRegistry()
+    registry.register_all(SCHEMAS)
+    return registry
+
+
+def check_equivalence(registry, schema, instance):
+    errors = list(registry.get_validator(schema).iter_errors(instance))
+    serializer = registry.get_serializer(schema)
+    if not errors:
+        assert serializer(instance) == json.dumps(instance)
+        return
+
+    with pytest.raises(ValidationError) as info:
+        serializer(instance)
+
+    assert list(info.value.path) in [list(error.path) for error in errors]
+
+
+@pytest.mark.parametrize("name, instance", CASES)
+def test_named_schemas(registry, name, instance):
+    check_equivalence(registry, name, instance)
+
+
+@pytest.mark.parametrize("name, instance", CASES)
+def test_inline_schemas(registry, name, instance):
+    # References of inline schemas are resolved from the registry too.
+    schema = {"type": "array", "items": {"$ref": name}}
+    check_equivalence(registry, schema, [instance])
+
+
+def random_value(rng, depth=0):
+    kind = rng.choice(["int", "float", "str", "bool", "null", "list",
+                       "dict"] if depth < 3 else ["int", "str", "null"])
+    if kind == "int":
+        return rng.randint(-3, 3)
+    elif kind == "float":
+        return rng.choice([0.5, -1.0, 1e20])
+    elif kind == "str":
+        return rng.choice(["", "a", "é", "</", "2018-06-01T12:00:00Z"])
+    elif kind == "bool":
+        return rng.random() < 0.5
+    elif kind == "null":
+        return None
+    elif kind == "list":
+        return [random_value(rng, depth + 1)
+                for _ in range(rng.randint(0, 3))]
+
+    keys = ["id", "name", "price", "tags", "value", "children", "items",
+            "next", "total", "at", "kind", "data", "extra"]
+    return {key: random_value(rng, depth + 1)
+            for key in rng.sample(keys, rng.randint(0, 4))}
+
+
+def random_instance(rng, schema, document, depth=0):
+    """Return a value mostly valid against ``schema``."""
+    if rng.random() < 0.05:
+        return random_value(rng, depth)
+
+    if "$ref" in schema:
+        ref = schema["$ref"]
+        if ref.startswith("#"):
+            schema = document
+            for part in ref[2:].split("/"):
+                schema = schema[part]
+        else:
+            document = schema = SCHEMAS[ref]
+
+        if depth > 4:
+            return None
+
+        return random_instance(rng, schema, document, depth + 1)
+
+    if "enum" in schema:
+        return rng.choice(schema["enum"])
+
+    if "anyOf" in schema:
+        return random_instance(rng, rng.choice(schema["anyOf"]), document,
+                               depth)
+
+    type_name = schema.get("type", "object")
+    if isinstance(type_name, list):
+        type_name = rng.choice(type_name)
+
+    if type_name == "object":
+        properties = schema.get("properties", {})
+        names = [name for name in properties
+                 if name in schema.get("required", ()) or
+                 rng.random() < 0.5]
+        value = {name: random_instance(rng, properties[name], document,
+                                       depth + 1)
+                 for name in names}
+        if rng.random() < 0.2:
+            value["extra"] = random_value(rng, depth + 1)
+
+        return value
+    elif type_name == "array":
+        return [random_instance(rng, schema.get("items", {}), document,
+                                depth + 1)
+                for _ in range(rng.randint(0, 3 if depth < 3 else 0))]
+    elif type_name == "string":
+        if schema.get("format") == "date-time":
+            return rng.choice(["2018-06-01T12:00:00Z", "2018-06-01"])
+
+        return rng.choice(["", "a", "é", "</"])
+    elif type_name == "integer":
+        return rng.randint(-2, 5)
+    elif type_name == "number":
+        return rng.choice([0.5, -1.0, 1e20, 3])
+    elif type_name == "boolean":
+        return rng.random() < 0.5
+
+    return None
+
+
+@pytest.mark.parametrize("name", sorted(SCHEMAS))
+def test_random_instances(registry, name):
+    rng = random.Random(name)
+    valid = 0
+    for _ in range(300):
+        instance = random_instance(rng, SCHEMAS[name], SCHEMAS[name])
+        valid += registry.get_validator(name).is_valid(instance)
+        check_equivalence(registry, name, instance)
+
+    # Both valid and invalid instances are compared.
+    assert 30 <= valid <= 270
+
+
+def test_serialize_escapes_closing_tags(registry):
+    assert registry.serialize({"id": 1, "name": "</b>"}, "item") == (
+        '{"id": 1, "name": "<\\/b>"}')
@@ -0,0 +1,260 @@
+# -*- coding: utf-8 -*-
+
+import json
+
+import pytest
+from tornado.gen import multi
+from tornado.gen import sleep
+from tornado.httpclient import HTTPError
+from tornado.httpclient import HTTPRequest
+from tornado.iostream import StreamClosedError
+from tornado.tcpserver import TCPServer
+from tornado.testing import bind_unused_port
+from tornado.web import Application
+from tornado.web import RequestHandler
+
+from limonado.contrib.upstream import UpstreamClient
+from limonado.metrics import MetricsRegistry
+
+
+class PeerHandler(RequestHandler):
+    """Respond with the client port, to tell connections apart."""
+
+    async def get(self):
+        delay = float(self.get_argument("delay", 0))
+        if delay:
+            await sleep(delay)
+
+        self.write({
+            "port": self.request.connection.stream.socket.getpeername()[1],
+            "authorization": self.request.headers.get("Authorization")
+        })
+
+    def post(self):
+        self.write({"body": self.request.body.decode("utf-8")})
+
+
+class RedirectHandler(RequestHandler):
+    def get(self, status):
+        self.redirect("/peer", status=int(status))
+
+    def post(self, status):
+        self.redirect("/peer", status=int(status))
+
+
+class StaleServer(TCPServer):
+    """Answer the first request of each connection, close on the next one.
+
+    Stands for an upstream closing keep-alive connections while idle.
+
+    """
+
+    def __init__(self):
+        super().__init__()
+        self.connections = 0
+
+    async def handle_stream(self, stream, address):
+        self.connections += 1
+        try:
+            await stream.read_until(b"\r\n\r\n")
+            await stream.write(b"HTTP/1.1 200 OK\r\nContent-Length: 2\r\n"
+                               b"\r\nok")
+            await stream.read_until(b"\r\n\r\n")
+        except StreamClosedError:
+            pass
+        finally:
+            stream.close()
+
+
+@pytest.fixture
+def base_url(serve):
+    return serve(Application([
+        (r"/peer", PeerHandler),
+        (r"/redirect/([0-9]+)", RedirectHandler)
+    ]))
+
+
+@pytest.fixture
+def stale_server(io_loop):
+    sock, port = bind_unused_port()
+    server = StaleServer()
+    server.add_sockets([sock])
+    server.url = "http://127.0.0.1:{}/".format(port)
+    yield server
+    server.stop()
+
+
+@pytest.fixture
+def client(io_loop):
+    client = UpstreamClient(max_host_connections=2, request_timeout=5,
+                            metrics=MetricsRegistry())
+    yield client
+    io_loop.run_sync(client.close)
+
+
+def get_json(response):
+    return json.loads(response.body.decode("utf-8"))
+
+
+def test_keep_alive_reuse(io_loop, base_url, client):
+    async def run():
+        ports = []
+        for _ in range(3):
+            response = await client.fetch(base_url + "/peer")
+            ports.append(get_json(response)["port"])
+
+        return ports
+
+    ports = io_loop.run_sync(run)
+    assert len(set(ports)) == 1
+    stats = list(client.stats.values())[0]
+    assert stats == dict(stats, size=1, idle=1, in_use=0)
+
+
+def test_retry_on_stale_connection(io_loop, stale_server, client):
+    async def run():
+        first = await client.fetch(stale_server.url)
+        second = await client.fetch(stale_server.url)
+        return first, second
+
+    first, second = io_loop.run_sync(run)
+    assert first.body == second.body == b"ok"
+    assert stale_server.connections == 2
+    stats = list(client.stats.values())[0]
+    assert stats["broken"] == 1
+
+
+def test_no_retry_of_non_idempotent_requests(io_loop, stale_server, client):
+    async def run():
+        await client.fetch(stale_server.url, method="POST", body="a")
+        with pytest.raises(HTTPError) as info:
+            await client.fetch(stale_server.url, method="POST", body="b")
+
+        return info.value
+
+    error = io_loop.run_sync(run)
+    assert error.code == 599
+    assert stale_server.connections == 1
+
+
+def test_closed_connections_are_not_reused(io_loop, stale_server, client):
+    async def run():
+        await client.fetch(stale_server.url, method="POST", body="a")
+        with pytest.raises(HTTPError):
+            await client.fetch(stale_server.url, method="POST", body="b")
+
+        return await client.fetch(stale_server.url, method="POST", body="c")
+
+    response = io_loop.run_sync(run)
+    assert response.body == b"ok"
+    assert stale_server.connections == 2
+
+
+def test_pool_limit(io_loop, base_url, client):
+    async def run():
+        return await multi([client.fetch(base_url + "/peer?delay=0.05")
+                            for _ in range(6)])
+
+    responses = io_loop.run_sync(run)
+    ports = set(get_json(response)["port"] for response in responses)
+    assert len(ports) == 2
+    stats = list(client.stats.values())[0]
+    assert stats["size"] == 2
+
+
+def test_request_timeout(io_loop, base_url, client):
+    async def run():
+        with pytest.raises(HTTPError) as info:
+            await client.fetch(base_url + "/peer?delay=1",
+                               request_timeout=0.05)
+
+        assert info.value.code == 599
+        assert info.value.message == "Timeout"
+        # The timed out connection is not handed out again.
+        return await client.fetch(base_url + "/peer")
+
+    response = io_loop.run_sync(run)
+    assert response.code == 200
+
+
+def test_connect_error(io_loop, client):
+    sock, port = bind_unused_port()
+    sock.close()
+
+    async def run():
+        with pytest.raises(HTTPError) as info:
+            await client.fetch("http://127.0.0.1:{}/".format(port))
+
+        return info.value
+
+    assert io_loop.run_sync(run).code == 599
+
+
+def test_response_too_large(io_loop, base_url):
+    client = UpstreamClient(max_response_size=10, metrics=MetricsRegistry())
+
+    async def run():
+        with pytest.raises(HTTPError) as info:
+            await client.fetch(base_url + "/peer")
+
+        return info.value
+
+    assert io_loop.run_sync(run).code == 599
+    io_loop.run_sync(client.close)
+
+
+@pytest.mark.parametrize("status", [301, 302, 303, 307, 308])
+def test_follow_redirects(io_loop, base_url, client, status):
+    url = "{}/redirect/{}".format(base_url, status)
+    response = io_loop.run_sync(lambda: client.fetch(url))
+    assert response.code == 200
+    assert response.effective_url == base_url + "/peer"
+
+
+def test_redirect_after_post(io_loop, base_url, client):
+    async def run():
+        return await multi([
+            client.fetch(base_url + "/redirect/303", method="POST",
+                         body="data"),
+            client.fetch(base_url + "/redirect/307", method="POST",
+                         body="data")
+        ])
+
+    see_other, temporary = io_loop.run_sync(run)
+    assert "port" in get_json(see_other)
+    assert get_json(temporary) == {"body": "data"}
+
+
+def test_redirects_not_followed(io_loop, base_url, client):
+    async def run():
+        response = await client.fetch(base_url + "/redirect/302",
+                                      follow_redirects=False,
+                                      raise_error=False)
+        assert response.code == 302
+        with pytest.raises(HTTPError) as info:
+            await client.fetch(base_url + "/redirect/302", max_redirects=0)
+
+        assert info.value.code == 302
+
+    io_loop.run_sync(run)
+
+
+def test_basic_auth(io_loop, base_url, client):
+    response = io_loop.run_sync(lambda: client.fetch(
+        base_url + "/peer", auth_username="user", auth_password="secret"))
+    assert get_json(response)["authorization"] == "Basic dXNlcjpzZWNyZXQ="
+
+
+@pytest.mark.parametrize("options", [
+    dict(body_producer=lambda write: None, method="POST"),
+    dict(streaming_callback=lambda chunk: None),
+    dict(validate_cert=False),
+    dict(ca_certs="ca.pem"),
+    dict(client_cert="cert.pem", client_key="key.pem"),
+    dict(auth_username="user", auth_password="secret", auth_mode="digest"),
+    dict(proxy_host="proxy", proxy_port=3128)
+])
+def test_unsupported_options(io_loop, base_url, client, options):
+    request = HTTPRequest(base_url + "/peer", **options)
+    with pytest.raises(ValueError):
+        io_loop.run_sync(lambda: client.fetch(request))
@@ -0,0 +1,41 @@
+# -*- coding: utf-8 -*-
+
+import pytest
+
+from limonado.utils.date import parse_datetime
+from limonado.utils.validators import validate_datetime
+from limonado.validation import format_checker
+
+
+@pytest.mark.parametrize("value", [
+    "2018-06-01T12:30:00Z",
+    "2018-06-01t12:30:00.123456789z",
+    "2018-06-01T12:30:00+02:00",
+    "2016-12-31T23:59:60Z",
+    42
+])
+def test_valid_datetime(value):
+    assert validate_datetime(value)
+    assert format_checker.conforms(value, "date-time")
+
+
+@pytest.mark.parametrize("value", [
+    "10",
+    "June",
+    "5pm",
+    "2018-06-01",
+    "2018-06-01 12:30:00Z",
+    "2018-06-01T12:30:00",
+    "2018-13-01T12:30:00Z",
+    "2018-06-01T12:30:61Z",
+    "2018-06-01T12:30:00+24:00"
+])
+def test_invalid_datetime(value):
+    assert not validate_datetime(value)
+    assert not format_checker.conforms(value, "date-time")
+
+
+def test_parse_datetime_falls_back_to_dateutil():
+    pytest.importorskip("dateutil")
+    value = parse_datetime("2018-06-01 12:30")
+    assert (value.year, value.hour, value.minute) == (2018, 12, 30)
@@ -0,0 +1,110 @@
+# -*- coding: utf-8 -*-
+
+import logging
+
+import pytest
+from tornado import gen
+from tornado.httpclient import AsyncHTTPClient
+from tornado.httpclient import HTTPError
+from tornado.locks import Event
+
+from limonado import WebAPI
+from limonado.contrib.watchdog import RequestWatchdog
+from limonado.core.endpoint import Endpoint
+from limonado.core.endpoint import EndpointHandler
+
+
+async def wait_natively(event):
+    await event.wait()
+
+
+@gen.coroutine
+def wait_with_gen(event):
+    yield event.wait()
+
+
+class NativeHandler(EndpointHandler):
+    async def get(self):
+        await wait_natively(self.endpoint.event)
+        self.write_json({})
+
+
+class GenHandler(EndpointHandler):
+    @gen.coroutine
+    def get(self):
+        yield wait_with_gen(self.endpoint.event)
+        self.write_json({})
+
+
+class SleepingHandler(EndpointHandler):
+    async def get(self):
+        await gen.sleep(10)
+
+
+class SlowEndpoint(Endpoint):
+    name = "slow"
+    handlers = [
+        ("/{name}/native", NativeHandler),
+        ("/{name}/gen", GenHandler),
+        ("/{name}/sleep", SleepingHandler)
+    ]
+    event = None
+
+
+@pytest.fixture
+def watchdog(io_loop, monkeypatch):
+    watchdog = RequestWatchdog(threshold=0, autostart=False)
+    monkeypatch.setattr(SlowEndpoint, "event", Event())
+    return watchdog
+
+
+@pytest.fixture
+def base_url(serve, watchdog):
+    api = WebAPI(objects=dict(watchdog=watchdog)).add_endpoint(SlowEndpoint)
+    return serve(api.get_application())
+
+
+def get_slow_request_log(io_loop, watchdog, caplog):
+    with caplog.at_level(logging.WARNING, "limonado.contrib.watchdog"):
+        io_loop.run_sync(lambda: gen.sleep(0.05))
+        watchdog.check()
+
+    return caplog.text
+
+
+def test_sleeping_handler_stack(io_loop, base_url, watchdog, caplog):
+    client = AsyncHTTPClient()
+    client.fetch(base_url + "/v1/slow/sleep", raise_error=False)
+    text = get_slow_request_log(io_loop, watchdog, caplog)
+    assert "Slow request" in text
+    assert "GET /v1/slow/sleep" in text
+    assert "in get\n    await gen.sleep(10)" in text
+    client.close()
+
+
+@pytest.mark.parametrize("path, function", [
+    ("native", "wait_natively"),
+    ("gen", "wait_with_gen")
+])
+def test_awaited_coroutines_stack(io_loop, base_url, watchdog, caplog,
+                                  path, function):
+    future = AsyncHTTPClient().fetch(base_url + "/v1/slow/" + path)
+    text = get_slow_request_log(io_loop, watchdog, caplog)
+    assert "in get\n" in text
+    assert "in {}\n".format(function) in text
+    assert "No stack available" not in text
+
+    SlowEndpoint.event.set()
+    assert io_loop.run_sync(lambda: future).code == 200
+    assert watchdog.get_active_requests() == []
+
+
+def test_closed_connections_are_untracked(io_loop, base_url, watchdog):
+    client = AsyncHTTPClient()
+    with pytest.raises(HTTPError):
+        io_loop.run_sync(lambda: client.fetch(base_url + "/v1/slow/sleep",
+                                              request_timeout=0.05))
+
+    io_loop.run_sync(lambda: gen.sleep(0.05))
+    assert watchdog.get_active_requests() == []
+    client.close()